@@ -1,17 +1,33 @@
 """The Crestron Integration Component"""
 
 from .const import (CONF_IP, CONF_IP_ID, CONF_ROOM_ID, CONF_PORT,
-                    HUB, DOMAIN, CONF_JOIN, CONF_SCRIPT)
+                    HUB, DOMAIN, CONF_JOIN, CONF_SCRIPT, CONF_JOINS, CONF_HUB, CONF_VALUE,
+                    SERVICE_SET_JOINS, SigType, CONF_FILTERS, CONF_RULES,
+                    CONF_DEBOUNCE, CONF_DEADBAND, CONF_RATE_LIMIT,
+                    CONF_STORM_LIMIT, CONF_STORM_HOLD, CONF_TO_JOINS,
+                    CONF_FROM_JOINS, BRIDGE, SERVICE_GET_STATS, CONF_MAX_QUEUE,
+                    CONF_OVERFLOW_POLICY, CONF_WRITE_BUFFER_HIGH, CONF_JOURNAL_EXPIRY,
+                    SERVICE_RELOAD, CONF_STANDBY, CONF_CAPTURE,
+                    CONF_PROFILING, CONF_SLOW_CALLBACK, CONF_TOP, CONF_LAG_INTERVAL,
+                    CONF_HISTORY, CONF_MAX_MEMORY, CONF_SIZE, CONF_DIRECTION,
+                    CONF_SECONDS, SERVICE_QUERY_HISTORY, CONF_IO_THREAD,
+                    CONF_TLS, CONF_VERIFY, CONF_CA_FILE, CONF_CERT_FILE,
+                    CONF_KEY_FILE, CONF_CHECK_HOSTNAME, CONF_DEVICES, CONF_RANGE,
+                    MANIFEST, FEEDBACK_STATS)
 import asyncio
 import logging
+import time
 
 import voluptuous as vol
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.discovery import load_platform
+from homeassistant.helpers.start import async_at_started
 from homeassistant.helpers.event import TrackTemplate, async_track_template_result
 from homeassistant.helpers.template import Template
 from homeassistant.helpers.script import Script
+from homeassistant.util import dt as dt_util
 from homeassistant.core import callback, Context
 from homeassistant.const import (
     Platform,
@@ -23,28 +39,188 @@ from homeassistant.const import (
     STATE_OFF,
     CONF_SERVICE,
     CONF_SERVICE_DATA,
+    CONF_TYPE,
+    CONF_NAME,
+    CONF_PLATFORM,
 )
 
-from .cipasync import XPanelClient
+from .cipasync import LANE_BULK, OVERFLOW_POLICIES, OVERFLOW_COALESCE, tls_context
+from .hub import XPanelClient, ThreadedXPanelClient
+from .bridge import JoinBridge
+from .reload import RELOAD_PLATFORMS, async_reload
+from .device_manifest import DeviceManifest
 
 _LOGGER = logging.getLogger(__name__)
 
-TO_JOINS_SCHEMA = vol.Schema(
+SIGTYPE_ALIASES = {
+    "d": SigType.DIGITAL,
+    "digital": SigType.DIGITAL,
+    "a": SigType.ANALOG,
+    "analog": SigType.ANALOG,
+    "s": SigType.SERIAL,
+    "serial": SigType.SERIAL,
+}
+
+cv_sigtype = vol.All(vol.Lower, vol.In(SIGTYPE_ALIASES), SIGTYPE_ALIASES.get)
+
+
+def join_range(value) -> range:
+    """Validate a join number or an inclusive range like "100-160"."""
+    if isinstance(value, int):
+        first = last = value
+    else:
+        text = str(value).replace("\u2013", "-").replace(" ", "")
+        try:
+            if "-" in text:
+                first, last = (int(v) for v in text.split("-", 1))
+            else:
+                first = last = int(text)
+        except ValueError:
+            raise vol.Invalid(f"invalid join or join range: {value}") from None
+    if first < 1 or last > 65535 or first > last:
+        raise vol.Invalid(f"invalid join or join range: {value}")
+    return range(first, last + 1)
+
+
+def endpoint(value) -> tuple:
+    """Validate a standby endpoint like "10.0.1.5" or "10.0.1.5:41794".
+
+    The port is None when not given and defaults to the primary port.
+    """
+    host, _, port = str(value).strip().rpartition(":")
+    if not host:
+        return (port, None)
+    return (host, cv.port(port))
+
+
+def join_ref(value) -> tuple:
+    """Validate a typed join reference like "d12", "a5" or "s3"."""
+    text = str(value).strip().lower()
+    if len(text) < 2 or text[0] not in ("d", "a", "s") or not text[1:].isdigit():
+        raise vol.Invalid(f"invalid join, expected d/a/s and a number: {value}")
+    join = int(text[1:])
+    if join < 1 or join > 65535:
+        raise vol.Invalid(f"invalid join number: {value}")
+    return (text[0], join)
+
+
+def _join_value(entry: dict) -> dict:
+    """Coerce the value of a set_joins entry to its signal type."""
+    sigtype = entry[CONF_TYPE]
+    value = entry[CONF_VALUE]
+    try:
+        if sigtype == SigType.DIGITAL:
+            value = int(cv.boolean(value))
+        elif sigtype == SigType.ANALOG:
+            value = vol.All(vol.Coerce(int), vol.Range(0, 65535))(value)
+        else:
+            value = str(value)
+    except vol.Invalid as e:
+        raise vol.Invalid(
+            f"invalid {sigtype} value for join {entry[CONF_JOIN]}: {e}") from None
+    return {**entry, CONF_VALUE: value}
+
+
+SET_JOINS_ENTRY_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Required(CONF_TYPE): cv_sigtype,
+            vol.Required(CONF_JOIN): join_range,
+            vol.Required(CONF_VALUE): vol.Any(int, float, str, bool),
+        }
+    ),
+    _join_value,
+)
+
+SET_JOINS_SCHEMA = vol.Schema(
     {
-        vol.Required(CONF_JOIN): cv.string,
-        vol.Optional(CONF_ENTITY_ID): cv.entity_id,
-        vol.Optional(CONF_ATTRIBUTE): cv.string,
-        vol.Optional(CONF_VALUE_TEMPLATE): cv.template
+        vol.Required(CONF_JOINS): vol.All(
+            cv.ensure_list, vol.Length(min=1), [SET_JOINS_ENTRY_SCHEMA]),
+        vol.Optional(CONF_HUB): cv.string,
     }
 )
 
+TO_JOINS_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Required(CONF_JOIN): join_ref,
+            vol.Optional(CONF_ENTITY_ID): cv.entity_id,
+            vol.Optional(CONF_ATTRIBUTE): cv.string,
+            vol.Optional(CONF_VALUE_TEMPLATE): cv.template
+        }
+    ),
+    cv.has_at_least_one_key(CONF_ENTITY_ID, CONF_VALUE_TEMPLATE),
+)
+
 FROM_JOINS_SCHEMA = vol.Schema(
     {
-        vol.Required(CONF_JOIN): cv.string,
-        vol.Required(CONF_SCRIPT): cv.SCRIPT_SCHEMA
+        vol.Required(CONF_JOIN): join_ref,
+        vol.Required(CONF_SCRIPT): cv.SCRIPT_SCHEMA,
+        vol.Optional(CONF_DEBOUNCE, default=0.1): vol.Coerce(float),
+    }
+)
+
+FILTER_RULE_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_TYPE): cv_sigtype,
+        vol.Required(CONF_JOIN): join_range,
+        vol.Optional(CONF_DEBOUNCE, default=0): vol.Coerce(float),
+        vol.Optional(CONF_DEADBAND, default=0): vol.Coerce(int),
+        vol.Optional(CONF_RATE_LIMIT, default=0): vol.Coerce(float),
     }
 )
 
+FILTERS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_STORM_LIMIT, default=0): cv.positive_int,
+        vol.Optional(CONF_STORM_HOLD, default=5): cv.positive_float,
+        vol.Optional(CONF_RULES, default=[]): [FILTER_RULE_SCHEMA],
+    }
+)
+
+PROFILING_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_SLOW_CALLBACK, default=0.01): cv.positive_float,
+        vol.Optional(CONF_TOP, default=10): cv.positive_int,
+        vol.Optional(CONF_LAG_INTERVAL, default=1.0): cv.positive_float,
+    }
+)
+
+HISTORY_JOINS_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_TYPE): cv_sigtype,
+        vol.Required(CONF_JOIN): join_range,
+        vol.Optional(CONF_SIZE, default=600): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Optional(CONF_DIRECTION, default="in"): vol.In(["in", "out"]),
+    }
+)
+
+HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_MAX_MEMORY, default=1048576): cv.positive_int,
+        vol.Optional(CONF_JOINS, default=[]): [HISTORY_JOINS_SCHEMA],
+    }
+)
+
+TLS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_VERIFY, default=True): cv.boolean,
+        vol.Optional(CONF_CA_FILE): cv.isfile,
+        vol.Optional(CONF_CERT_FILE): cv.isfile,
+        vol.Optional(CONF_KEY_FILE): cv.isfile,
+        vol.Optional(CONF_CHECK_HOSTNAME, default=False): cv.boolean,
+    }
+)
+
+DEVICE_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_PLATFORM): vol.In(RELOAD_PLATFORMS),
+        vol.Required(CONF_NAME): cv.string,
+        vol.Optional(CONF_RANGE): join_range,
+    },
+    extra=vol.ALLOW_EXTRA,
+)
+
 CONFIG_SCHEMA = vol.Schema(
     {
         DOMAIN: vol.Schema(
@@ -53,6 +229,20 @@ CONFIG_SCHEMA = vol.Schema(
                 vol.Required(CONF_PORT): cv.port,
                 vol.Required(CONF_IP_ID): cv.port,
                 vol.Optional(CONF_ROOM_ID, default=""): cv.string,
+                vol.Optional(CONF_STANDBY, default=[]): vol.All(cv.ensure_list, [endpoint]),
+                vol.Optional(CONF_MAX_QUEUE, default=5000): cv.positive_int,
+                vol.Optional(CONF_OVERFLOW_POLICY, default=OVERFLOW_COALESCE): vol.In(OVERFLOW_POLICIES),
+                vol.Optional(CONF_WRITE_BUFFER_HIGH, default=65536): cv.positive_int,
+                vol.Optional(CONF_JOURNAL_EXPIRY, default=30): cv.positive_float,
+                vol.Optional(CONF_CAPTURE): cv.string,
+                vol.Optional(CONF_IO_THREAD, default=False): cv.boolean,
+                vol.Optional(CONF_TLS): TLS_SCHEMA,
+                vol.Optional(CONF_PROFILING): PROFILING_SCHEMA,
+                vol.Optional(CONF_HISTORY): HISTORY_SCHEMA,
+                vol.Optional(CONF_FILTERS, default={}): FILTERS_SCHEMA,
+                vol.Optional(CONF_TO_JOINS, default=[]): [TO_JOINS_SCHEMA],
+                vol.Optional(CONF_FROM_JOINS, default=[]): [FROM_JOINS_SCHEMA],
+                vol.Optional(CONF_DEVICES, default=[]): [DEVICE_SCHEMA],
             }
         )
     },
@@ -67,6 +257,87 @@ PLATFORMS = [
 ]
 
 
+def resolve_hub(hass: HomeAssistant, selector: str | None = None) -> XPanelClient:
+    """Return the hub matching selector (host, host:ipid or room id)."""
+    hub: XPanelClient = hass.data[DOMAIN][HUB]
+    if selector is None:
+        return hub
+    ip_id = f"{hub.ip_id[0]:#04x}"
+    if selector in (hub.host, f"{hub.host}:{ip_id}", f"{hub.host}:{hub.ip_id[0]}") \
+            or (hub.room_id and selector.upper() == hub.room_id):
+        return hub
+    raise HomeAssistantError(f"unknown crestron hub: {selector}")
+
+
+async def _async_set_joins(hass: HomeAssistant, call: ServiceCall) -> None:
+    """Handle the set_joins service, sending every join in one batch."""
+    hub = resolve_hub(hass, call.data.get(CONF_HUB))
+    joins = [
+        (entry[CONF_TYPE], join, entry[CONF_VALUE])
+        for entry in call.data[CONF_JOINS]
+        for join in entry[CONF_JOIN]
+    ]
+    try:
+        count = hub.set_many(joins, lane=LANE_BULK)
+    except ValueError as e:
+        raise HomeAssistantError(str(e)) from e
+    if joins and not count:
+        raise HomeAssistantError("set_joins: event queue full, joins not sent")
+    _LOGGER.debug(f"set_joins: {count} joins queued")
+
+
+GET_STATS_SCHEMA = vol.Schema({vol.Optional(CONF_HUB): cv.string})
+
+
+QUERY_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_TYPE): cv_sigtype,
+        vol.Required(CONF_JOIN): vol.All(vol.Coerce(int), vol.Range(min=1, max=65535)),
+        vol.Optional(CONF_DIRECTION, default="in"): vol.In(["in", "out"]),
+        vol.Optional(CONF_SECONDS): cv.positive_float,
+        vol.Optional(CONF_HUB): cv.string,
+    }
+)
+
+
+async def _async_query_history(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Handle the query_history service."""
+    hub = resolve_hub(hass, call.data.get(CONF_HUB))
+    sigtype = call.data[CONF_TYPE]
+    join = call.data[CONF_JOIN]
+    seconds = call.data.get(CONF_SECONDS)
+    since = time.time() - seconds if seconds else 0.0
+    samples = hub.history.query(sigtype, join, since, call.data[CONF_DIRECTION])
+    if samples is None:
+        raise HomeAssistantError(
+            f"no history kept for {sigtype}{join}, add it to history joins")
+    return {
+        "join": f"{sigtype}{join}",
+        "samples": [
+            {"time": dt_util.utc_from_timestamp(stamp).isoformat(), "value": value}
+            for stamp, value in samples
+        ],
+    }
+
+
+async def _async_get_stats(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Handle the get_stats service."""
+    hub = resolve_hub(hass, call.data.get(CONF_HUB))
+    manifest = hass.data[DOMAIN].get(MANIFEST)
+    feedback = hass.data[DOMAIN].get(FEEDBACK_STATS)
+    return {
+        "connected": hub.is_connected(),
+        "queue_depths": hub.queue_depths(),
+        "queue_metrics": hub.queue_metrics(),
+        "failover": hub.failover_status(),
+        "profile": hub.profile_stats(),
+        "history": hub.history.stats(),
+        "tls": hub.tls_status(),
+        "manifest": manifest.stats() if manifest is not None else None,
+        "feedback": feedback.as_dict() if feedback is not None else None,
+    }
+
+
 async def async_setup(hass: HomeAssistant, config:dict):
     """Set up a the crestron component."""
     load_state = False
@@ -77,11 +348,112 @@ async def async_setup(hass: HomeAssistant, config:dict):
         _ip = cip_config.get(CONF_IP)
         _ip_id = cip_config.get(CONF_IP_ID)
         _room_id = cip_config.get(CONF_ROOM_ID)
-        xpanel_client = XPanelClient(
-            hass, _ip, _ip_id, room_id=_room_id, port=_port)
+        ssl_context = None
+        tls = cip_config.get(CONF_TLS)
+        if tls is not None:
+            ssl_context = await hass.async_add_executor_job(
+                lambda: tls_context(
+                    tls[CONF_VERIFY], tls.get(CONF_CA_FILE), tls.get(CONF_CERT_FILE),
+                    tls.get(CONF_KEY_FILE), tls[CONF_CHECK_HOSTNAME]))
+        client_class = ThreadedXPanelClient if cip_config.get(CONF_IO_THREAD) else XPanelClient
+        xpanel_client = client_class(
+            hass, _ip, _ip_id, room_id=_room_id, port=_port,
+            max_queue=cip_config.get(CONF_MAX_QUEUE, 5000),
+            overflow_policy=cip_config.get(CONF_OVERFLOW_POLICY, OVERFLOW_COALESCE),
+            write_buffer_high=cip_config.get(CONF_WRITE_BUFFER_HIGH, 65536),
+            journal_expiry=cip_config.get(CONF_JOURNAL_EXPIRY, 30),
+            standby_endpoints=[
+                (host, port or _port)
+                for host, port in cip_config.get(CONF_STANDBY, [])],
+            ssl_context=ssl_context)
         hass.data[DOMAIN][HUB] = xpanel_client
+        filters = cip_config.get(CONF_FILTERS, {})
+        xpanel_client.inbound_filter.storm_limit = filters.get(CONF_STORM_LIMIT, 0)
+        xpanel_client.inbound_filter.storm_hold = filters.get(CONF_STORM_HOLD, 5)
+        for rule in filters.get(CONF_RULES, []):
+            xpanel_client.inbound_filter.add_rule(
+                rule[CONF_TYPE], rule[CONF_JOIN], debounce=rule[CONF_DEBOUNCE],
+                deadband=rule[CONF_DEADBAND], rate_limit=rule[CONF_RATE_LIMIT])
+        if cip_config.get(CONF_CAPTURE):
+            await hass.async_add_executor_job(
+                xpanel_client.start_capture, cip_config[CONF_CAPTURE])
+        history = cip_config.get(CONF_HISTORY)
+        if history is not None:
+            xpanel_client.history.max_bytes = history[CONF_MAX_MEMORY]
+            for rule in history[CONF_JOINS]:
+                xpanel_client.history.track(
+                    rule[CONF_TYPE], rule[CONF_JOIN], rule[CONF_SIZE],
+                    rule[CONF_DIRECTION])
+        profiling = cip_config.get(CONF_PROFILING)
+        if profiling is not None:
+            xpanel_client.enable_profiling(
+                profiling[CONF_SLOW_CALLBACK], profiling[CONF_TOP],
+                profiling[CONF_LAG_INTERVAL])
         await xpanel_client.start()
         load_state = True
-        for platform in PLATFORMS:
-            load_platform(hass, platform, DOMAIN, None, config)
+
+        async def async_stop_hub(event) -> None:
+            bridge = hass.data[DOMAIN].pop(BRIDGE, None)
+            if bridge is not None:
+                await bridge.async_stop()
+            await xpanel_client.stop()
+            # closing flushes the buffered frames to disk
+            await hass.async_add_executor_job(xpanel_client.stop_capture)
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, async_stop_hub)
+
+        async def async_set_joins(call: ServiceCall) -> None:
+            await _async_set_joins(hass, call)
+
+        hass.services.async_register(
+            DOMAIN, SERVICE_SET_JOINS, async_set_joins, schema=SET_JOINS_SCHEMA)
+
+        async def async_get_stats(call: ServiceCall) -> ServiceResponse:
+            return await _async_get_stats(hass, call)
+
+        hass.services.async_register(
+            DOMAIN, SERVICE_GET_STATS, async_get_stats, schema=GET_STATS_SCHEMA,
+            supports_response=SupportsResponse.ONLY)
+
+        from .websocket_api import async_setup_websocket
+        async_setup_websocket(hass)
+
+        async def async_query_history(call: ServiceCall) -> ServiceResponse:
+            return await _async_query_history(hass, call)
+
+        hass.services.async_register(
+            DOMAIN, SERVICE_QUERY_HISTORY, async_query_history,
+            schema=QUERY_HISTORY_SCHEMA, supports_response=SupportsResponse.ONLY)
+
+        async def async_reload_entities(call: ServiceCall) -> ServiceResponse:
+            return await async_reload(hass)
+
+        hass.services.async_register(
+            DOMAIN, SERVICE_RELOAD, async_reload_entities,
+            supports_response=SupportsResponse.OPTIONAL)
+
+        to_joins = cip_config.get(CONF_TO_JOINS, [])
+        from_joins = cip_config.get(CONF_FROM_JOINS, [])
+        if to_joins or from_joins:
+            hass.data[DOMAIN][BRIDGE] = JoinBridge(
+                hass, xpanel_client, to_joins, from_joins)
+
+        async def async_start_bridge(hass: HomeAssistant) -> None:
+            # a reload before startup finished may have replaced the bridge
+            bridge = hass.data[DOMAIN].get(BRIDGE)
+            if bridge is not None:
+                await bridge.async_start()
+
+        async_at_started(hass, async_start_bridge)
+
+        # manifest devices reach their platforms in one discovery call each
+        manifest = DeviceManifest().compile(cip_config.get(CONF_DEVICES, []))
+        hass.data[DOMAIN][MANIFEST] = manifest
+        platforms = list(PLATFORMS) + [
+            platform for platform in manifest.devices if platform not in PLATFORMS]
+        for platform in platforms:
+            devices = manifest.devices.get(platform)
+            load_platform(
+                hass, platform, DOMAIN,
+                {CONF_DEVICES: devices} if devices else None, config)
     return load_state
\ No newline at end of file
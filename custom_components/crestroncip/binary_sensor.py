@@ -9,6 +9,9 @@ from homeassistant.const import CONF_NAME, CONF_TYPE
 import homeassistant.helpers.config_validation as cv
 from .const import DOMAIN, CONF_IS_ON_FB_JOIN
 from . import XPanelClient, HUB
+from .reload import track_platform
+from .entity import JoinSubscriberMixin
+from .device_manifest import manifest_configs
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 _LOGGER = logging.getLogger(__name__)
@@ -45,11 +48,14 @@ async def async_setup_platform(hass: HomeAssistant, config, async_add_entities:
         hub: XPanelClient = hass.data[DOMAIN][HUB]
         if isinstance(hub,XPanelClient):
             if not callable(hub.online_callback_func):
-                    sensor_list.append(OnlineSensor(hub))
+                async_add_entities([OnlineSensor(hub)])
             if len(config.keys()) > 0:
                 sensor_list.append(BinarySensor(hub, config))
-            
-    async_add_entities(sensor_list)
+            for device in manifest_configs(discovery_info):
+                sensor_list.append(BinarySensor(hub, device))
+
+    track_platform(
+        hass, "binary_sensor", config, async_add_entities, discovery_info)(sensor_list)
 
 
 class OnlineSensor(BinarySensorEntity):
@@ -63,7 +69,7 @@ class OnlineSensor(BinarySensorEntity):
 
     async def async_added_to_hass(self):
         if isinstance(self._hub, XPanelClient):
-            self._attr_is_on = self._hub.connected
+            self._attr_is_on = self._hub.is_connected()
         self.schedule_update_ha_state()
 
     async def async_will_remove_from_hass(self):
@@ -74,7 +80,7 @@ class OnlineSensor(BinarySensorEntity):
         self.schedule_update_ha_state()
 
 
-class BinarySensor(BinarySensorEntity):
+class BinarySensor(JoinSubscriberMixin, BinarySensorEntity):
     def __init__(self, hub: XPanelClient, config):
         self._hub = hub
         self._attr_name = config.get(CONF_NAME)
@@ -83,12 +89,11 @@ class BinarySensor(BinarySensorEntity):
         self._cfg_type = config.get(CONF_TYPE)
         self._attr_device_class = CONF_DEV_CLASS.get(self._cfg_type)
 
-    async def async_added_to_hass(self):
-        await self._hub.register_callback('d', self._join, self.process_callback)
-        self._attr_is_on = bool(self._hub.get_digital(self._join))
+    def join_subscriptions(self):
+        return [('d', self._join, self.process_callback)]
 
-    async def async_will_remove_from_hass(self):
-        await self._hub.remove_callback('d', self._join, self.process_callback)
+    def initial_join_values(self, values):
+        self._attr_is_on = bool(values[('d', self._join)])
 
     def process_callback(self, cbtype, join, value):
         _LOGGER.debug(f'binary sensor value change:{value}')
@@ -0,0 +1,201 @@
+"""Bridge Home Assistant states to joins and joins to scripts."""
+import logging
+
+from homeassistant.core import HomeAssistant, Event, callback, Context
+from homeassistant.const import (
+    CONF_VALUE_TEMPLATE,
+    CONF_ATTRIBUTE,
+    CONF_ENTITY_ID,
+    STATE_ON,
+    STATE_UNKNOWN,
+    STATE_UNAVAILABLE,
+)
+from homeassistant.helpers.event import (
+    TrackTemplate,
+    async_track_template_result,
+    async_track_state_change_event,
+)
+from homeassistant.helpers.script import Script
+from homeassistant.helpers.template import Template
+
+from .cipasync import LANE_BULK
+from .hub import XPanelClient
+from .const import DOMAIN, CONF_JOIN, CONF_SCRIPT, CONF_DEBOUNCE
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def to_join_value(sigtype: str, value):
+    """Convert a state, attribute or template result to a join value, None to skip."""
+    if value is None or value in (STATE_UNKNOWN, STATE_UNAVAILABLE):
+        return None
+    if sigtype == "d":
+        return int(value is True or value == STATE_ON or str(value) == "1")
+    if sigtype == "a":
+        try:
+            return max(0, min(65535, int(float(value))))
+        except (TypeError, ValueError):
+            return None
+    return str(value)
+
+
+class JoinBridge:
+    """Implements the to_joins and from_joins configuration.
+
+    to_joins: entity states/attributes are followed with a state listener
+    filtered to the configured entity ids, templates with one template
+    tracker. Changed values are collected and sent on the next loop
+    iteration as one set_many batch, skipping joins whose value did not
+    change.
+
+    from_joins: a dispatch table maps each (sigtype, join) to its scripts.
+    Values equal to the last one seen, such as the replay after a
+    reconnect, are ignored. A run is started once the join has been quiet
+    for its debounce time, so a burst of changes starts one run with the
+    latest value.
+    """
+
+    def __init__(self, hass: HomeAssistant, hub: XPanelClient, to_joins: list, from_joins: list):
+        self._hass = hass
+        self._hub = hub
+        self._to_joins = to_joins
+        self._from_joins = from_joins
+        # entity_id -> [(sigtype, join, attribute)]
+        self._entity_map: dict[str, list] = {}
+        # template -> [(sigtype, join)]
+        self._template_map: dict[Template, list] = {}
+        self._sent: dict[tuple, object] = {}
+        self._pending: dict[tuple, object] = {}
+        self._flush_scheduled = False
+        # (sigtype, join) -> [scripts, debounce, timer entry, latest value seen]
+        self._dispatch: dict[tuple, list] = {}
+        self._unsubs = []
+
+    async def async_start(self):
+        for entry in self._to_joins:
+            sigtype, join = entry[CONF_JOIN]
+            if CONF_VALUE_TEMPLATE in entry:
+                template = entry[CONF_VALUE_TEMPLATE]
+                self._template_map.setdefault(template, []).append((sigtype, join))
+            elif CONF_ENTITY_ID in entry:
+                self._entity_map.setdefault(entry[CONF_ENTITY_ID], []).append(
+                    (sigtype, join, entry.get(CONF_ATTRIBUTE)))
+        if self._entity_map:
+            self._unsubs.append(async_track_state_change_event(
+                self._hass, list(self._entity_map), self._state_changed))
+        if self._template_map:
+            info = async_track_template_result(
+                self._hass,
+                [TrackTemplate(t, None) for t in self._template_map],
+                self._template_changed)
+            info.async_refresh()
+            self._unsubs.append(info.async_remove)
+
+        subscriptions = []
+        for entry in self._from_joins:
+            key = entry[CONF_JOIN]
+            if key not in self._dispatch:
+                self._dispatch[key] = [[], entry[CONF_DEBOUNCE], None, None]
+                subscriptions.append((key[0], key[1], self._join_changed))
+            name = f"{DOMAIN} {key[0]}{key[1]}"
+            self._dispatch[key][0].append(
+                Script(self._hass, entry[CONF_SCRIPT], name, DOMAIN))
+            self._dispatch[key][1] = max(self._dispatch[key][1], entry[CONF_DEBOUNCE])
+        values = await self._hub.subscribe_many(subscriptions)
+        for (sigtype, join, _), value in zip(subscriptions, values):
+            self._dispatch[(sigtype, join)][3] = value
+        self.async_push_all()
+
+    async def async_stop(self):
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs.clear()
+        for scripts, debounce, entry, value in self._dispatch.values():
+            self._hub.timer.cancel(entry)
+        await self._hub.unsubscribe_many(
+            (key[0], key[1], self._join_changed) for key in self._dispatch)
+
+    @callback
+    def async_push_all(self, *args):
+        """Queue the current value of every to_joins entry."""
+        self._sent.clear()
+        for entity_id, targets in self._entity_map.items():
+            state = self._hass.states.get(entity_id)
+            if state is not None:
+                self._queue_state(state, targets)
+        for template, targets in self._template_map.items():
+            try:
+                result = template.async_render(parse_result=False)
+            except Exception as e:
+                _LOGGER.debug(f"to_joins template err:{e}")
+                continue
+            for sigtype, join in targets:
+                self._queue(sigtype, join, result)
+
+    def _queue_state(self, state, targets):
+        for sigtype, join, attribute in targets:
+            if attribute is None:
+                self._queue(sigtype, join, state.state)
+            else:
+                self._queue(sigtype, join, state.attributes.get(attribute))
+
+    def _queue(self, sigtype, join, value):
+        value = to_join_value(sigtype, value)
+        key = (sigtype, join)
+        if value is None:
+            return
+        if self._sent.get(key) == value:
+            self._pending.pop(key, None)
+            return
+        self._pending[key] = value
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self._hass.loop.call_soon(self._flush)
+
+    def _flush(self):
+        self._flush_scheduled = False
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        batch = {}
+        for (sigtype, join), value in pending.items():
+            try:
+                batch[(sigtype, join)] = self._hub._check_value(sigtype, join, value)
+            except ValueError as e:
+                # only the bad join is skipped, it is retried on its next change
+                _LOGGER.error(f"to_joins: {e}")
+        if not batch:
+            return
+        if self._hub.set_many(
+                ((sigtype, join, value) for (sigtype, join), value in batch.items()),
+                lane=LANE_BULK):
+            self._sent.update(batch)
+
+    @callback
+    def _state_changed(self, event: Event):
+        state = event.data.get("new_state")
+        if state is not None:
+            self._queue_state(state, self._entity_map[event.data["entity_id"]])
+
+    @callback
+    def _template_changed(self, event, updates):
+        for update in updates:
+            for sigtype, join in self._template_map[update.template]:
+                if isinstance(update.result, Exception):
+                    continue
+                self._queue(sigtype, join, update.result)
+
+    def _join_changed(self, sigtype, join, value):
+        slot = self._dispatch.get((sigtype, join))
+        if slot is None or slot[3] == value:
+            return
+        slot[3] = value
+        self._hub.timer.cancel(slot[2])
+        slot[2] = self._hub.timer.call_later(slot[1], self._run_scripts, (sigtype, join))
+
+    def _run_scripts(self, key):
+        slot = self._dispatch[key]
+        slot[2] = None
+        for script in slot[0]:
+            self._hass.async_create_task(
+                script.async_run({"value": slot[3]}, Context()))
@@ -2,18 +2,35 @@
 import binascii
 import logging
 import queue
+import ssl
 import asyncio
-from homeassistant.core import HomeAssistant
+import heapq
+import itertools
+import os
+import struct
+import time
+from array import array
+from collections import deque
 from asyncio import Lock, Transport, Protocol, Future, AbstractEventLoop, Task
 _logger = logging.getLogger(__name__)
 
+# outbound lanes, highest priority first
+LANE_CONTROL = 0  # handshake and heartbeat
+LANE_INTERACTIVE = 1  # user commands from entities
+LANE_BULK = 2  # automation bulk writes
+LANE_RESYNC = 3  # background resync after end-of-query
+LANE_NAMES = ("control", "interactive", "bulk", "resync")
+
 
 class TcpProtocol(Protocol):
 
-    def __init__(self, conn_on_callback, conn_off_callback, receive_callback):
+    def __init__(self, conn_on_callback, conn_off_callback, receive_callback,
+                 pause_callback=None, resume_callback=None):
         self.receive_callback = receive_callback
         self.connect_on_callback = conn_on_callback
         self.connect_off_callback = conn_off_callback
+        self.pause_callback = pause_callback
+        self.resume_callback = resume_callback
 
     def connection_made(self, transport: Transport):
         self.tr = transport
@@ -33,9 +50,854 @@ class TcpProtocol(Protocol):
         if self.connect_off_callback is not None:
             self.connect_off_callback()
 
+    def pause_writing(self):
+        if self.pause_callback is not None:
+            self.pause_callback()
+
+    def resume_writing(self):
+        if self.resume_callback is not None:
+            self.resume_callback()
+
+
+CIP_PORT = 41794
+SECURE_CIP_PORT = 41796
+
+
+class ResumingSSLContext(ssl.SSLContext):
+    """SSL context that offers the last session of a host again.
+
+    asyncio has no way to pass a session to create_connection, but it
+    builds its SSL object through wrap_bio, so the session is supplied
+    there and a reconnect can skip the full handshake.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.sessions = {}
+
+    def wrap_bio(self, incoming, outgoing, server_side=False,
+                 server_hostname=None, session=None):
+        if session is None and not server_side:
+            session = self.sessions.get(server_hostname)
+        return super().wrap_bio(
+            incoming, outgoing, server_side=server_side,
+            server_hostname=server_hostname, session=session)
+
+
+def tls_context(verify: bool = True, ca_file: str = None, cert_file: str = None,
+                key_file: str = None, check_hostname: bool = False) -> ResumingSSLContext:
+    """Build the client context for secure CIP.
+
+    Loads certificate files, so call it outside the event loop.
+    """
+    context = ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = verify and check_hostname
+    if verify:
+        context.verify_mode = ssl.CERT_REQUIRED
+        if ca_file:
+            context.load_verify_locations(ca_file)
+        else:
+            context.load_default_certs()
+    else:
+        context.verify_mode = ssl.CERT_NONE
+    if cert_file:
+        context.load_cert_chain(cert_file, key_file)
+    return context
+
+
+OVERFLOW_COALESCE = "coalesce"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_REJECT = "reject"
+OVERFLOW_POLICIES = (OVERFLOW_COALESCE, OVERFLOW_DROP_OLDEST, OVERFLOW_REJECT)
+
+
+class TxLanes:
+    """Prioritised, bounded outbound packet queue with the queue.Queue put/get API.
+
+    Control packets always go first. The other lanes are drained by
+    weighted round robin: each round takes up to LANE_WEIGHTS[lane]
+    packets from each lane in priority order, so an interactive command
+    waits for at most one round of bulk/resync packets.
+
+    Each lane holds at most maxsize packets. With the coalesce policy a
+    packet put with a key replaces the queued packet with the same key in
+    place, and a full lane drops its oldest packet like drop_oldest;
+    reject drops the new packet instead. A keyed packet always cancels
+    the same key waiting in lower lanes, so a stale resync value is never
+    sent after a newer command; an unkeyed frame carrying several joins
+    names their keys in supersedes for the same effect.
+    """
+
+    LANE_WEIGHTS = (0, 8, 2, 1)
+
+    def __init__(self, maxsize: int = 0, policy: str = OVERFLOW_COALESCE):
+        self.maxsize = maxsize
+        self.policy = policy
+        # lane entries are [tx, key] lists so coalescing can replace tx in place
+        self._lanes = tuple(deque() for _ in LANE_NAMES)
+        self._keys = tuple({} for _ in LANE_NAMES)
+        self._lane = LANE_INTERACTIVE
+        self._credit = self.LANE_WEIGHTS[LANE_INTERACTIVE]
+        self.coalesced = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.high_water = [0 for _ in LANE_NAMES]
+
+    def put(self, tx, lane: int = LANE_CONTROL, key=None, supersedes=()) -> bool:
+        """Queue tx, returning False if it was rejected."""
+        queue = self._lanes[lane]
+        keys = self._keys[lane]
+        for stale_key in supersedes:
+            self._supersede(lane, stale_key)
+        if key is not None:
+            self._supersede(lane, key)
+            if self.policy == OVERFLOW_COALESCE:
+                entry = keys.get(key)
+                if entry is not None:
+                    entry[0] = tx
+                    self.coalesced += 1
+                    return True
+        if self.maxsize and len(queue) >= self.maxsize:
+            if self.policy == OVERFLOW_REJECT:
+                self.rejected += 1
+                return False
+            self._forget(lane, queue.popleft())
+            self.dropped += 1
+        entry = [tx, key]
+        queue.append(entry)
+        if key is not None:
+            keys[key] = entry
+        if len(queue) > self.high_water[lane]:
+            self.high_water[lane] = len(queue)
+        return True
+
+    def _supersede(self, lane: int, key):
+        # a newer value supersedes the same join waiting in a lower lane
+        for lower in range(lane + 1, len(self._lanes)):
+            stale = self._keys[lower].pop(key, None)
+            if stale is not None:
+                self._remove(lower, stale)
+
+    def _remove(self, lane: int, entry: list):
+        # by identity, an equal older packet of the join may be queued too
+        queue = self._lanes[lane]
+        for index, queued in enumerate(queue):
+            if queued is entry:
+                del queue[index]
+                return
+
+    def _forget(self, lane: int, entry: list):
+        if entry[1] is not None and self._keys[lane].get(entry[1]) is entry:
+            del self._keys[lane][entry[1]]
+
+    def empty(self) -> bool:
+        return not any(self._lanes)
+
+    def qsize(self) -> int:
+        return sum(len(lane) for lane in self._lanes)
+
+    def depths(self) -> dict:
+        return {name: len(lane) for name, lane in zip(LANE_NAMES, self._lanes)}
+
+    def metrics(self) -> dict:
+        return {
+            "policy": self.policy,
+            "maxsize": self.maxsize,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "high_water": dict(zip(LANE_NAMES, self.high_water)),
+        }
+
+    def get(self):
+        """Pop the next packet, raising IndexError when every lane is empty."""
+        if self._lanes[LANE_CONTROL]:
+            return self._pop(LANE_CONTROL)
+        for _ in range(len(self._lanes)):
+            lane = self._lanes[self._lane]
+            if lane and self._credit > 0:
+                self._credit -= 1
+                return self._pop(self._lane)
+            self._next_lane()
+        raise IndexError("tx lanes are empty")
+
+    def _pop(self, lane: int):
+        entry = self._lanes[lane].popleft()
+        self._forget(lane, entry)
+        return entry[0]
+
+    def _next_lane(self):
+        self._lane += 1
+        if self._lane >= len(self._lanes):
+            self._lane = LANE_INTERACTIVE
+        self._credit = self.LANE_WEIGHTS[self._lane]
+
+    def clear(self):
+        for lane, keys in zip(self._lanes, self._keys):
+            lane.clear()
+            keys.clear()
+
+
+class OfflineJournal:
+    """Outbound joins set while the client is not registered.
+
+    Analog, serial and digital level joins keep only their latest value;
+    button and pulse digitals are kept in order and expire after expiry
+    seconds. drain() returns everything still valid, ready to be sent as
+    one batch once end-of-query completes.
+    """
+
+    def __init__(self, maxsize: int = 5000, expiry: float = 30.0):
+        self.maxsize = maxsize
+        self.expiry = expiry
+        self._latest = {}
+        self._pulses = deque(maxlen=maxsize or None)
+        self.recorded = 0
+        self.replayed = 0
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._latest) + len(self._pulses)
+
+    def record(self, sigtype, join, value):
+        self.recorded += 1
+        if sigtype in ("db", "dp"):
+            self._pulses.append((time.monotonic(), sigtype, join, value))
+            return
+        key = (sigtype, join)
+        if key not in self._latest and self.maxsize and len(self._latest) >= self.maxsize:
+            self._latest.pop(next(iter(self._latest)))
+        self._latest[key] = value
+
+    def drain(self) -> list:
+        entries = [(sigtype, join, value)
+                   for (sigtype, join), value in self._latest.items()]
+        deadline = time.monotonic() - self.expiry
+        for stamp, sigtype, join, value in self._pulses:
+            if stamp >= deadline:
+                entries.append((sigtype, join, value))
+            else:
+                self.expired += 1
+        self._latest.clear()
+        self._pulses.clear()
+        self.replayed += len(entries)
+        return entries
+
+
+# Append-only capture file of raw CIP frames.
+#
+# A capture starts with an 8 byte header, the magic b"CIPCAP" and a big
+# endian u16 version. Each record is a 13 byte header followed by the
+# frame as it went over the wire:
+#
+#   f64  monotonic timestamp in seconds
+#   u8   direction, 0 inbound from the processor, 1 outbound
+#   u32  length of the frame
+CAPTURE_MAGIC = b"CIPCAP"
+CAPTURE_VERSION = 1
+CAPTURE_IN = 0
+CAPTURE_OUT = 1
+
+_CAPTURE_HEADER = struct.Struct(">6sH")
+_CAPTURE_RECORD = struct.Struct(">dBI")
+
+
+class CaptureWriter:
+    """Write frames to a capture file, appending when it already exists."""
+
+    def __init__(self, path: str, clock=time.monotonic):
+        self.path = path
+        self._clock = clock
+        self.records = 0
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "ab")
+        if new:
+            self._file.write(_CAPTURE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION))
+
+    def write(self, direction: int, data: bytes):
+        self._file.write(_CAPTURE_RECORD.pack(self._clock(), direction, len(data)))
+        self._file.write(data)
+        self.records += 1
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def read_capture(path: str):
+    """Yield (timestamp, direction, frame) for every record of a capture."""
+    with open(path, "rb") as file:
+        header = file.read(_CAPTURE_HEADER.size)
+        if len(header) < _CAPTURE_HEADER.size:
+            raise ValueError(f"{path}: not a CIP capture")
+        magic, version = _CAPTURE_HEADER.unpack(header)
+        if magic != CAPTURE_MAGIC or version > CAPTURE_VERSION:
+            raise ValueError(f"{path}: not a CIP capture or unsupported version")
+        while True:
+            head = file.read(_CAPTURE_RECORD.size)
+            if not head:
+                return
+            if len(head) < _CAPTURE_RECORD.size:
+                _logger.warning(f"{path}: truncated record header")
+                return
+            timestamp, direction, length = _CAPTURE_RECORD.unpack(head)
+            data = file.read(length)
+            if len(data) < length:
+                _logger.warning(f"{path}: truncated record")
+                return
+            yield timestamp, direction, data
+
+
+class SharedTimer:
+    """One loop timer multiplexing many deadlines.
+
+    Entities schedule callbacks here instead of each running its own task
+    or timer handle; only the earliest deadline is armed on the loop.
+    """
+
+    def __init__(self, loop: AbstractEventLoop = None):
+        self._loop = loop
+        self._heap = []
+        self._counter = itertools.count()
+        self._handle: asyncio.TimerHandle | None = None
+        self._armed_at = None
+
+    def _get_loop(self) -> AbstractEventLoop:
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        return self._loop
+
+    def time(self) -> float:
+        return self._get_loop().time()
+
+    def call_at(self, when: float, callback, *args) -> list:
+        """Run callback(*args) at loop time when, return a cancellable entry."""
+        entry = [when, next(self._counter), callback, args]
+        heapq.heappush(self._heap, entry)
+        if self._armed_at is None or when < self._armed_at:
+            self._arm()
+        return entry
+
+    def call_later(self, delay: float, callback, *args) -> list:
+        return self.call_at(self.time() + delay, callback, *args)
+
+    @staticmethod
+    def cancel(entry: list | None):
+        if entry is not None:
+            entry[2] = None
+
+    def _arm(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+            self._armed_at = None
+        while self._heap and self._heap[0][2] is None:
+            heapq.heappop(self._heap)
+        if self._heap:
+            self._armed_at = self._heap[0][0]
+            self._handle = self._get_loop().call_at(self._armed_at, self._fire)
+
+    def _fire(self):
+        self._handle = None
+        self._armed_at = None
+        now = self.time()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, callback, args = heapq.heappop(self._heap)
+            if callback is None:
+                continue
+            try:
+                callback(*args)
+            except Exception as e:
+                _logger.error(f"shared timer callback err:{e}")
+        self._arm()
+
+
+class _JoinFilterState:
+    __slots__ = ("last", "held", "entry", "last_time",
+                 "window_start", "count", "tripped_until")
+
+    def __init__(self):
+        self.last = None
+        self.held = None
+        self.entry = None
+        self.last_time = None
+        self.window_start = 0.0
+        self.count = 0
+        self.tripped_until = 0.0
+
+
+class _JoinFilterRule:
+    __slots__ = ("debounce", "deadband", "rate_limit")
+
+    def __init__(self, debounce=0.0, deadband=0, rate_limit=0.0):
+        self.debounce = debounce
+        self.deadband = deadband
+        self.rate_limit = rate_limit
+
+
+class InboundFilter:
+    """Filter chain run on inbound joins before they are dispatched.
+
+    Per-join rules give digital debounce (value must be stable for
+    debounce seconds), analog deadband and a rate limit (at most one value
+    per rate_limit seconds, the latest wins). The storm guard applies to
+    every join: a join changing more than storm_limit times in a second is
+    logged and throttled to one value per second until it has been quiet
+    for storm_hold seconds. Held values are released on the shared timer.
+    """
+
+    def __init__(self, timer: SharedTimer, deliver, storm_limit: int = 0, storm_hold: float = 5.0):
+        self._timer = timer
+        self._deliver = deliver
+        self.storm_limit = storm_limit
+        self.storm_hold = storm_hold
+        self._rules = {"d": {}, "a": {}, "s": {}}
+        self._states = {}
+        self.storm_trips = 0
+
+    @property
+    def active(self) -> bool:
+        return bool(self.storm_limit or self._rules["d"]
+                    or self._rules["a"] or self._rules["s"])
+
+    def add_rule(self, sigtype, joins, debounce=0.0, deadband=0, rate_limit=0.0):
+        rule = _JoinFilterRule(debounce, deadband, rate_limit)
+        for join in joins:
+            self._rules[sigtype][join] = rule
+
+    def process(self, sigtype, join, value):
+        rule = self._rules[sigtype].get(join)
+        if rule is None and not self.storm_limit:
+            self._deliver(sigtype, join, value)
+            return
+        key = (sigtype, join)
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _JoinFilterState()
+        now = self._timer.time()
+
+        if self.storm_limit:
+            if now - state.window_start >= 1.0:
+                state.window_start = now
+                state.count = 0
+            state.count += 1
+            if state.count > self.storm_limit:
+                if state.tripped_until <= now:
+                    self.storm_trips += 1
+                    _logger.warning(
+                        f"join storm: {sigtype}{join} above {self.storm_limit} changes/s, throttling")
+                state.tripped_until = now + self.storm_hold
+            if state.tripped_until > now:
+                self._hold(key, state, value, 1.0, now)
+                return
+
+        if rule is not None:
+            if rule.deadband and sigtype == "a" and state.last is not None \
+                    and abs(value - state.last) < rule.deadband:
+                return
+            if rule.debounce and sigtype == "d":
+                self._timer.cancel(state.entry)
+                state.entry = None
+                if value == state.last:
+                    # bounced back before it settled
+                    return
+                state.held = value
+                state.entry = self._timer.call_later(
+                    rule.debounce, self._release, key, state)
+                return
+            if rule.rate_limit:
+                self._hold(key, state, value, rule.rate_limit, now)
+                return
+        self._pass(key, state, value, now)
+
+    def _hold(self, key, state, value, interval, now):
+        """Deliver now if interval has passed since the last value, else hold it."""
+        if state.entry is None and (state.last_time is None or now - state.last_time >= interval):
+            self._pass(key, state, value, now)
+            return
+        state.held = value
+        if state.entry is None:
+            state.entry = self._timer.call_at(
+                state.last_time + interval, self._release, key, state)
+
+    def _release(self, key, state):
+        state.entry = None
+        self._pass(key, state, state.held, self._timer.time())
+
+    def _pass(self, key, state, value, now):
+        state.last = value
+        state.last_time = now
+        self._deliver(key[0], key[1], value)
+
+
+# memory charged per slot of a serial ring, the strings are shared objects
+SERIAL_SLOT_BYTES = 64
+
+
+class JoinRing:
+    """Fixed-size ring of (timestamp, value) samples for one join."""
+
+    __slots__ = ("times", "values", "size", "next", "count")
+
+    def __init__(self, size: int, serial: bool = False):
+        self.size = size
+        self.times = array("d", bytes(8 * size))
+        self.values = [""] * size if serial else array("H", bytes(2 * size))
+        self.next = 0
+        self.count = 0
+
+    @property
+    def nbytes(self) -> int:
+        if isinstance(self.values, list):
+            return self.size * (8 + SERIAL_SLOT_BYTES)
+        return self.size * (8 + self.values.itemsize)
+
+    def append(self, timestamp: float, value):
+        self.times[self.next] = timestamp
+        self.values[self.next] = value
+        self.next = (self.next + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def samples(self, since: float = 0.0) -> list:
+        """Return samples newer than since, oldest first."""
+        first = (self.next - self.count) % self.size
+        result = []
+        for offset in range(self.count):
+            index = (first + offset) % self.size
+            if self.times[index] >= since:
+                result.append((self.times[index], self.values[index]))
+        return result
+
+
+class JoinHistory:
+    """Per-join history rings kept next to the join store.
+
+    Only joins named by track() get a ring. Rings are preallocated when a
+    join first changes and refused once max_bytes would be exceeded, so
+    memory use is fixed and known up front.
+    """
+
+    def __init__(self, max_bytes: int = 1048576, clock=time.time):
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._sizes = {}
+        self._rings = {}
+        self.nbytes = 0
+        self.refused = 0
+
+    @property
+    def active(self) -> bool:
+        return bool(self._sizes)
+
+    def track(self, sigtype, joins, size: int, direction: str = "in"):
+        for join in joins:
+            self._sizes[(direction, sigtype, join)] = size
+
+    def record(self, direction, sigtype, join, value):
+        key = (direction, sigtype, join)
+        ring = self._rings.get(key)
+        if ring is None:
+            size = self._sizes.get(key)
+            if size is None:
+                return
+            ring = JoinRing(size, sigtype == "s")
+            if self.nbytes + ring.nbytes > self.max_bytes:
+                # remember the refusal so the join is not retried each time
+                self._sizes.pop(key)
+                self.refused += 1
+                _logger.warning(
+                    f"history memory cap reached, not keeping {direction} {sigtype}{join}")
+                return
+            self._rings[key] = ring
+            self.nbytes += ring.nbytes
+        ring.append(self._clock(), value)
+
+    def query(self, sigtype, join, since: float = 0.0, direction: str = "in") -> list | None:
+        """Return (timestamp, value) samples, None when the join is not kept."""
+        ring = self._rings.get((direction, sigtype, join))
+        if ring is None:
+            return [] if (direction, sigtype, join) in self._sizes else None
+        return ring.samples(since)
+
+    def stats(self) -> dict:
+        return {
+            "joins": len(self._rings),
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+            "refused": self.refused,
+        }
+
+
+def _callback_owner(callback) -> str:
+    """Name a join callback by its entity, falling back to the function."""
+    owner = getattr(callback, "__self__", None)
+    entity_id = getattr(owner, "entity_id", None)
+    if entity_id:
+        return entity_id
+    return getattr(callback, "__qualname__", repr(callback))
+
+
+class CallbackProfiler:
+    """Time join callbacks and dispatch passes.
+
+    Time is attributed per callback owner and join. A call slower than
+    threshold seconds is logged when it is the worst seen for that key,
+    so a steadily slow entity warns once instead of on every update.
+    """
+
+    def __init__(self, threshold: float = 0.01, top: int = 10):
+        self.threshold = threshold
+        self.top_n = top
+        # (owner, sigtype, join) -> [calls, total, worst, slow calls]
+        self._stats = {}
+        self.passes = 0
+        self.pass_total = 0.0
+        self.pass_worst = 0.0
+
+    def run(self, callback, sigtype, join, value):
+        start = time.perf_counter()
+        try:
+            callback(sigtype, join, value)
+        finally:
+            elapsed = time.perf_counter() - start
+            key = (_callback_owner(callback), sigtype, join)
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = [0, 0.0, 0.0, 0]
+            stats[0] += 1
+            stats[1] += elapsed
+            if elapsed > self.threshold:
+                stats[3] += 1
+                if elapsed > stats[2]:
+                    _logger.warning(
+                        f"slow join callback {key[0]} on {sigtype}{join}: "
+                        f"{elapsed * 1000:.1f} ms")
+            if elapsed > stats[2]:
+                stats[2] = elapsed
+
+    def record_pass(self, elapsed: float):
+        """Account one dispatch pass of the event queue."""
+        self.passes += 1
+        self.pass_total += elapsed
+        if elapsed > self.pass_worst:
+            self.pass_worst = elapsed
+
+    def top(self, count: int = None) -> list:
+        """Return the callbacks with the most total time, worst first."""
+        ranked = sorted(
+            self._stats.items(), key=lambda item: item[1][1], reverse=True)
+        return [
+            {
+                "callback": owner,
+                "join": f"{sigtype}{join}",
+                "calls": calls,
+                "total_ms": round(total * 1000, 3),
+                "worst_ms": round(worst * 1000, 3),
+                "slow_calls": slow,
+            }
+            for (owner, sigtype, join), (calls, total, worst, slow)
+            in ranked[:count or self.top_n]
+        ]
+
+    def reset(self):
+        self._stats.clear()
+        self.passes = 0
+        self.pass_total = 0.0
+        self.pass_worst = 0.0
+
+
+class LoopLagProbe:
+    """Measure how late the event loop runs a timer due every interval."""
+
+    def __init__(self, timer: "SharedTimer", interval: float = 1.0):
+        self._timer = timer
+        self.interval = interval
+        self.samples = 0
+        self.last = 0.0
+        self.worst = 0.0
+        self.total = 0.0
+        self._due = None
+        self._entry = None
+
+    def start(self):
+        self._due = self._timer.time() + self.interval
+        self._entry = self._timer.call_at(self._due, self._tick)
+
+    def stop(self):
+        self._timer.cancel(self._entry)
+        self._entry = None
+
+    def _tick(self):
+        now = self._timer.time()
+        self.last = max(0.0, now - self._due)
+        self.samples += 1
+        self.total += self.last
+        if self.last > self.worst:
+            self.worst = self.last
+        self._due = now + self.interval
+        self._entry = self._timer.call_at(self._due, self._tick)
+
+    def stats(self) -> dict:
+        return {
+            "samples": self.samples,
+            "last_ms": round(self.last * 1000, 3),
+            "mean_ms": round(self.total / self.samples * 1000, 3) if self.samples else 0.0,
+            "worst_ms": round(self.worst * 1000, 3),
+        }
+
 
-class XPanelClient:
-    """Facilitate communications with a Crestron control processor via CIP."""
+CIP_HEARTBEAT = b"\x0D\x00\x02\x00\x00"
+CIP_UPDATE_REQUEST = b"\x05\x00\x05\x00\x00\x02\x03\x00"
+CIP_END_OF_QUERY_ACK = b"\x05\x00\x05\x00\x00\x02\x03\x1d"
+HEARTBEAT_INTERVAL = 15
+# the serial packet length lives in one header byte: 8 + text <= 255
+MAX_SERIAL_LENGTH = 247
+
+
+# a newer analog or serial value replaces a queued one; digitals are not
+# keyed so a quick on/off written by the user is sent as two packets
+KEYED_SIGTYPES = ("a", "s")
+
+
+def tx_keys(entries) -> list:
+    """Return the tx lane keys of the (sigtype, join, value) entries."""
+    return [(sigtype, join) for sigtype, join, _ in entries
+            if sigtype in KEYED_SIGTYPES]
+
+
+def split_packets(rx: bytes):
+    """Yield (ciptype, payload) for every complete CIP packet in rx."""
+    position = 0
+    length = len(rx)
+    while position < length:
+        if (length - position) < 4:
+            _logger.warning("Packet is too short")
+            break
+
+        payload_length = (
+            rx[position + 1] << 8) + rx[position + 2]
+        packet_length = payload_length + 3
+
+        if (length - position) < packet_length:
+            _logger.warning("Packet length mismatch")
+            break
+
+        yield rx[position], rx[position + 3: position + 3 + payload_length]
+        position += packet_length
+
+
+def complete_length(rx: bytes) -> int:
+    """Return how many leading bytes of rx are complete CIP packets."""
+    position = 0
+    length = len(rx)
+    while length - position >= 3:
+        packet_length = ((rx[position + 1] << 8) + rx[position + 2]) + 3
+        if length - position < packet_length:
+            break
+        position += packet_length
+    return position
+
+
+# a partial packet is never longer than this, anything bigger is garbage
+MAX_PENDING_RX = 65536
+
+
+class StandbyLink:
+    """Registered, heartbeating CIP session kept warm on a spare endpoint.
+
+    The standby only answers the handshake and ignores join data, so the
+    client can adopt its transport the moment the active one is lost
+    instead of reconnecting from scratch.
+    """
+
+    def __init__(self, client: "CIPClient", index: int):
+        self._client = client
+        self.index = index
+        self.host, self.port = client.endpoints[index]
+        self.ready = False
+        self.alive = False
+        self.transport: Transport | None = None
+        self.protocol: TcpProtocol | None = None
+        self._heartbeat_entry = None
+
+    async def connect(self):
+        self.transport, self.protocol = await self._client._open_connection(
+            lambda: TcpProtocol(None, self._lost, self._receive),
+            self.host, self.port)
+        self.alive = True
+        self._heartbeat_entry = self._client._io_timer.call_later(
+            HEARTBEAT_INTERVAL, self._heartbeat)
+
+    def _write(self, tx: bytes):
+        try:
+            self.transport.write(tx)
+        except Exception as e:
+            _logger.debug(f"standby {self.host}:{self.port} send err:{e}")
+            self.close()
+
+    def _heartbeat(self):
+        if not self.alive:
+            return
+        self._write(CIP_HEARTBEAT)
+        self._heartbeat_entry = self._client._io_timer.call_later(
+            HEARTBEAT_INTERVAL, self._heartbeat)
+
+    def _receive(self, rx: bytes):
+        for ciptype, payload in split_packets(rx):
+            if ciptype == 0x0F:
+                self._write(self._client._registration_packet())
+            elif ciptype in (0x02, 0x27):
+                if payload[0:4] == b"\x00\x00\x00\x1f":
+                    self._write(CIP_UPDATE_REQUEST)
+                else:
+                    _logger.error(
+                        f"standby {self.host}:{self.port} registration failed")
+                    self.close()
+            elif ciptype == 0x05 and len(payload) > 4 and payload[3] == 0x03 \
+                    and payload[4] == 0x1C:
+                self._write(CIP_END_OF_QUERY_ACK)
+                if not self.ready:
+                    _logger.info(f"standby {self.host}:{self.port} ready")
+                self.ready = True
+            elif ciptype == 0x03:
+                self.close()
+            # join data is ignored, the active connection owns the store
+
+    def _lost(self):
+        if self.alive:
+            _logger.warning(f"standby {self.host}:{self.port} lost")
+        self.alive = False
+        self.ready = False
+        self._client._io_timer.cancel(self._heartbeat_entry)
+
+    def detach(self):
+        """Hand the transport and protocol over to the client."""
+        self.alive = False
+        self.ready = False
+        self._client._io_timer.cancel(self._heartbeat_entry)
+        transport, protocol = self.transport, self.protocol
+        self.transport = self.protocol = None
+        return transport, protocol
+
+    def close(self):
+        self._lost()
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+
+
+class CIPClient:
+    """Facilitate communications with a Crestron control processor via CIP.
+
+    Plain asyncio, no Home Assistant imports. Tasks are started through
+    create_task(coro, name) and inbound joins are announced through
+    fire_event(event_type, data); both default to asyncio and a no-op so
+    tools and benchmarks can drive the client directly.
+    """
 
     _cip_packet = {
         "d": b"\x05\x00\x06\x00\x00\x03\x00",  # standard digital join
@@ -45,12 +907,33 @@ class XPanelClient:
         "s": b"\x12\x00\x00\x00\x00\x00\x00\x34",  # serial join
     }
 
-    def __init__(self, hass: HomeAssistant, host: str, ip_id: int, room_id: str = "", port: int = 41794, timeout: int = 2):
+    def __init__(self, host: str, ip_id: int, room_id: str = "", port: int = CIP_PORT, timeout: int = 2,
+                 max_queue: int = 5000, overflow_policy: str = OVERFLOW_COALESCE, write_buffer_high: int = 65536,
+                 journal_expiry: float = 30.0, standby_endpoints=(), loop: AbstractEventLoop = None,
+                 create_task=None, fire_event=None, ssl_context: ssl.SSLContext = None):
         """Set up CIP client instance."""
-        self.hass = hass
+        self._ssl_context = ssl_context
+        self._rx_pending = b""
+        self._tls_handshakes = 0
+        self._tls_resumed = 0
+        self._loop = loop
+        self._create_task = create_task
+        self._fire_event = fire_event
+        self.capture: CaptureWriter | None = None
+        self.profiler: CallbackProfiler | None = None
+        self.lag_probe: LoopLagProbe | None = None
+        self.history = JoinHistory()
+        # called with (sigtype, join, value) for every dispatched inbound join
+        self._observers = []
         self.host = host
         self.ip_id = ip_id.to_bytes(length=1, byteorder="big")
         self.port = port
+        # first entry is the configured processor, the rest are spares
+        self.endpoints = [(host, port), *standby_endpoints]
+        self._active = 0
+        self._standby: StandbyLink | None = None
+        self._standby_task: Task | None = None
+        self._failovers = 0
         self.room_id = str.upper(room_id)
         self._timeout = timeout
         self._stop_connection = False
@@ -60,9 +943,15 @@ class XPanelClient:
         self._restart_lock = Lock()
         self.buttons_pressed = {}
         self._buttons_lock = Lock()
-        self._tx_queue = queue.Queue()
-        self._event_queue = queue.Queue()
-        self._loop: AbstractEventLoop
+        self._tx_queue = TxLanes(max_queue, overflow_policy)
+        self._event_queue = queue.Queue(max_queue * 4)
+        self._events_dropped = {"in": 0, "out": 0}
+        self._write_buffer_high = write_buffer_high
+        self._write_paused = False
+        self._write_pauses = 0
+        # registered and end-of-query done, outbound joins can be sent
+        self._ready = False
+        self._journal = OfflineJournal(max_queue, journal_expiry)
         self._tcp_cli: TcpProtocol
         self._transport: Transport
         self._check_conn_task: Task
@@ -73,6 +962,10 @@ class XPanelClient:
             "out": {"d": {}, "a": {}, "s": {}},
         }
         self._callbacks = set()
+        # protocol timers run where the I/O runs, self.timer is for callers
+        self._io_timer = SharedTimer(loop)
+        self.timer = self._io_timer
+        self.inbound_filter = InboundFilter(self._io_timer, self._deliver_inbound)
         self._sync_all_joins_callback = None
         self._available = False
         self.online_callback_func = None
@@ -80,100 +973,368 @@ class XPanelClient:
 
     async def stop(self):
         """Stop the CIP client instance."""
-        if self._transport is not None:
+        if getattr(self, "_transport", None) is not None:
             async with self._send_lock:
                 self._stop_connection = True
                 _logger.info('stop cip client')
                 await asyncio.sleep(1)
                 self._send_msg_task.cancel()
                 self._check_conn_task.cancel()
+                if self._standby_task is not None:
+                    self._standby_task.cancel()
+                if self._standby is not None:
+                    self._standby.close()
                 self._transport.close()
+                if self.lag_probe is not None:
+                    self.lag_probe.stop()
+
+    def enable_profiling(self, threshold: float = 0.01, top: int = 10,
+                         lag_interval: float = 1.0):
+        """Time join callbacks and probe event loop lag."""
+        self.profiler = CallbackProfiler(threshold, top)
+        if self.lag_probe is not None:
+            self.lag_probe.stop()
+        self.lag_probe = LoopLagProbe(self.timer, lag_interval)
+        self.lag_probe.start()
+
+    def profile_stats(self) -> dict | None:
+        """Return dispatch timing, the slowest callbacks and loop lag."""
+        profiler = self.profiler
+        if profiler is None:
+            return None
+        return {
+            "dispatch_passes": profiler.passes,
+            "dispatch_mean_ms": round(
+                profiler.pass_total / profiler.passes * 1000, 3) if profiler.passes else 0.0,
+            "dispatch_worst_ms": round(profiler.pass_worst * 1000, 3),
+            "slowest_callbacks": profiler.top(),
+            "loop_lag": self.lag_probe.stats(),
+        }
+
+    def start_capture(self, path: str):
+        """Record every inbound and outbound frame to a capture file."""
+        self.stop_capture()
+        self.capture = CaptureWriter(path)
+        _logger.info(f"capturing CIP traffic to {path}")
+
+    def stop_capture(self):
+        """Flush and close the capture file, call it outside the event loop."""
+        capture, self.capture = self.capture, None
+        if capture is not None:
+            _logger.info(f"captured {capture.records} frames to {capture.path}")
+            capture.close()
+
+    @property
+    def loop(self) -> AbstractEventLoop:
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        return self._loop
+
+    def create_task(self, coro, name: str) -> Task:
+        if self._create_task is not None:
+            return self._create_task(coro, name)
+        return self.loop.create_task(coro, name=name)
 
     async def start(self):
         # asyncio.create_task(self._create_conn())
         await self._create_conn()
-        self._check_conn_task = self.hass.async_create_background_task(
+        self._check_conn_task = self.create_task(
             self._check_conn_state(), 'check_conn')
-        self._send_msg_task = self.hass.async_create_background_task(
+        self._send_msg_task = self.create_task(
             self._send_queue(), 'send_msg')
-        self.send_event_task = self.hass.async_create_background_task(
+        self.send_event_task = self.create_task(
             self._start_event(), 'send_event')
+        if len(self.endpoints) > 1:
+            self._standby_task = self.create_task(
+                self._keep_standby(), 'keep_standby')
 
     async def _create_conn(self):
         """Start the YeeLight client instance."""
-        self._loop = self.hass.loop
         if not self.connected:
-            self._transport, self._tcp_cli = await self._loop.create_connection(
+            host, port = self.endpoints[self._active]
+            self._transport, self._tcp_cli = await self._open_connection(
                 lambda: TcpProtocol(self._conn_online, self._conn_offline,
-                                    self._handle_incoming_message),
-                self.host, self.port)
+                                    self._handle_incoming_message,
+                                    self._pause_writing, self._resume_writing),
+                host, port)
+            self._transport.set_write_buffer_limits(high=self._write_buffer_high)
+
+    async def _open_connection(self, protocol_factory, host: str, port: int):
+        """Connect plain or, with an ssl_context, as secure CIP."""
+        context = self._ssl_context
+        if context is None:
+            return await self.loop.create_connection(protocol_factory, host, port)
+        transport, protocol = await self.loop.create_connection(
+            protocol_factory, host, port, ssl=context, server_hostname=host,
+            ssl_handshake_timeout=self._timeout * 5)
+        self._tls_handshakes += 1
+        ssl_object = transport.get_extra_info("ssl_object")
+        if ssl_object is not None and ssl_object.session_reused:
+            self._tls_resumed += 1
+        self._remember_tls_session(transport, host)
+        return transport, protocol
+
+    def _remember_tls_session(self, transport, host: str):
+        """Keep the session of a secure connection for the next reconnect.
+
+        TLS 1.3 tickets arrive after the handshake, so this runs again
+        once the processor has sent end-of-query.
+        """
+        ssl_object = transport.get_extra_info("ssl_object") if transport else None
+        if ssl_object is not None and ssl_object.session is not None:
+            self._ssl_context.sessions[host] = ssl_object.session
+
+    def tls_status(self) -> dict:
+        """Return whether secure CIP is used and how often it resumed."""
+        return {
+            "enabled": self._ssl_context is not None,
+            "handshakes": self._tls_handshakes,
+            "resumed": self._tls_resumed,
+        }
+
+    async def _keep_standby(self):
+        """Keep a registered session open on the next spare endpoint."""
+        while not self._stop_connection:
+            standby = self._standby
+            if self.connected and (standby is None or not standby.alive):
+                index = (self._active + 1) % len(self.endpoints)
+                standby = StandbyLink(self, index)
+                try:
+                    await standby.connect()
+                    self._standby = standby
+                except Exception as e:
+                    _logger.debug(
+                        f"standby {standby.host}:{standby.port} connect err:{e}")
+                    await asyncio.sleep(10)
+            await asyncio.sleep(1)
+
+    def _promote_standby(self) -> bool:
+        """Adopt the warm standby as the active connection.
+
+        Returns False when no registered standby is available, the caller
+        then falls back to reconnecting.
+        """
+        standby = self._standby
+        if self._stop_connection or standby is None or not standby.ready:
+            return False
+        self._standby = None
+        self._close_transport()
+        self._transport, self._tcp_cli = standby.detach()
+        self._tcp_cli.connect_on_callback = self._conn_online
+        self._tcp_cli.connect_off_callback = self._conn_offline
+        self._tcp_cli.receive_callback = self._handle_incoming_message
+        self._tcp_cli.pause_callback = self._pause_writing
+        self._tcp_cli.resume_callback = self._resume_writing
+        self._transport.set_write_buffer_limits(high=self._write_buffer_high)
+        self._active = standby.index
+        self._failovers += 1
+        self._write_paused = False
+        # a partial frame of the old connection must not prefix the new one
+        self._rx_pending = b""
+        self._restart_connection = False
+        self.connected = True
+        self._ready = True
+        self._link_changed()
+        _logger.warning(f"failed over to {standby.host}:{standby.port}")
+        # the standby ignored join data, ask for a full update; its
+        # end-of-query replays the journal and resyncs outbound joins
+        self._tx_queue.put(CIP_UPDATE_REQUEST)
+        return True
+
+    def _close_transport(self):
+        """Close the active transport without it reporting back."""
+        if getattr(self, "_tcp_cli", None) is not None:
+            self._tcp_cli.connect_off_callback = None
+            self._tcp_cli.receive_callback = None
+        if getattr(self, "_transport", None) is not None:
+            try:
+                self._transport.close()
+                _logger.warning('close xpanel client')
+            except Exception as ex:
+                _logger.error(f'close xpanel client err:{ex}')
+
+    def failover_status(self) -> dict:
+        """Return the active and standby endpoints and the failover count."""
+        host, port = self.endpoints[self._active]
+        standby = self._standby
+        return {
+            "active": f"{host}:{port}",
+            "standby": f"{standby.host}:{standby.port}" if standby else None,
+            "standby_ready": bool(standby and standby.ready),
+            "failovers": self._failovers,
+        }
+
+    def _pause_writing(self):
+        """Transport buffer is above its high-water mark, stop draining lanes."""
+        if not self._write_paused:
+            self._write_pauses += 1
+            _logger.debug("write paused by transport flow control")
+        self._write_paused = True
+
+    def _resume_writing(self):
+        self._write_paused = False
 
     def _conn_online(self):
         self.connected = True
+        self._ready = False
+        self._rx_pending = b""
         # self._update_request()
         self._restart_connection = False
-        if self.online_callback_func is not None:
-            self.online_callback_func(True)
+        self._link_changed()
+        self._notify_online(True)
 
     def _conn_offline(self):
+        if self._promote_standby():
+            return
         self.connected = False
+        self._ready = False
+        self._write_paused = False
         if self._stop_connection is False:
             self._restart_connection = True
+        self._link_changed()
+        self._notify_online(False)
+
+    def _request_restart(self):
+        """Reconnect from the check loop, journaling commands until then."""
+        self._ready = False
+        self._restart_connection = True
+        self._link_changed()
+
+    def _link_changed(self):
+        """Called after connected, _ready or _restart_connection changed."""
+
+    def _can_send(self) -> bool:
+        """True when outbound packets are queued rather than journaled."""
+        return (
+            self._ready
+            and self.connected is True
+            and self._restart_connection is False
+        )
+
+    def _notify_online(self, online: bool):
+        """Report a connection change to the online callback."""
         if self.online_callback_func is not None:
-            self.online_callback_func(False)
+            self.online_callback_func(online)
 
     async def _check_conn_state(self):
         while (not self._stop_connection):
             try:
                 if (self._restart_connection is True):
                     _logger.error("conn err,restart reconnect")
-                    if self._transport is not None:
-                        try:
-                            self._transport.close()
-                            _logger.warning('close xpanel client')
-                        except Exception as ex:
-                            _logger.error(f'close xpanel client err:{ex}')
+                    self._close_transport()
                     # self._transport = None
                     self._conn_offline()
+                    if self.connected:
+                        # promoted the warm standby
+                        continue
                     await asyncio.sleep(10)
                 await self._create_conn()
             except Exception as e:
                 _logger.error(f"conn state check err:{e}")
+                if len(self.endpoints) > 1:
+                    # try the next path on the following round
+                    self._active = (self._active + 1) % len(self.endpoints)
             finally:
                 await asyncio.sleep(10)
 
-    def set(self, sigtype, join, value):
-        """Set an outgoing join."""
+    def _check_value(self, sigtype, join, value):
+        """Validate an outgoing join value, raising ValueError when invalid."""
+        if (type(join) is not int) or (join < 1) or (join > 65535):
+            raise ValueError(f"'{join}' is not a valid join number")
         if sigtype == "d":
             if (value != 0) and (value != 1):
-                _logger.error(
-                    f"set(): '{value}' is not a valid digital signal state")
-                return
+                raise ValueError(
+                    f"'{value}' is not a valid digital signal state")
+            return int(value)
         elif sigtype == "a":
-            if (type(value) is not int) or (value > 65535):
-                _logger.error(
-                    f"set(): '{value}' is not a valid analog signal value")
-                return
+            if (type(value) is not int) or (value < 0) or (value > 65535):
+                raise ValueError(
+                    f"'{value}' is not a valid analog signal value")
+            return value
         elif sigtype == "s":
             value = str(value)
-        else:
-            _logger.debug(f"set(): '{sigtype}' is not a valid signal type")
-            return
+            if not value.isascii():
+                raise ValueError(
+                    f"serial join {join} only carries ASCII text")
+            if len(value) > MAX_SERIAL_LENGTH:
+                raise ValueError(
+                    f"serial join {join} is longer than {MAX_SERIAL_LENGTH} characters")
+            return value
+        raise ValueError(f"'{sigtype}' is not a valid signal type")
+
+    def _queue_event(self, event) -> bool:
+        """Queue a join event, False when it was rejected.
+
+        A full queue follows the overflow policy of the tx lanes: reject
+        refuses outbound commands, coalesce and drop_oldest drop the oldest
+        queued event to make room. Inbound feedback always makes room, the
+        newest value is the one that matters. Every drop is counted.
+        """
+        try:
+            self._event_queue.put_nowait(event)
+            return True
+        except queue.Full:
+            pass
+        if event[0] == "out" and self._tx_queue.policy == OVERFLOW_REJECT:
+            self._event_dropped(event)
+            return False
+        try:
+            self._event_dropped(self._event_queue.get_nowait())
+        except queue.Empty:
+            pass
+        try:
+            self._event_queue.put_nowait(event)
+        except queue.Full:
+            self._event_dropped(event)
+            return False
+        return True
 
-        self._event_queue.put(("out", sigtype, join, value))
+    def _event_dropped(self, event):
+        self._events_dropped[event[0]] += 1
+        _logger.warning(f"event queue full, dropped {event[0]} {event[1]}{event[2]}")
 
-    def press(self, join):
+    def set(self, sigtype, join, value, lane=LANE_INTERACTIVE) -> bool:
+        """Set an outgoing join, False when it was invalid or not queued."""
+        try:
+            value = self._check_value(sigtype, join, value)
+        except ValueError as e:
+            _logger.error(f"set(): {e}")
+            return False
+
+        return self._queue_event(("out", sigtype, join, value, lane))
+
+    def set_many(self, joins, lane=LANE_INTERACTIVE):
+        """Set several outgoing joins and transmit them as one batch.
+
+        joins is an iterable of (sigtype, join, value) tuples. Every entry is
+        validated before anything is queued, so an invalid entry rejects the
+        whole batch with a ValueError. Returns how many joins were queued,
+        0 when the full event queue rejected the batch. Automation writes
+        should pass lane=LANE_BULK so they queue behind interactive commands.
+        """
+        batch = []
+        for sigtype, join, value in joins:
+            try:
+                batch.append(
+                    (sigtype, join, self._check_value(sigtype, join, value)))
+            except ValueError as e:
+                raise ValueError(f"set_many(): {e}") from None
+        if len(batch) and not self._queue_event(("out", "batch", None, batch, lane)):
+            return 0
+        return len(batch)
+
+    def press(self, join) -> bool:
         """Set a digital output join to the active state using CIP button logic."""
-        self._event_queue.put(("out", "db", join, 1))
+        return self._queue_event(("out", "db", join, 1, LANE_INTERACTIVE))
 
-    def release(self, join):
+    def release(self, join) -> bool:
         """Set a digital output join to the inactive state using CIP button logic."""
-        self._event_queue.put(("out", "db", join, 0))
+        return self._queue_event(("out", "db", join, 0, LANE_INTERACTIVE))
 
-    def pulse(self, join):
+    def pulse(self, join) -> bool:
         """Generate an active-inactive pulse on the specified digital output join."""
-        self._event_queue.put(("out", "dp", join, 1))
-        self._event_queue.put(("out", "dp", join, 0))
+        return (self._queue_event(("out", "dp", join, 1, LANE_INTERACTIVE))
+                and self._queue_event(("out", "dp", join, 0, LANE_INTERACTIVE)))
 
     def get(self, sigtype, join, direction="in"):
         """Get the current value of a join."""
@@ -196,7 +1357,7 @@ class XPanelClient:
     def update_request(self):
         """Send an update request to the control processor."""
         if self.connected is True:
-            self._tx_queue.put(b"\x05\x00\x05\x00\x00\x02\x03\x00")
+            self._put_tx(CIP_UPDATE_REQUEST, LANE_CONTROL)
         else:
             _logger.debug(
                 "update_request(): not currently connected")
@@ -222,7 +1383,7 @@ class XPanelClient:
                 ]
             self._joins_dic[direction][sigtype][join].append(callback)
 
-    async def unsubscribe(self, sigtype, join, direction="in"):
+    async def unsubscribe(self, sigtype, join, callback=None, direction="in"):
         async with self._join_lock:
             if join not in self._joins_dic[direction][sigtype]:
                 if sigtype == "s":
@@ -232,6 +1393,47 @@ class XPanelClient:
                 self._joins_dic[direction][sigtype][join] = [
                     value,
                 ]
+            elif callback is not None:
+                callbacks = self._joins_dic[direction][sigtype][join]
+                if callback in callbacks[1:]:
+                    callbacks.remove(callback)
+
+    async def subscribe_many(self, subscriptions, direction="in") -> list:
+        """Subscribe (sigtype, join, callback) triples under one lock.
+
+        Returns the current value of every subscribed join, in order, so a
+        batch of entities gets its initial state without reading join by
+        join.
+        """
+        if (direction != "in") and (direction != "out"):
+            raise ValueError(
+                f"subscribe_many(): '{direction}' is not a valid signal direction"
+            )
+        subscriptions = list(subscriptions)
+        for sigtype, join, callback in subscriptions:
+            if (sigtype != "d") and (sigtype != "a") and (sigtype != "s"):
+                raise ValueError(
+                    f"subscribe_many(): '{sigtype}' is not a valid signal type")
+
+        values = []
+        async with self._join_lock:
+            joins = self._joins_dic[direction]
+            for sigtype, join, callback in subscriptions:
+                entry = joins[sigtype].get(join)
+                if entry is None:
+                    entry = joins[sigtype][join] = ["" if sigtype == "s" else 0]
+                entry.append(callback)
+                values.append(entry[0])
+        return values
+
+    async def unsubscribe_many(self, subscriptions, direction="in"):
+        """Remove (sigtype, join, callback) triples under one lock."""
+        async with self._join_lock:
+            joins = self._joins_dic[direction]
+            for sigtype, join, callback in subscriptions:
+                entry = joins[sigtype].get(join)
+                if entry is not None and callback in entry[1:]:
+                    entry.remove(callback)
 
     async def _send_queue(self):
         """Start the CIP outgoing packet processing thread."""
@@ -239,35 +1441,40 @@ class XPanelClient:
         time_asleep_heartbeat = 0
         time_asleep_buttons = 0
         while (not self._stop_connection):
-            while not self._tx_queue.empty():
+            while not self._tx_queue.empty() and not self._write_paused:
                 tx = self._tx_queue.get()
                 if self._restart_connection is False:
                     _logger.debug(
                         f"TX: <{str(binascii.hexlify(tx), 'ascii')}>")
+                    if self.capture is not None:
+                        self.capture.write(CAPTURE_OUT, tx)
                     try:
                         self._transport.write(tx)
                     except Exception as e:
                         _logger.debug(f"send err:{e}")
                         async with self._restart_lock:
-                            self._restart_connection = True
+                            self._request_restart()
                     time_asleep_heartbeat = 0
                 await asyncio.sleep(0.001)
             if self.connected is True and self._restart_connection is False:
                 time_asleep_heartbeat += 0.01
-                if time_asleep_heartbeat >= 15:
-                    self._tx_queue.put(b"\x0D\x00\x02\x00\x00")
+                if time_asleep_heartbeat >= HEARTBEAT_INTERVAL:
+                    self._tx_queue.put(
+                        CIP_HEARTBEAT, LANE_CONTROL, "heartbeat")
                     time_asleep_heartbeat = 0
+                    if self.capture is not None:
+                        self.capture.flush()
                 time_asleep_buttons += 0.01
                 if time_asleep_buttons >= 0.50 and len(self.buttons_pressed):
-                    async with self._buttons_lock:
-                        for join in self.buttons_pressed:
-                            try:
-                                if self._joins_dic["out"]["d"][join][0] == 1:
-                                    self._tx_queue.put(
-                                        self.buttons_pressed[join]
-                                    )
-                            except KeyError:
-                                pass
+                    # iterate a copy, presses may change while we repeat them
+                    for join, held in list(self.buttons_pressed.items()):
+                        try:
+                            if self._joins_dic["out"]["d"][join][0] == 1:
+                                self._tx_queue.put(
+                                    held, LANE_INTERACTIVE, ("db", join)
+                                )
+                        except KeyError:
+                            pass
                     time_asleep_buttons = 0
             await asyncio.sleep(0.001)
         _logger.debug("stopped")
@@ -275,86 +1482,189 @@ class XPanelClient:
     def _handle_incoming_message(self, rx: bytes):
         try:
             _logger.debug(f'RX: <{rx.hex()}>')
-            position = 0
-            length = len(rx)
-            while position < length:
-                if (length - position) < 4:
-                    _logger.warning("Packet is too short")
-                    break
-
-                payload_length = (
-                    rx[position + 1] << 8) + rx[position + 2]
-                packet_length = payload_length + 3
-
-                if (length - position) < packet_length:
-                    _logger.warning("Packet length mismatch")
-                    break
-
-                packet_type = rx[position]
-                payload = rx[position +
-                             3: position + 3 + payload_length]
-
+            if self.capture is not None:
+                self.capture.write(CAPTURE_IN, rx)
+            if self._rx_pending:
+                rx = self._rx_pending + rx
+            # a packet split across reads is kept until its tail arrives
+            end = complete_length(rx)
+            self._rx_pending = rx[end:]
+            if len(self._rx_pending) > MAX_PENDING_RX:
+                _logger.warning("Packet length mismatch")
+                self._rx_pending = b""
+            for packet_type, payload in split_packets(rx[:end]):
                 self._processPayload(packet_type, payload)
-                position += packet_length
             # else:
             #     time.sleep(0.1)
         except Exception as e:
             _logger.error(f'handle in come msg err:{e}')
             if e.args[0] != "timed out":
                 # with self.restart_lock:
-                self._restart_connection = True
+                self._request_restart()
+
+    def _encode(self, sigtype, join, value) -> bytearray:
+        """Build the CIP packet for an outgoing join."""
+        tx = bytearray(self._cip_packet[sigtype])
+        cip_join: int = join - 1
+        if sigtype[0] == "d":
+            packed_join = (cip_join // 256) + \
+                ((cip_join % 256) * 256)
+            if value == 0:
+                packed_join |= 0x80
+            tx += packed_join.to_bytes(2, "big")
+        elif sigtype == "a":
+            tx += cip_join.to_bytes(2, "big")
+            tx += value.to_bytes(2, "big")
+        elif sigtype == "s":
+            tx[2] = 8 + len(value)
+            tx[6] = 4 + len(value)
+            tx += cip_join.to_bytes(2, "big")
+            tx += b"\x03"
+            tx += bytearray(value, "ascii")
+        return tx
+
+    async def _apply_event(self, direction, sigtype, join, value):
+        """Store a join value, run its callbacks and return the packet to send."""
+        async with self._join_lock:
+            if self.history.active and join is not None:
+                self.history.record(direction, sigtype[0], join, value)
+            if direction == "in":
+                for observer in self._observers:
+                    observer(sigtype, join, value)
+            try:
+                self._joins_dic[direction][sigtype[0]][join][0] = value
+                # 处理join注册的所有回调
+                profiler = self.profiler
+                for callback in self._joins_dic[direction][sigtype[0]][join][1:]:
+                    if profiler is None:
+                        callback(sigtype[0], join, value)
+                    else:
+                        profiler.run(callback, sigtype[0], join, value)
+            except KeyError:
+                self._joins_dic[direction][sigtype[0]][join] = [
+                    value,
+                ]
+        _logger.debug(f"  : {sigtype} {direction} {join} = {value}")
+
+        if direction != "out" or join is None:
+            return None
+        tx = self._encode(sigtype, join, value)
+        if sigtype == "db":
+            async with self._buttons_lock:
+                self._track_button(join, tx if value == 1 else None)
+        return tx
+
+    def _track_button(self, join, tx: bytes | None):
+        """Remember a held button for repeating, None releases it."""
+        if tx is not None:
+            self.buttons_pressed[join] = tx
+        else:
+            self.buttons_pressed.pop(join, None)
 
     async def _start_event(self):
         """Start the join event processing thread."""
         _logger.debug("send event started")
         while not self._stop_connection:
-            if not self._event_queue.empty():
-                direction, sigtype, join, value = self._event_queue.get()
-                async with self._join_lock:
-                    try:
-                        self._joins_dic[direction][sigtype[0]][join][0] = value
-                        # 处理join注册的所有回调
-                        for callback in self._joins_dic[direction][sigtype[0]][join][1:]:
-                            callback(sigtype[0], join, value)
-                    except KeyError:
-                        self._joins_dic[direction][sigtype[0]][join] = [
-                            value,
-                        ]
-                _logger.debug(f"  : {sigtype} {direction} {join} = {value}")
-
-                if direction == "out":
-                    tx = bytearray(self._cip_packet[sigtype])
-                    if join is not None:
-                        cip_join:int = join - 1
-                        if sigtype[0] == "d":
-                            packed_join = (cip_join // 256) + \
-                                ((cip_join % 256) * 256)
-                            if value == 0:
-                                packed_join |= 0x80
-                            tx += packed_join.to_bytes(2, "big")
-                            if sigtype == "db":
-                                async with self._buttons_lock:
-                                    if value == 1:
-                                        self.buttons_pressed[join] = tx
-                                    elif join in self.buttons_pressed:
-                                        self.buttons_pressed.pop(join)
-                        elif sigtype == "a":
-                            tx += cip_join.to_bytes(2, "big")
-                            tx += value.to_bytes(2, "big")
-                        elif sigtype == "s":
-                            tx[2] = 8 + len(value)
-                            tx[6] = 4 + len(value)
-                            tx += cip_join.to_bytes(2, "big")
-                            tx += b"\x03"
-                            tx += bytearray(value, "ascii")
-                        if (
-                            self.connected is True
-                            and self._restart_connection is False
-                        ):
-                            self._tx_queue.put(tx)
+            # drain everything queued so joins from one frame are dispatched
+            # in the same loop iteration and entity writes can coalesce
+            started = time.perf_counter() if self.profiler is not None else None
+            handled = 0
+            while not self._event_queue.empty():
+                direction, sigtype, join, value, lane = self._event_queue.get()
+                handled += 1
+                try:
+                    await self._process_event(direction, sigtype, join, value, lane)
+                except Exception:
+                    # one bad event must not end the dispatch loop
+                    _logger.exception(
+                        f"dropped {direction} event {sigtype}{join if join is not None else ''}")
+            if handled and started is not None and self.profiler is not None:
+                self.profiler.record_pass(time.perf_counter() - started)
             await asyncio.sleep(0.001)
         _logger.debug("send event stopped")
 
+    async def _process_event(self, direction, sigtype, join, value, lane):
+        """Apply one queued event and send, or journal, its packet."""
+        if sigtype == "batch":
+            # one frame carrying every join of the batch
+            tx = bytearray()
+            for sig, j, v in value:
+                tx += await self._apply_event(direction, sig, j, v)
+        else:
+            tx = await self._apply_event(direction, sigtype, join, value)
+        if not tx:
+            return
+        if not self._can_send():
+            # keep it for replay after registration and end-of-query
+            if sigtype == "batch":
+                for sig, j, v in value:
+                    self._journal.record(sig, j, v)
+            else:
+                self._journal.record(sigtype, join, value)
+        elif sigtype == "batch":
+            if not self._put_tx(tx, lane, supersedes=tx_keys(value)):
+                _logger.debug(f"tx lane {LANE_NAMES[lane]} full, rejected batch")
+        else:
+            key = (sigtype, join) if sigtype in KEYED_SIGTYPES else None
+            if not self._put_tx(tx, lane, key):
+                _logger.debug(f"tx lane {LANE_NAMES[lane]} full, rejected {sigtype}{join}")
+
+    def _put_tx(self, tx: bytes, lane: int, key=None, supersedes=()) -> bool:
+        """Queue a packet for the send loop, False when the lane rejected it."""
+        return self._tx_queue.put(tx, lane, key, supersedes)
+
+    def _resync_outbound(self):
+        """Replay the offline journal, then resend every other outbound join."""
+        replayed = self._replay_journal()
+        # with self.join_lock:
+        for sigtype, joins in self._joins_dic["out"].items():
+            for j, entry in list(joins.items()):
+                if (sigtype, j) not in replayed:
+                    self.set(sigtype, j, entry[0], LANE_RESYNC)
+
+    def _replay_journal(self) -> set:
+        """Send the joins set while offline as one interactive frame.
+
+        Returns the (sigtype, join) of the level joins it sent, which
+        already carry their latest value and need no resync.
+        """
+        if not len(self._journal):
+            return set()
+        entries = self._journal.drain()
+        tx = bytearray()
+        for sigtype, join, value in entries:
+            tx += self._encode(sigtype, join, value)
+        if tx:
+            _logger.debug(f"replaying {len(entries)} journaled joins")
+            self._put_tx(bytes(tx), LANE_INTERACTIVE, supersedes=tx_keys(entries))
+        return {
+            (sigtype, join) for sigtype, join, _ in entries
+            if sigtype in ("d", "a", "s")}
+
+    def _registration_packet(self) -> bytes:
+        """Build the client registration reply for this IPID and room."""
+        if self.room_id == "":
+            return (
+                b"\x01\x00\x0b\x00\x00\x00\x00\x00"
+                + self.ip_id
+                + b"\x40\xff\xff\xf1\x01"
+            )
+        room_bytes = bytearray(f"{self.room_id}", "ascii")
+        return bytes(
+            b"\x26\x00\xd5\x00"
+            + self.ip_id
+            + b"\x40\xf1\x01\x00\x00\x00\x01"
+            + b"\xff\xff\xff\xff\xff\xff"  # mac add
+            + bytearray("Crestron", "ascii")
+            + b"\x00"*42
+            + bytearray("XPanel", "ascii")
+            + b"\x00"*44
+            + room_bytes
+            + b"\x00"*(32-len(room_bytes))
+            + bytearray("XPanel -FF-FF-FF-FF-FF-FF", "ascii")
+            + b"\x00"*41
+        )
+
     def _processPayload(self, ciptype:int, payload:bytes):
         """Process CIP packets."""
         _logger.debug(
@@ -374,17 +1684,13 @@ class XPanelClient:
                 # digital join
                 join = (((payload[5] & 0x7F) << 8) | payload[4]) + 1
                 state = ((payload[5] & 0x80) >> 7) ^ 0x01
-                self._event_queue.put(("in", "d", join, state))
                 _logger.debug(f"  Incoming Digital Join {join:04} = {state}")
-                self.hass.bus.fire(
-                    'xpanel_receive', {'type': 'd', 'join': join, 'value': state})
+                self.inbound_filter.process("d", join, state)
             elif datatype == 0x14:
                 join = ((payload[4] << 8) | payload[5]) + 1
                 value = (payload[6] << 8) + payload[7]
-                self._event_queue.put(("in", "a", join, value))
                 _logger.debug(f"  Incoming Analog Join {join:04} = {value}")
-                self.hass.bus.fire(
-                    'xpanel_receive', {'type': 'a', 'join': join, 'value': value})
+                self.inbound_filter.process("a", join, value)
             elif datatype == 0x03:
                 # update request
                 update_request_type = payload[4]
@@ -397,13 +1703,15 @@ class XPanelClient:
                 elif update_request_type == 0x1C:
                     # end-of-query
                     _logger.debug("  End-of-query")
-                    self._tx_queue.put(b"\x05\x00\x05\x00\x00\x02\x03\x1d")
-                    self._tx_queue.put(b"\x0D\x00\x02\x00\x00")
+                    self._tx_queue.put(CIP_END_OF_QUERY_ACK)
+                    self._tx_queue.put(CIP_HEARTBEAT)
                     self.connected = True
-                    # with self.join_lock:
-                    for sigtype, joins in self._joins_dic["out"].items():
-                        for j in joins:
-                            self.set(sigtype, j, joins[j][0])
+                    self._ready = True
+                    self._link_changed()
+                    if self._ssl_context is not None:
+                        self._remember_tls_session(
+                            self._transport, self.endpoints[self._active][0])
+                    self._resync_outbound()
                 elif update_request_type == 0x1D:
                     # end-of-query acknowledgement
                     _logger.debug("  End-of-query acknowledgement")
@@ -425,39 +1733,13 @@ class XPanelClient:
                 _logger.debug("! We don't know what to do with this data")
         elif ciptype == 0x12:
             join = ((payload[5] << 8) | payload[6]) + 1
-            hex_str = str(binascii.hexlify(payload[8:]), "ascii")
-            self.hass.bus.async_fire(
-                'xpanel_receive', {'type': 's', 'join': join, 'value': hex_str})
             value = str(payload[8:], "ascii")
-            self._event_queue.put(("in", "s", join, value))
             _logger.debug(f"  Incoming Serial Join {join:04} = {value}")
+            self.inbound_filter.process("s", join, value)
         elif ciptype == 0x0F:
             # registration request
             _logger.debug("  Client registration request")
-            if self.room_id == "":
-                tx = (
-                    b"\x01\x00\x0b\x00\x00\x00\x00\x00"
-                    + self.ip_id
-                    + b"\x40\xff\xff\xf1\x01"
-                )
-                self._tx_queue.put(tx)
-            else:
-                room_bytes = bytearray(f"{self.room_id}", "ascii")
-                tx = (
-                    b"\x26\x00\xd5\x00"
-                    + self.ip_id
-                    + b"\x40\xf1\x01\x00\x00\x00\x01"
-                    + b"\xff\xff\xff\xff\xff\xff"  # mac add
-                    + bytearray("Crestron", "ascii")
-                    + b"\x00"*42
-                    + bytearray("XPanel", "ascii")
-                    + b"\x00"*44
-                    + room_bytes
-                    + b"\x00"*(32-len(room_bytes))
-                    + bytearray("XPanel -FF-FF-FF-FF-FF-FF", "ascii")
-                    + b"\x00"*41
-                )
-                self._tx_queue.put(tx)
+            self._tx_queue.put(self._registration_packet())
         elif ciptype == 0x02:
             # registration result
             ip_id_string = str(binascii.hexlify(self.ip_id), "ascii")
@@ -469,7 +1751,7 @@ class XPanelClient:
             elif length == 4 and payload == b"\x00\x00\x00\x1f":
                 _logger.debug(f"  Registered IPID 0x{ip_id_string}")
                 # 0500050000020300 send query
-                self._tx_queue.put(b"\x05\x00\x05\x00\x00\x02\x03\x00")
+                self._tx_queue.put(CIP_UPDATE_REQUEST)
             else:
                 _logger.error(f"! Error registering IPID 0x{ip_id_string}")
                 restartRequired = True
@@ -488,7 +1770,7 @@ class XPanelClient:
             elif length == 38 and payload[0:4] == b"\x00\x00\x00\x1f":
                 _logger.debug(f"  Registered IPID 0x{ip_id_string}")
                 # 0500050000020300 send query
-                self._tx_queue.put(b"\x05\x00\x05\x00\x00\x02\x03\x00")
+                self._tx_queue.put(CIP_UPDATE_REQUEST)
             else:
                 _logger.error(f"! Error registering IPID 0x{ip_id_string}")
                 restartRequired = True
@@ -500,24 +1782,70 @@ class XPanelClient:
 
         if restartRequired:
             # with self.restart_lock:
-            self._restart_connection = True
+            self._request_restart()
+
+    def _deliver_inbound(self, sigtype, join, value):
+        """Queue a filtered inbound join for dispatch and fire the bus event."""
+        self._queue_event(("in", sigtype, join, value, None))
+        self._announce(sigtype, join, value)
+
+    def _announce(self, sigtype, join, value):
+        """Fire the xpanel_receive event for an inbound join."""
+        if self._fire_event is None:
+            return
+        if sigtype == "s":
+            value = bytes(value, "ascii").hex()
+        self._fire_event(
+            'xpanel_receive', {'type': sigtype, 'join': join, 'value': value})
 
     def register_sync_all_joins_callback(self, callback) -> None:
         """ Allow callback to be registred for when control system requests an update to all joins """
         _logger.debug("Sync-all-joins callback registered")
         self._sync_all_joins_callback = callback
 
+    def add_observer(self, observer):
+        """Watch every inbound join, return a function removing the observer."""
+        self._observers.append(observer)
+
+        def remove():
+            if observer in self._observers:
+                self._observers.remove(observer)
+        return remove
+
     async def register_callback(self, sigtype, join, callback):
         """ Allow callbacks to be registered for when dict entries change """
         await self.subscribe(sigtype, join, callback)
 
-    async def remove_callback(self, sigtype, join):
+    async def remove_callback(self, sigtype, join, callback=None):
         """ Allow callbacks to be de-registered """
-        await self.unsubscribe(sigtype, join)
+        await self.unsubscribe(sigtype, join, callback)
+
+    def queue_depths(self) -> dict:
+        """Return the number of packets waiting in each outbound lane."""
+        return self._tx_queue.depths()
+
+    def queue_metrics(self) -> dict:
+        """Return overflow and flow control counters of the outbound path."""
+        metrics = self._tx_queue.metrics()
+        metrics["events_queued"] = self._event_queue.qsize()
+        metrics["events_dropped"] = dict(self._events_dropped)
+        metrics["write_paused"] = self._write_paused
+        metrics["write_pauses"] = self._write_pauses
+        metrics["journal"] = {
+            "pending": len(self._journal),
+            "recorded": self._journal.recorded,
+            "replayed": self._journal.replayed,
+            "expired": self._journal.expired,
+        }
+        return metrics
 
     def is_available(self):
         return self._available
 
+    def is_connected(self) -> bool:
+        """Return whether the control system connection is up."""
+        return self.connected is True
+
     def get_analog(self, join):
         """ Return analog value for join"""
         return int(self.get("a", join))
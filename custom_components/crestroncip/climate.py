@@ -4,6 +4,7 @@ import voluptuous as vol
 import logging
 import asyncio
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
 import homeassistant.helpers.config_validation as cv
 from . import XPanelClient, HomeAssistant, HUB
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
@@ -20,11 +21,17 @@ from homeassistant.components.climate.const import (
 )
 from homeassistant.const import CONF_NAME, CONF_TYPE, ATTR_TEMPERATURE
 from . import XPanelClient
+from .reload import track_platform
+from .entity import JoinSubscriberMixin
+from .device_manifest import manifest_configs
 from .const import (
     HUB,
     DOMAIN,
     CONF_AC_POWER_ON_JOIN,
     CONF_AC_POWER_OFF_JOIN,
+    CONF_AC_POWER_FB_JOIN,
+    CONF_AC_COMMAND_TIMEOUT,
+    CONF_AC_POWER_ON_DELAY,
     CONF_WH_POWER_ON_JOIN,
     CONF_WH_POWER_ON_FB_JOIN,
     CONF_WH_POWER_OFF_JOIN,
@@ -51,6 +58,9 @@ PLATFORM_SCHEMA = vol.Schema(
         vol.Required(CONF_TYPE): cv.string,
         vol.Optional(CONF_AC_POWER_ON_JOIN): cv.positive_int,
         vol.Optional(CONF_AC_POWER_OFF_JOIN): cv.positive_int,
+        vol.Optional(CONF_AC_POWER_FB_JOIN): cv.positive_int,
+        vol.Optional(CONF_AC_COMMAND_TIMEOUT, default=3): cv.positive_float,
+        vol.Optional(CONF_AC_POWER_ON_DELAY, default=2): cv.positive_float,
         vol.Optional(CONF_WH_POWER_ON_JOIN): cv.positive_int,
         vol.Optional(CONF_WH_POWER_ON_FB_JOIN): cv.positive_int,
         vol.Optional(CONF_WH_POWER_OFF_JOIN): cv.positive_int,
@@ -101,10 +111,22 @@ CONF_CURRENT_FAN_MODE_MAP = {
     3: FAN_LOW,
     4: FAN_AUTO
 }
+CONF_AC_MODE_VALUE_MAP = {v: k for k, v in CONF_CURRENT_AC_MODE_MAP.items()}
+CONF_FAN_MODE_VALUE_MAP = {v: k for k, v in CONF_CURRENT_FAN_MODE_MAP.items()}
 
 
 async def async_setup_platform(hass: HomeAssistant, config, async_add_entities, discovery_info=None) -> None:
+    async_add_entities = track_platform(
+        hass, 'climate', config, async_add_entities, discovery_info)
     hub: XPanelClient = hass.data[DOMAIN][HUB]
+    entity = [
+        entity for device in manifest_configs(discovery_info) or [config]
+        for entity in create_entities(hass, hub, device)]
+    if entity:
+        async_add_entities(entity)
+
+
+def create_entities(hass: HomeAssistant, hub: XPanelClient, config) -> list:
     device_name = config.get(CONF_NAME)
     device_type = config.get(CONF_TYPE)
     entity = []
@@ -116,16 +138,105 @@ async def async_setup_platform(hass: HomeAssistant, config, async_add_entities,
         if device_type == "FH":
             entity = [FHPanel(
                 hub, config, hass.config.units.temperature_unit, device_type)]
-        async_add_entities(entity)
-
-
-class Thermostat(ClimateEntity):
+    return entity
+
+
+class _Step:
+    __slots__ = ("send", "acked", "settle", "future")
+
+    def __init__(self, send, acked, settle, future):
+        self.send = send
+        self.acked = acked
+        self.settle = settle
+        self.future = future
+
+
+class CommandSequencer:
+    """Send a device's commands one step at a time.
+
+    Each step is queued under a key and waiting steps run in STEP_ORDER,
+    power before mode, fan and temp. Queuing a key that is still waiting
+    replaces its command and puts it back in that order, so superseded
+    target temperatures or fan speeds are never sent. A step is done as soon as
+    its acked() check passes on feedback; a step without a check is done
+    once sent, and the next step waits its settle seconds so the device
+    can power up first. A step that is not acknowledged within timeout fails its
+    future with HomeAssistantError and the next step runs.
+    """
+
+    STEP_ORDER = ("power", "mode", "fan", "temp")
+
+    def __init__(self, hass: HomeAssistant, name: str, timeout: float):
+        self._hass = hass
+        self._name = name
+        self._timeout = timeout
+        self._steps: dict[str, _Step] = {}
+        self._current: _Step | None = None
+        self._acked = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def queue(self, key: str, send, acked=None, settle: float = 0) -> asyncio.Future:
+        step = self._steps.pop(key, None)
+        if step is not None:
+            step.send = send
+            step.acked = acked
+            step.settle = settle
+        else:
+            step = _Step(send, acked, settle, self._hass.loop.create_future())
+        self._steps[key] = step
+        self._steps = dict(sorted(self._steps.items(), key=self._rank))
+        if self._task is None or self._task.done():
+            self._task = self._hass.async_create_background_task(
+                self._run(), f"climate_sequencer_{self._name}")
+        return step.future
+
+    def _rank(self, item) -> int:
+        key = item[0]
+        if key in self.STEP_ORDER:
+            return self.STEP_ORDER.index(key)
+        return len(self.STEP_ORDER)
+
+    def feedback(self):
+        """Call from feedback callbacks to acknowledge the running step."""
+        step = self._current
+        if step is not None and step.acked is not None and step.acked():
+            self._acked.set()
+
+    async def _run(self):
+        while self._steps:
+            key = next(iter(self._steps))
+            step = self._steps.pop(key)
+            if step.acked is not None and step.acked():
+                step.future.set_result(True)
+                continue
+            self._current = step
+            self._acked.clear()
+            step.send()
+            if step.acked is None:
+                self._current = None
+                step.future.set_result(True)
+                # steps queued meanwhile still wait behind the sleep
+                await asyncio.sleep(step.settle)
+                continue
+            try:
+                await asyncio.wait_for(self._acked.wait(), self._timeout)
+                step.future.set_result(True)
+            except asyncio.TimeoutError:
+                _LOGGER.warning(
+                    f"{self._name}: no feedback for {key} within {self._timeout}s")
+                step.future.set_exception(HomeAssistantError(
+                    f"{self._name}: {key} command was not confirmed"))
+            finally:
+                self._current = None
+
+
+class Thermostat(JoinSubscriberMixin, ClimateEntity):
     def __init__(self, hub: XPanelClient, config, unit, device_type):
         self._hub = hub
         self._ac_mode_join = config.get(CONF_AC_MODE_JOIN)
         self._ac_mode_fb_join = config.get(CONF_AC_MODE_FB_JOIN)
         self._ac_set_temp_join = config.get(CONF_AC_SET_TEMP_JOIN)
-        self._ac_set_temp_fb_join = config.get(CONF_AC_SET_TEMP_JOIN)
+        self._ac_set_temp_fb_join = config.get(CONF_AC_SET_TEMP_FB_JOIN)
         self._ac_current_temp_fb_join = config.get(
             CONF_AC_CURRENT_TEMP_FB_JOIN)
         self._ac_current_humidity_fb_join = config.get(
@@ -149,38 +260,49 @@ class Thermostat(ClimateEntity):
         self._attr_target_temperature = 3
         self._divisor = config.get(CONF_DIVISOR)
         self._enable_turn_on_off_backwards_compatibility = False
+        self._command_timeout = config.get(CONF_AC_COMMAND_TIMEOUT, 3)
+        # without power feedback, seconds to wait after power on
+        self._power_on_delay = config.get(CONF_AC_POWER_ON_DELAY, 2)
+        self._sequencer: CommandSequencer | None = None
 
     async def async_added_to_hass(self):
-        _LOGGER.debug(
-            f'reg current_temp_fb_join:{self._ac_current_temp_fb_join}')
-        ct = self._hub.get_analog(
-            self._ac_current_temp_fb_join)
+        self._sequencer = CommandSequencer(
+            self.hass, self._attr_name, self._command_timeout)
+        await super().async_added_to_hass()
+
+    def join_subscriptions(self):
+        return [
+            ("a", self._ac_current_temp_fb_join, self.process_temp_fb_callback),
+            ("a", self._ac_set_temp_fb_join, self.process_set_temp_fb_callback),
+        ]
+
+    def initial_join_values(self, values):
+        ct = int(values[("a", self._ac_current_temp_fb_join)])
         if bool(ct):
             self._attr_current_temperature = (ct/self._divisor)
-        tt = self._hub.get_analog(
-            self._ac_set_temp_fb_join)
+        tt = int(values[("a", self._ac_set_temp_fb_join)])
         if bool(tt):
             self._attr_target_temperature = (tt/self._divisor)
-        await self._hub.register_callback(
-            "a", self._ac_current_temp_fb_join, self.process_temp_fb_callback)
-        _LOGGER.debug(f'reg set_temp_fb_join:{self._ac_set_temp_fb_join}')
-        await self._hub.register_callback(
-            "a", self._ac_set_temp_fb_join, self.process_set_temp_fb_callback)
 
-    async def async_will_remove_from_hass(self):
-        await self._hub.remove_callback("a", self._ac_set_temp_fb_join)
-        await self._hub.remove_callback("a", self._ac_current_temp_fb_join)
+    def _analog_acked(self, fb_join, value):
+        if fb_join is None:
+            return None
+        return lambda: self._hub.get_analog(fb_join) == value
 
     async def async_set_temperature(self, **kwargs):
         _LOGGER.debug(f"settemp:-{kwargs}")
         if ATTR_TEMPERATURE in kwargs.keys():
             self._attr_target_temperature = kwargs[ATTR_TEMPERATURE]
-            self._hub.set_analog(self._ac_set_temp_join,
-                                 int(self._attr_target_temperature * self._divisor))
+            value = int(self._attr_target_temperature * self._divisor)
+            await self._sequencer.queue(
+                "temp",
+                lambda: self._hub.set_analog(self._ac_set_temp_join, value),
+                self._analog_acked(self._ac_set_temp_fb_join, value))
 
     def process_set_temp_fb_callback(self, sigtype, join, value):
         _LOGGER.debug(f'set temp change:{value}')
         self._attr_target_temperature = int(value/self._divisor)
+        self._sequencer.feedback()
         self.schedule_update_ha_state()
 
     def process_temp_fb_callback(self, sigtype, join, value):
@@ -194,14 +316,11 @@ class AcPanel(Thermostat):
         super().__init__(hub, config, unit, device_type)
         self._ac_power_on_join = config.get(CONF_AC_POWER_ON_JOIN)
         self._ac_power_off_join = config.get(CONF_AC_POWER_OFF_JOIN)
+        self._ac_power_fb_join = config.get(CONF_AC_POWER_FB_JOIN)
         self._attr_fan_modes = [FAN_OFF, FAN_HIGH,
                                 FAN_MEDIUM, FAN_LOW, FAN_AUTO]
         self._ac_fan_mode_join = config.get(CONF_AC_FAN_MODE_JOIN)
         self._ac_fan_mode_fb_join = config.get(CONF_AC_FAN_MODE_FB_JOIN)
-        self._attr_hvac_mode = CONF_CURRENT_AC_MODE_MAP.get(int(self._hub.get_analog(
-            self._ac_mode_fb_join)))
-        self._attr_fan_mode = CONF_CURRENT_FAN_MODE_MAP.get(int(self._hub.get_analog(
-            self._ac_fan_mode_fb_join)))
         self._attr_device_info = DeviceInfo(
             identifiers={(DOMAIN, self._attr_unique_id)},
             name=self._attr_name,
@@ -211,36 +330,63 @@ class AcPanel(Thermostat):
             manufacturer='Jack_Zhou',
         )
 
-    async def async_added_to_hass(self):
-        await super().async_added_to_hass()
-        await self._hub.register_callback(
-            "a", self._ac_mode_fb_join, self._process_mode_fb_callback)
-        await self._hub.register_callback(
-            "a", self._ac_fan_mode_fb_join, self._process_fan_mode_fb_callback)
+    def join_subscriptions(self):
+        subscriptions = super().join_subscriptions() + [
+            ("a", self._ac_mode_fb_join, self._process_mode_fb_callback),
+            ("a", self._ac_fan_mode_fb_join, self._process_fan_mode_fb_callback),
+        ]
+        if self._ac_power_fb_join is not None:
+            subscriptions.append(
+                ("d", self._ac_power_fb_join, self._process_power_fb_callback))
         if isinstance(self._ac_current_humidity_fb_join, int):
-            hmi = self._hub.get_analog(
-                self._ac_current_humidity_fb_join)
-            self._attr_current_humidity = hmi
-            await self._hub.register_callback(
-                "a", self._ac_current_humidity_fb_join, self._process_humidity_fb_callback)
+            subscriptions.append(
+                ("a", self._ac_current_humidity_fb_join, self._process_humidity_fb_callback))
+        return subscriptions
+
+    def initial_join_values(self, values):
+        super().initial_join_values(values)
+        self._attr_hvac_mode = CONF_CURRENT_AC_MODE_MAP.get(
+            int(values[("a", self._ac_mode_fb_join)]))
+        self._attr_fan_mode = CONF_CURRENT_FAN_MODE_MAP.get(
+            int(values[("a", self._ac_fan_mode_fb_join)]))
+        if self._ac_power_fb_join is not None:
+            self._ac_power = bool(values[("d", self._ac_power_fb_join)])
+        if isinstance(self._ac_current_humidity_fb_join, int):
+            self._attr_current_humidity = int(
+                values[("a", self._ac_current_humidity_fb_join)])
 
-    async def async_will_remove_from_hass(self):
-        await super().async_will_remove_from_hass()
-        await self._hub.remove_callback("a", self._ac_mode_fb_join)
-        await self._hub.remove_callback("a", self._ac_fan_mode_fb_join)
+    def _power_acked(self, on: bool):
+        # without power feedback the step is done once the pulse is sent
+        if self._ac_power_fb_join is None:
+            return None
+        return lambda: self._hub.get_digital(self._ac_power_fb_join) == on
 
     def _set_power_on(self):
-        self._hub.pulse(self._ac_power_on_join)
+        return self._sequencer.queue(
+            "power", lambda: self._hub.pulse(self._ac_power_on_join),
+            self._power_acked(True), self._power_on_delay)
 
     def _set_power_off(self):
-        self._hub.pulse(self._ac_power_off_join)
+        return self._sequencer.queue(
+            "power", lambda: self._hub.pulse(self._ac_power_off_join),
+            self._power_acked(False))
+
+    def _set_mode(self, value: int):
+        return self._sequencer.queue(
+            "mode", lambda: self._hub.set_analog(self._ac_mode_join, value),
+            self._analog_acked(self._ac_mode_fb_join, value))
+
+    def _set_fan(self, value: int):
+        return self._sequencer.queue(
+            "fan", lambda: self._hub.set_analog(self._ac_fan_mode_join, value),
+            self._analog_acked(self._ac_fan_mode_fb_join, value))
 
-    def turn_on(self) -> None:
+    async def async_turn_on(self) -> None:
         if not self._ac_power:
-            self._set_power_on()
+            await self._set_power_on()
 
-    def turn_off(self) -> None:
-        self._set_power_off()
+    async def async_turn_off(self) -> None:
+        await self._set_power_off()
 
     async def async_set_temperature(self, **kwargs):
         await super().async_set_temperature(**kwargs)
@@ -251,54 +397,43 @@ class AcPanel(Thermostat):
         if hvac_mode != '':
             self._attr_hvac_mode = hvac_mode
             if hvac_mode == HVACMode.OFF:
-                self._set_power_off()
-                await asyncio.sleep(0.1)
-                self._hub.set_analog(self._ac_mode_join, 0)
-                await asyncio.sleep(0.1)
-                self._hub.set_analog(self._ac_fan_mode_join, 0)
+                steps = [self._set_power_off(), self._set_mode(0), self._set_fan(0)]
             else:
+                steps = []
                 if not self._ac_power:
-                    self._set_power_on()
-                    await asyncio.sleep(0.5)
-                if hvac_mode == HVACMode.COOL:
-                    self._hub.set_analog(self._ac_mode_join, 1)
-                if hvac_mode == HVACMode.HEAT:
-                    self._hub.set_analog(self._ac_mode_join, 2)
-                if hvac_mode == HVACMode.DRY:
-                    self._hub.set_analog(self._ac_mode_join, 3)
-                if hvac_mode == HVACMode.FAN_ONLY:
-                    self._hub.set_analog(self._ac_mode_join, 4)
-                if hvac_mode == HVACMode.HEAT_COOL:
-                    self._hub.set_analog(self._ac_mode_join, 5)
+                    steps.append(self._set_power_on())
+                if hvac_mode in CONF_AC_MODE_VALUE_MAP:
+                    steps.append(self._set_mode(CONF_AC_MODE_VALUE_MAP[hvac_mode]))
             self.schedule_update_ha_state()
+            for result in await asyncio.gather(*steps, return_exceptions=True):
+                if isinstance(result, Exception):
+                    raise result
 
     async def async_set_fan_mode(self, fan_mode):
         if fan_mode != '':
             self._attr_fan_mode = fan_mode
-            if fan_mode == FAN_HIGH:
-                self._hub.set_analog(self._ac_fan_mode_join, 1)
-            if fan_mode == FAN_MEDIUM:
-                self._hub.set_analog(self._ac_fan_mode_join, 2)
-            if fan_mode == FAN_LOW:
-                self._hub.set_analog(self._ac_fan_mode_join, 3)
-            if fan_mode == FAN_AUTO:
-                self._hub.set_analog(self._ac_fan_mode_join, 4)
-            if fan_mode == FAN_OFF:
-                self._hub.set_analog(self._ac_fan_mode_join, 0)
             self.schedule_update_ha_state()
+            if fan_mode in CONF_FAN_MODE_VALUE_MAP:
+                await self._set_fan(CONF_FAN_MODE_VALUE_MAP[fan_mode])
 
     def _process_mode_fb_callback(self, sigtype, join, value):
         _LOGGER.debug(f'receive mode fb:{value}')
         self._attr_hvac_mode = CONF_CURRENT_AC_MODE_MAP.get(value)
-        if self._attr_hvac_mode != HVACMode.OFF:
-            self._ac_power = True
-        else:
-            self._ac_power = False
+        if self._ac_power_fb_join is None:
+            self._ac_power = self._attr_hvac_mode != HVACMode.OFF
+        self._sequencer.feedback()
+        self.schedule_update_ha_state()
+
+    def _process_power_fb_callback(self, sigtype, join, value):
+        _LOGGER.debug(f'receive power fb:{value}')
+        self._ac_power = bool(value)
+        self._sequencer.feedback()
         self.schedule_update_ha_state()
 
     def _process_fan_mode_fb_callback(self, sigtype, join, value):
         _LOGGER.debug(f'receive fan fb:{value}')
         self._attr_fan_mode = CONF_CURRENT_FAN_MODE_MAP.get(value)
+        self._sequencer.feedback()
         self.schedule_update_ha_state()
 
     def _process_humidity_fb_callback(self, sigtype, join, value):
@@ -313,16 +448,15 @@ class FHPanel(Thermostat):
         self._fh_power_on_join = config.get(CONF_WH_POWER_ON_JOIN)
         self._fh_power_off_join = config.get(CONF_WH_POWER_OFF_JOIN)
         self._fh_power_on_fb_join = config.get(CONF_WH_POWER_ON_FB_JOIN)
-        self._fh_state = self._hub.get_digital(self._fh_power_on_fb_join)
+        self._fh_state = False
 
-    async def async_added_to_hass(self):
-        await super().async_added_to_hass()
-        await self._hub.register_callback(
-            "d", self._fh_power_on_fb_join, self.process_power_fb_callback)
+    def join_subscriptions(self):
+        return super().join_subscriptions() + [
+            ("d", self._fh_power_on_fb_join, self.process_power_fb_callback)]
 
-    async def async_will_remove_from_hass(self):
-        await super().async_will_remove_from_hass()
-        await self._hub.remove_callback("a", self._ac_mode_fb_join)
+    def initial_join_values(self, values):
+        super().initial_join_values(values)
+        self._fh_state = bool(values[("d", self._fh_power_on_fb_join)])
 
     @property
     def hvac_mode(self):
@@ -331,12 +465,28 @@ class FHPanel(Thermostat):
         else:
             return HVACMode.OFF
 
+    def _fh_power_acked(self, on: bool):
+        if self._fh_power_on_fb_join is None:
+            return None
+        return lambda: self._hub.get_digital(self._fh_power_on_fb_join) == on
+
     async def async_set_hvac_mode(self, hvac_mode):
         if hvac_mode == HVACMode.HEAT:
-            self._hub.pulse(self._fh_power_on_join)
+            await self._sequencer.queue(
+                "power", lambda: self._hub.pulse(self._fh_power_on_join),
+                self._fh_power_acked(True), self._power_on_delay)
         elif hvac_mode == HVACMode.OFF:
-            self._hub.pulse(self._fh_power_off_join)
+            await self._sequencer.queue(
+                "power", lambda: self._hub.pulse(self._fh_power_off_join),
+                self._fh_power_acked(False))
+
+    async def async_turn_on(self) -> None:
+        await self.async_set_hvac_mode(HVACMode.HEAT)
+
+    async def async_turn_off(self) -> None:
+        await self.async_set_hvac_mode(HVACMode.OFF)
 
     def process_power_fb_callback(self, sigtype, join, value):
         self._fh_state = value
+        self._sequencer.feedback()
         self.async_schedule_update_ha_state()
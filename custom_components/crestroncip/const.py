@@ -3,15 +3,36 @@ DOMAIN = "crestronhacip"
 HUB = "xpanel_hub"
 CONF_IP = "ip"
 CONF_PORT = "port"
+CONF_STANDBY = "standby"
 CONF_IP_ID = "ipid"
 CONF_ROOM_ID = "roomid"
 CONF_XP_NAME = "xp_name"
 CONF_JOIN = "join"
 CONF_SCRIPT = "script"
+CONF_TO_JOINS = "to_joins"
+CONF_FROM_JOINS = "from_joins"
+BRIDGE = "join_bridge"
 CONF_SCENES = "scenes"
+CONF_JOINS = "joins"
+CONF_HUB = "hub"
+CONF_VALUE = "value"
+SERVICE_SET_JOINS = "set_joins"
+SERVICE_GET_STATS = "get_stats"
+SERVICE_RELOAD = "reload"
+PLATFORM_ENTITIES = "platform_entities"
+PLATFORM_ADDERS = "platform_adders"
+SUBSCRIPTION_BATCHERS = "subscription_batchers"
+MANIFEST = "device_manifest"
+CONF_DEVICES = "devices"
+CONF_RANGE = "range"
+FEEDBACK_STATS = "feedback_stats"
+CONF_FEEDBACK_TIMEOUT = "feedback_timeout"
 CONF_IS_ON_FB_JOIN = "is_on_fb_digital"
 CONF_AC_POWER_ON_JOIN = "ac_power_on_digital"
 CONF_AC_POWER_OFF_JOIN = "ac_power_off_digital"
+CONF_AC_POWER_FB_JOIN = "ac_power_fb_digital"
+CONF_AC_COMMAND_TIMEOUT = "ac_command_timeout"
+CONF_AC_POWER_ON_DELAY = "ac_power_on_delay"
 CONF_AC_MODE_JOIN = "ac_mode_analog"
 CONF_AC_MODE_FB_JOIN = "ac_mode_fb_analog"
 CONF_AC_FAN_MODE_JOIN = "ac_fan_mode_analog"
@@ -58,6 +79,8 @@ CONF_TILT_POSITION_JOIN = "tilt_position_analog"
 CONF_TILT_POSITION_FB_JOIN = "tilt_position_fb_analog"
 CONF_POSITION_JOIN = "position_analog"
 CONF_POSITION_FB_JOIN = "position_fb_analog"
+CONF_OPEN_TIME = "open_time"
+CONF_CLOSE_TIME = "close_time"
 CONF_BRIGHTNESS_JOIN = "brightness_analog"
 CONF_BRIGHTNESS_FB_JOIN = "brightness_fb_analog"
 CONF_COLOR_TEMP_JOIN = "color_temp_analog"
@@ -81,6 +104,8 @@ CONF_DALI_2BYTE_ADDR_JOIN = '2byte_addr_analog'
 CONF_DALI_2BYTE_VALUE_JOIN = '2byte_value_analog'
 CONF_DALI_2BYTE_FB_JOIN = '2byte_fb_analog'
 CONF_DALI_EXEC_JOIN = 'execute_digital'
+CONF_DALI_GROUPS = "dali_groups"
+DALI_GATEWAYS = "dali_gateways"
 CONF_LIGHTS = "lights"
 CONF_MUTE_JOIN = "mute_digital"
 CONF_MUTE_FB_JOIN = "mute_fb_digital"
@@ -96,11 +121,47 @@ CONF_VALUE_JOIN = "value_analog"
 CONF_SERIAL_JOIN = "serial_join"
 CONF_SERIAL_FB_JOIN = "serial_fb_join"
 CONF_DIVISOR = "divisor"
+CONF_DEADBAND = "deadband"
+CONF_MIN_INTERVAL = "min_interval"
+CONF_AGGREGATE = "aggregate"
+CONF_AGGREGATE_WINDOW = "aggregate_window"
+CONF_FILTERS = "filters"
+CONF_RULES = "rules"
+CONF_DEBOUNCE = "debounce"
+CONF_RATE_LIMIT = "rate_limit"
+CONF_STORM_LIMIT = "storm_limit"
+CONF_STORM_HOLD = "storm_hold"
+CONF_MAX_QUEUE = "max_queue"
+CONF_OVERFLOW_POLICY = "overflow_policy"
+CONF_WRITE_BUFFER_HIGH = "write_buffer_high"
+CONF_JOURNAL_EXPIRY = "journal_expiry"
+CONF_CAPTURE = "capture"
+CONF_PROFILING = "profiling"
+CONF_SLOW_CALLBACK = "slow_callback"
+CONF_TOP = "top"
+CONF_LAG_INTERVAL = "lag_interval"
+CONF_HISTORY = "history"
+CONF_MAX_MEMORY = "max_memory"
+CONF_SIZE = "size"
+CONF_DIRECTION = "direction"
+CONF_SECONDS = "seconds"
+SERVICE_QUERY_HISTORY = "query_history"
+CONF_THROTTLE = "throttle"
+CONF_IO_THREAD = "io_thread"
+CONF_TLS = "tls"
+CONF_VERIFY = "verify"
+CONF_CA_FILE = "ca_file"
+CONF_CERT_FILE = "cert_file"
+CONF_KEY_FILE = "key_file"
+CONF_CHECK_HOSTNAME = "check_hostname"
 CONF_SWITCH_ON_JOIN = "switch_on_digital"
 CONF_SWITCH_OFF_JOIN = "switch_off_digital"
 CONF_SWITCH_FB_JOIN = "switch_fb_digital"
 CONF_BUTTON_JOIN = "button_digital"
 CONF_SCENE_JOIN = "scene_digital"
+CONF_HOLD_TIME = "hold_time"
+CONF_TAP_INTERVAL = "tap_interval"
+CONF_MAX_TAPS = "max_taps"
 CONF_MEDIA_ON_JOIN = "media_on_digital"
 CONF_MEDIA_OFF_JOIN = "media_off_digital"
 CONF_MEDIA_ON_FB_JOIN = "media_on_fb_digital"
@@ -110,6 +171,9 @@ CONF_MEDIA_STOP_JOIN = "media_stop_digital"
 CONF_MEDIA_NEXT_JOIN = "media_next_digital"
 CONF_MEDIA_PREVIOUS_JOIN = "media_previous_digital"
 CONF_MEDIA_PAUSE_JOIN = "media_pause_digital"
+CONF_VOLUME_INTERVAL = "volume_interval"
+CONF_VOLUME_STEP = "volume_step"
+CONF_VOLUME_RAMP_TIME = "volume_ramp_time"
 
 class SigType(StrEnum):
     DIGITAL = "d"
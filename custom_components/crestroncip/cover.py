@@ -1,5 +1,8 @@
 from typing import Any
 from . import XPanelClient,HomeAssistant
+from .reload import track_platform
+from .entity import JoinSubscriberMixin, OptimisticStateMixin
+from .device_manifest import manifest_configs
 import asyncio
 import logging
 import voluptuous as vol
@@ -10,7 +13,7 @@ from homeassistant.components.cover import (
     CoverEntityFeature,
     CoverDeviceClass
 )
-from homeassistant.const import CONF_NAME, CONF_TYPE
+from homeassistant.const import CONF_NAME, CONF_TYPE, CONF_OPTIMISTIC
 from .const import (
     HUB,
     DOMAIN,
@@ -24,10 +27,16 @@ from .const import (
     CONF_CLOSE_TILT_JOIN,
     CONF_STOP_TILT_JOIN,
     CONF_TILT_POSITION_JOIN,
-    CONF_TILT_POSITION_FB_JOIN
+    CONF_TILT_POSITION_FB_JOIN,
+    CONF_OPEN_TIME,
+    CONF_CLOSE_TIME,
+    CONF_FEEDBACK_TIMEOUT,
 )
 _LOGGER = logging.getLogger(__name__)
 
+# seconds for a full open or close, the position estimate divides by it
+TRAVEL_TIME = vol.All(vol.Coerce(float), vol.Range(min=0, min_included=False))
+
 PLATFORM_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_NAME): cv.string,
@@ -43,6 +52,10 @@ PLATFORM_SCHEMA = vol.Schema(
         vol.Optional(CONF_STOP_TILT_JOIN): cv.positive_int,
         vol.Optional(CONF_TILT_POSITION_JOIN): cv.positive_int,
         vol.Optional(CONF_TILT_POSITION_FB_JOIN): cv.positive_int,
+        vol.Inclusive(CONF_OPEN_TIME, 'travel_time'): TRAVEL_TIME,
+        vol.Inclusive(CONF_CLOSE_TIME, 'travel_time'): TRAVEL_TIME,
+        vol.Optional(CONF_OPTIMISTIC): cv.boolean,
+        vol.Optional(CONF_FEEDBACK_TIMEOUT): cv.positive_float,
     },
     extra=vol.ALLOW_EXTRA,
 )
@@ -58,12 +71,21 @@ CONF_COVER_TYPE_MAP = {
         | CoverEntityFeature.SET_TILT_POSITION | CoverEntityFeature.STOP_TILT | CoverEntityFeature.OPEN_TILT
         | CoverEntityFeature.CLOSE_TILT
     ),
-
 }
+TRAVEL_UPDATE_INTERVAL = 1.0
 
 
 async def async_setup_platform(hass: HomeAssistant, config, async_add_entities, discovery_info=None):
+    async_add_entities = track_platform(
+        hass, 'cover', config, async_add_entities, discovery_info)
     hub = hass.data[DOMAIN][HUB]
+    entity = [
+        entity for device in manifest_configs(discovery_info) or [config]
+        for entity in create_entities(hass, hub, device)]
+    async_add_entities(entity)
+
+
+def create_entities(hass, hub: XPanelClient, config) -> list:
     type = config.get(CONF_TYPE)
     entity = []
     if type == 'open_close':
@@ -72,10 +94,10 @@ async def async_setup_platform(hass: HomeAssistant, config, async_add_entities,
         entity = [PositionCurtain(hub, config, type)]
     elif type == 'tilt':
         entity = [TiltCurtain(hub, config, type)]
-    async_add_entities(entity)
+    return entity
 
 
-class OpenCloseCurtain(CoverEntity):
+class OpenCloseCurtain(OptimisticStateMixin, JoinSubscriberMixin, CoverEntity):
     def __init__(self, client: XPanelClient, config, type: str):
         self._hub = client
         self._open_join = config.get(CONF_OPEN_JOIN)
@@ -88,37 +110,153 @@ class OpenCloseCurtain(CoverEntity):
         self._attr_should_poll = False
         self._is_closed_fb_join = config.get(IS_CLOSED_FB_JOIN)
         self._attr_current_cover_position = 50
-        self._attr_is_closed = self._hub.get_digital(self._is_closed_fb_join)
+        self._attr_is_closed = False
+        self._open_time = config.get(CONF_OPEN_TIME)
+        self._close_time = config.get(CONF_CLOSE_TIME)
+        self._travel = type == 'open_close' and self._open_time is not None
+        # travel state: direction +1 opening / -1 closing, start time and position
+        self._direction = 0
+        self._start_time = 0.0
+        self._start_position = 0.0
+        self._target_position = None
+        self._stop_entry = None
+        self._update_entry = None
+        if self._travel:
+            self._attr_supported_features |= CoverEntityFeature.SET_POSITION
+        self.configure_optimistic(config, default=True)
 
-    async def async_added_to_hass(self):
-        await self._hub.register_callback(
-            "d", self._is_closed_fb_join, self.curtain_is_closed_callback)
-        self._is_closed = self._hub.get_digital(self._is_closed_fb_join)
-        self.schedule_update_ha_state()
+    def join_subscriptions(self):
+        return [("d", self._is_closed_fb_join, self.curtain_is_closed_callback)]
+
+    def initial_join_values(self, values):
+        self._attr_is_closed = bool(values[("d", self._is_closed_fb_join)])
+        if self._travel and self._attr_is_closed:
+            self._attr_current_cover_position = 0
 
     async def async_will_remove_from_hass(self):
-        await self._hub.remove_callback(self.curtain_is_closed_callback)
+        self._cancel_travel_timers()
+        await super().async_will_remove_from_hass()
 
     def curtain_is_closed_callback(self, sigtype, join, value):
+        self.feedback_received(sigtype, join, value)
         self._attr_is_closed = value
+        if self._travel and value and self._direction <= 0:
+            self._finish_travel(0)
         self.async_schedule_update_ha_state()
 
     async def async_open_cover(self, **kwargs):
         self._hub.pulse(self._open_join)
-        self._attr_is_closed = False
+        if self._travel:
+            # the travel model owns position and state, only track feedback
+            self._attr_is_closed = False
+            self.expect_feedback("d", self._is_closed_fb_join, 0)
+            self._start_travel(1, None)
+        else:
+            self.expect_feedback(
+                "d", self._is_closed_fb_join, 0, {"_attr_is_closed": False})
         self.async_schedule_update_ha_state()
 
     async def async_close_cover(self, **kwargs):
         self._hub.pulse(self._close_join)
-        self._attr_is_closed = True
+        if self._travel:
+            self.expect_feedback(
+                "d", self._is_closed_fb_join, 1,
+                timeout=self._close_time + self._feedback_timeout)
+            self._start_travel(-1, None)
+        else:
+            self.expect_feedback(
+                "d", self._is_closed_fb_join, 1, {"_attr_is_closed": True})
         self.async_schedule_update_ha_state()
 
     async def async_stop_cover(self, **kwargs):
         self._hub.pulse(self._stop_join)
+        if self._travel:
+            self._finish_travel(self._estimate_position())
+            self.async_write_ha_state()
+            return
         await asyncio.sleep(0.5)
         self._attr_is_closed = self._hub.get_digital(self._is_closed_fb_join)
         self.async_schedule_update_ha_state()
 
+    async def async_set_cover_position(self, **kwargs):
+        """Move to a position by timed open/close followed by stop."""
+        target = int(kwargs["position"])
+        current = self._estimate_position()
+        if target >= 100:
+            await self.async_open_cover()
+        elif target <= 0:
+            await self.async_close_cover()
+        elif target > current:
+            self._hub.pulse(self._open_join)
+            self._start_travel(1, target)
+        elif target < current:
+            self._hub.pulse(self._close_join)
+            self._start_travel(-1, target)
+        self.async_write_ha_state()
+
+    def _travel_time(self, direction: int) -> float:
+        return self._open_time if direction > 0 else self._close_time
+
+    def _estimate_position(self) -> float:
+        if self._direction == 0:
+            return self._attr_current_cover_position
+        elapsed = self._hub.timer.time() - self._start_time
+        moved = elapsed / self._travel_time(self._direction) * 100
+        return min(100.0, max(0.0, self._start_position + self._direction * moved))
+
+    def _start_travel(self, direction: int, target: int | None):
+        """Track a movement on the hub's shared timer."""
+        position = self._estimate_position()
+        self._cancel_travel_timers()
+        end_position = 100 if direction > 0 else 0
+        if target is not None:
+            end_position = target
+        self._direction = direction
+        self._start_time = self._hub.timer.time()
+        self._start_position = position
+        self._target_position = target
+        self._attr_is_opening = direction > 0
+        self._attr_is_closing = direction < 0
+        duration = abs(end_position - position) / 100 * self._travel_time(direction)
+        self._stop_entry = self._hub.timer.call_later(
+            duration, self._travel_finished)
+        self._update_entry = self._hub.timer.call_later(
+            TRAVEL_UPDATE_INTERVAL, self._travel_update)
+
+    def _travel_finished(self):
+        self._stop_entry = None
+        if self._target_position is not None:
+            # intermediate position, the motor has to be stopped
+            self._hub.pulse(self._stop_join)
+            self._finish_travel(self._target_position)
+        else:
+            self._finish_travel(100 if self._direction > 0 else 0)
+        self.async_write_ha_state()
+
+    def _travel_update(self):
+        self._update_entry = None
+        if self._direction == 0:
+            return
+        self._attr_current_cover_position = round(self._estimate_position())
+        self._update_entry = self._hub.timer.call_later(
+            TRAVEL_UPDATE_INTERVAL, self._travel_update)
+        self.async_write_ha_state()
+
+    def _finish_travel(self, position: float):
+        self._cancel_travel_timers()
+        self._direction = 0
+        self._target_position = None
+        self._attr_is_opening = False
+        self._attr_is_closing = False
+        self._attr_current_cover_position = round(position)
+        self._attr_is_closed = self._attr_current_cover_position == 0
+
+    def _cancel_travel_timers(self):
+        self._hub.timer.cancel(self._stop_entry)
+        self._hub.timer.cancel(self._update_entry)
+        self._stop_entry = None
+        self._update_entry = None
+
 
 class PositionCurtain(OpenCloseCurtain):
     def __init__(self, client: XPanelClient, config, device_type: str):
@@ -126,27 +264,31 @@ class PositionCurtain(OpenCloseCurtain):
         self._pos_join = config.get(CONF_POSITION_JOIN)
         self._pos_join_fb = config.get(CONF_POSITION_FB_JOIN)
 
-    async def async_added_to_hass(self):
-        await super().async_added_to_hass()
-        await self._hub.register_callback(
-            "a", self._pos_join_fb, self.curtain_position_callback)
-        self._attr_current_cover_position = self._hub.get_analog(
-            self._pos_join_fb)
-        self._attr_is_closed = self._hub.get_digital(self._is_closed_fb_join)
-        self.schedule_update_ha_state()
+    def join_subscriptions(self):
+        return super().join_subscriptions() + [
+            ("a", self._pos_join_fb, self.curtain_position_callback)]
 
-    async def async_will_remove_from_hass(self):
-        await super().async_will_remove_from_hass()
-        await self._hub.remove_callback("a", self._pos_join_fb)
+    def initial_join_values(self, values):
+        super().initial_join_values(values)
+        self._attr_current_cover_position = int(values[("a", self._pos_join_fb)])
 
     async def async_set_cover_position(self, **kwargs):
         position = int(kwargs["position"])
-        self._attr_current_cover_position = position
         self._hub.set_analog(self._pos_join, position)
-        self._attr_is_closed = not bool(position)
+        state = {
+            "_attr_current_cover_position": position,
+            "_attr_is_closed": not bool(position),
+        }
+        if self._pos_join_fb:
+            self.expect_feedback(
+                "a", self._pos_join_fb, position, state, tolerance=1)
+        else:
+            for attr, value in state.items():
+                setattr(self, attr, value)
         self.schedule_update_ha_state()
 
     def curtain_position_callback(self, sigtype, join, value):
+        self.feedback_received(sigtype, join, value)
         self._attr_is_closed = not bool(value)
         self._attr_current_cover_position = value
         self.schedule_update_ha_state()
@@ -166,16 +308,14 @@ class TiltCurtain(PositionCurtain):
         self._cover_tilt_pos_join = config.get(CONF_TILT_POSITION_JOIN)
         self._cover_tilt_pos_join_fb = config.get(CONF_TILT_POSITION_FB_JOIN)
 
-    async def async_added_to_hass(self):
-        await super().async_added_to_hass()
-        await self._hub.register_callback(
-            "a", self._cover_tilt_pos_join, self.curtain_tilt_callback)
-        self._attr_current_cover_tilt_position = self._hub.get_analog(
-            self._cover_tilt_pos_join_fb)
+    def join_subscriptions(self):
+        return super().join_subscriptions() + [
+            ("a", self._cover_tilt_pos_join_fb, self.curtain_tilt_callback)]
 
-    async def async_will_remove_from_hass(self):
-        await super().async_will_remove_from_hass()
-        await self._hub.remove_callback("a", self._cover_tilt_pos_join_fb)
+    def initial_join_values(self, values):
+        super().initial_join_values(values)
+        self._attr_current_cover_tilt_position = values[
+            ("a", self._cover_tilt_pos_join_fb)]
 
     async def async_open_cover_tilt(self, **kwargs):
         self._hub.pulse(self._cover_tilt_open_join)
@@ -0,0 +1,187 @@
+"""Compile the devices manifest into per-platform entity configs.
+
+A manifest entry describes one device, or a numbered series of them:
+
+    - platform: light
+      type: brightness
+      name: "Room light {N}"
+      range: 1-64
+      brightness_analog: 100+N
+      brightness_fb_analog: 100+N
+
+Join options may be a number or a pattern of N ("N", "100+N", "200+2N").
+Every entry is validated once against its platform schema, then expanded
+by substitution, and all joins go into one index so overlapping joins
+are reported at startup.
+"""
+import logging
+import re
+from importlib import import_module
+
+import voluptuous as vol
+from homeassistant.const import CONF_NAME, CONF_PLATFORM
+
+from .const import (
+    CONF_BUTTON_JOIN,
+    CONF_COLOR_TEMP_MAX,
+    CONF_COLOR_TEMP_MIN,
+    CONF_DALI_2BYTE_ADDR_JOIN,
+    CONF_DALI_2BYTE_FB_JOIN,
+    CONF_DALI_2BYTE_VALUE_JOIN,
+    CONF_DALI_EXEC_JOIN,
+    CONF_DEVICES,
+    CONF_RANGE,
+    CONF_SERIAL_FB_JOIN,
+    CONF_SERIAL_JOIN,
+    CONF_VALUE_JOIN,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+NUMBER = "{N}"
+PATTERN = re.compile(r"^\s*(?:(\d+)\s*\+\s*)?(?:(\d+)\s*\*?\s*)?N\s*$")
+
+# options named like joins that hold something else
+NOT_JOIN_KEYS = {CONF_COLOR_TEMP_MAX, CONF_COLOR_TEMP_MIN}
+# joins every light on one DALI gateway shares by design
+SHARED_JOIN_KEYS = {
+    CONF_DALI_2BYTE_ADDR_JOIN,
+    CONF_DALI_2BYTE_VALUE_JOIN,
+    CONF_DALI_2BYTE_FB_JOIN,
+    CONF_DALI_EXEC_JOIN,
+}
+# feedback joins whose option name has no _fb
+INPUT_JOIN_KEYS = {CONF_BUTTON_JOIN, CONF_VALUE_JOIN}
+SIGTYPE_SUFFIXES = (("_digital", "d"), ("_analog", "a"), ("_serial", "s"))
+
+
+def parse_pattern(value):
+    """Return (base, step) of a join pattern like "100+2N", None otherwise."""
+    if not isinstance(value, str):
+        return None
+    match = PATTERN.match(value)
+    if match is None:
+        return None
+    return int(match.group(1) or 0), int(match.group(2) or 1)
+
+
+def join_sigtype(key: str):
+    """Return the signal type of a join option, None for other options."""
+    if key in NOT_JOIN_KEYS:
+        return None
+    if key in (CONF_SERIAL_JOIN, CONF_SERIAL_FB_JOIN):
+        return "s"
+    for suffix, sigtype in SIGTYPE_SUFFIXES:
+        if key.endswith(suffix):
+            return sigtype
+    return None
+
+
+def manifest_configs(discovery_info) -> list:
+    """Return the compiled device configs handed to a platform by discovery."""
+    if not discovery_info:
+        return []
+    return discovery_info.get(CONF_DEVICES, [])
+
+
+class DeviceManifest:
+    """Expanded device configs per platform and a join to device index."""
+
+    def __init__(self):
+        self.devices = {}
+        self.index = {}
+        self.errors = 0
+
+    def compile(self, entries: list) -> "DeviceManifest":
+        schemas = {}
+        for entry in entries:
+            platform = entry[CONF_PLATFORM]
+            if platform not in schemas:
+                module = import_module(f".{platform}", __package__)
+                schemas[platform] = module.PLATFORM_SCHEMA
+            try:
+                configs = self._expand(entry, schemas[platform])
+            except vol.Invalid as err:
+                self.errors += 1
+                _LOGGER.error(
+                    f"devices: invalid {platform} entry {entry.get(CONF_NAME)}: {err}")
+                continue
+            self.devices.setdefault(platform, []).extend(configs)
+            for config in configs:
+                self._index(platform, config)
+
+        collisions = self.collisions()
+        if collisions:
+            _LOGGER.warning(
+                f"devices: {len(collisions)} joins used by more than one device: "
+                + ", ".join(
+                    f"{key} ({', '.join(names)})"
+                    for key, names in list(collisions.items())[:20]))
+        _LOGGER.info(
+            f"devices: {self.count()} devices from {len(entries)} entries, "
+            f"{len(self.index)} joins")
+        return self
+
+    def _expand(self, entry: dict, schema) -> list:
+        numbers = entry.get(CONF_RANGE)
+        template = {
+            key: value for key, value in entry.items()
+            if key not in (CONF_PLATFORM, CONF_RANGE)
+        }
+        patterns = {}
+        for key, value in template.items():
+            pattern = parse_pattern(value)
+            if pattern is not None:
+                patterns[key] = pattern
+        if patterns and numbers is None:
+            raise vol.Invalid(f"N is used by {', '.join(patterns)} but no range is set")
+        if numbers is None:
+            return [schema(template)]
+        if len(numbers) > 1 and NUMBER not in template[CONF_NAME]:
+            raise vol.Invalid(f"name needs {NUMBER} to number {len(numbers)} devices")
+
+        def substitute(config: dict, number: int) -> dict:
+            config = dict(config)
+            config[CONF_NAME] = template[CONF_NAME].replace(NUMBER, str(number))
+            for key, (base, step) in patterns.items():
+                join = base + step * number
+                if not 1 <= join <= 65535:
+                    raise vol.Invalid(f"{key} is {join} for N={number}")
+                config[key] = join
+            return config
+
+        # validate once, the numbered copies only differ in name and joins
+        validated = schema(substitute(template, numbers[0]))
+        return [substitute(validated, number) for number in numbers]
+
+    def _index(self, platform: str, config: dict):
+        name = f"{platform}.{config[CONF_NAME]}"
+        for key, join in config.items():
+            sigtype = join_sigtype(key)
+            if sigtype is None or key in SHARED_JOIN_KEYS:
+                continue
+            if not isinstance(join, int) or join < 1:
+                continue
+            direction = "in" if "_fb" in key or key in INPUT_JOIN_KEYS else "out"
+            self.index.setdefault((direction, sigtype, join), []).append(name)
+
+    def collisions(self) -> dict:
+        """Return {"out:a101": [device, ...]} for joins used more than once."""
+        return {
+            f"{direction}:{sigtype}{join}": sorted(set(names))
+            for (direction, sigtype, join), names in sorted(self.index.items())
+            if len(set(names)) > 1
+        }
+
+    def count(self) -> int:
+        return sum(len(configs) for configs in self.devices.values())
+
+    def stats(self) -> dict:
+        return {
+            "devices": {
+                platform: len(configs) for platform, configs in self.devices.items()
+            },
+            "joins": len(self.index),
+            "invalid_entries": self.errors,
+            "collisions": self.collisions(),
+        }
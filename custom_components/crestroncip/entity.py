@@ -0,0 +1,300 @@
+"""Shared helpers for Crestron entities."""
+import logging
+
+from homeassistant.const import CONF_OPTIMISTIC
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    DOMAIN,
+    SUBSCRIPTION_BATCHERS,
+    FEEDBACK_STATS,
+    CONF_FEEDBACK_TIMEOUT,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_FEEDBACK_TIMEOUT = 3.0
+
+
+class SubscriptionBatcher:
+    """Register the joins of all entities added in one loop iteration at once.
+
+    Platform entries are set up concurrently, so the entities of a large
+    configuration reach async_added_to_hass in the same few iterations;
+    their subscriptions go to the hub in one subscribe_many call instead
+    of one lock round trip per join.
+    """
+
+    def __init__(self, hass: HomeAssistant, hub):
+        self._hass = hass
+        self._hub = hub
+        self._pending = []
+
+    def add(self, subscriptions: list):
+        """Queue (sigtype, join, callback) triples, resolve to their values."""
+        future = self._hass.loop.create_future()
+        if not self._pending:
+            self._hass.loop.call_soon(self._flush)
+        self._pending.append((subscriptions, future))
+        return future
+
+    def _flush(self):
+        batch, self._pending = self._pending, []
+        self._hass.async_create_task(self._subscribe(batch))
+
+    async def _subscribe(self, batch):
+        try:
+            values = await self._hub.subscribe_many(
+                [sub for subscriptions, _ in batch for sub in subscriptions])
+        except Exception as err:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(err)
+            return
+        _LOGGER.debug(
+            f"subscribed {len(values)} joins for {len(batch)} entities")
+        start = 0
+        abandoned = []
+        for subscriptions, future in batch:
+            end = start + len(subscriptions)
+            if future.done():
+                # the entity was cancelled while waiting, drop its callbacks
+                abandoned.extend(subscriptions)
+            else:
+                future.set_result(values[start:end])
+            start = end
+        if abandoned:
+            await self._hub.unsubscribe_many(abandoned)
+
+
+def subscription_batcher(hass: HomeAssistant, hub) -> SubscriptionBatcher:
+    batchers = hass.data[DOMAIN].setdefault(SUBSCRIPTION_BATCHERS, {})
+    if hub not in batchers:
+        batchers[hub] = SubscriptionBatcher(hass, hub)
+    return batchers[hub]
+
+
+class JoinSubscriberMixin:
+    """Entity declaring its feedback joins instead of registering them.
+
+    join_subscriptions() returns (sigtype, join, callback) triples; they
+    are registered in bulk when the entity is added and the current
+    values come back as {(sigtype, join): value} through
+    initial_join_values() before the first state write.
+    """
+
+    def join_subscriptions(self) -> list:
+        return []
+
+    def initial_join_values(self, values: dict) -> None:
+        pass
+
+    async def async_added_to_hass(self):
+        subscriptions = self.join_subscriptions()
+        if subscriptions:
+            values = await subscription_batcher(self.hass, self._hub).add(
+                subscriptions)
+            self.initial_join_values({
+                (sigtype, join): value
+                for (sigtype, join, _), value in zip(subscriptions, values)
+            })
+        await super().async_added_to_hass()
+
+    async def async_will_remove_from_hass(self):
+        subscriptions = self.join_subscriptions()
+        if subscriptions:
+            await self._hub.unsubscribe_many(subscriptions)
+        await super().async_will_remove_from_hass()
+
+class CoalescedStateMixin:
+    """Merge several feedback callbacks into a single state write.
+
+    Join callbacks for one incoming frame are dispatched in the same loop
+    iteration, so deferring the write with call_soon turns 3-5 channel
+    updates into one state write.
+    """
+
+    _write_scheduled = False
+
+    def schedule_coalesced_write(self) -> None:
+        if self._write_scheduled or self.hass is None:
+            return
+        self._write_scheduled = True
+        self.hass.loop.call_soon(self._coalesced_write)
+
+    def _coalesced_write(self) -> None:
+        self._write_scheduled = False
+        if self.hass is not None:
+            self.async_write_ha_state()
+
+
+class FeedbackStats:
+    """How often and how late feedback confirms commanded states."""
+
+    def __init__(self):
+        self.commands = 0
+        self.unchanged = 0
+        self.confirmed = 0
+        self.corrected = 0
+        self.rolled_back = 0
+        self.missed = 0
+        self.late = 0
+        self._latency_sum = 0.0
+        self._latency_max = 0.0
+        self._late_max = 0.0
+        self.entities = {}
+
+    def record_confirmed(self, latency: float):
+        self.confirmed += 1
+        self._latency_sum += latency
+        self._latency_max = max(self._latency_max, latency)
+
+    def record_late(self, entity_id: str, latency: float):
+        self.late += 1
+        self._late_max = max(self._late_max, latency)
+        self._count(entity_id, "late")
+
+    def record_timeout(self, entity_id: str, outcome: str):
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        self._count(entity_id, outcome)
+
+    def _count(self, entity_id: str, outcome: str):
+        counts = self.entities.setdefault(entity_id, {})
+        counts[outcome] = counts.get(outcome, 0) + 1
+
+    def as_dict(self) -> dict:
+        return {
+            "commands": self.commands,
+            "unchanged": self.unchanged,
+            "confirmed": self.confirmed,
+            "corrected": self.corrected,
+            "rolled_back": self.rolled_back,
+            "missed": self.missed,
+            "late": self.late,
+            "latency_mean": round(self._latency_sum / self.confirmed, 4)
+            if self.confirmed else None,
+            "latency_max": round(self._latency_max, 4),
+            "late_max": round(self._late_max, 4),
+            "entities": self.entities,
+        }
+
+
+def feedback_stats(hass: HomeAssistant) -> FeedbackStats:
+    data = hass.data[DOMAIN]
+    if FEEDBACK_STATS not in data:
+        data[FEEDBACK_STATS] = FeedbackStats()
+    return data[FEEDBACK_STATS]
+
+
+class _Expected:
+    __slots__ = ("value", "tolerance", "sent", "previous", "entry", "seen")
+
+    def __init__(self, value, tolerance, sent, previous, entry):
+        self.value = value
+        self.tolerance = tolerance
+        self.sent = sent
+        self.previous = previous
+        self.entry = entry
+        self.seen = False
+
+    def matches(self, value) -> bool:
+        if isinstance(self.value, str):
+            return value == self.value
+        return abs(int(value) - int(self.value)) <= self.tolerance
+
+
+class OptimisticStateMixin:
+    """Apply commanded state at once and reconcile it with feedback.
+
+    expect_feedback() records the feedback join value a command should
+    produce. With optimistic set the commanded attributes are applied
+    right away and their previous values kept. Feedback matching the
+    expected value confirms the command; other feedback is adopted by
+    the entity as usual and, once feedback_timeout passes without a
+    match, the command counts as corrected. Without any feedback the
+    previous attributes are restored. Feedback turning up after that is
+    counted as late.
+    """
+
+    _optimistic = False
+    _feedback_timeout = DEFAULT_FEEDBACK_TIMEOUT
+    _expected = None
+    _late = None
+
+    def configure_optimistic(self, config, default: bool):
+        self._optimistic = config.get(CONF_OPTIMISTIC, default)
+        self._feedback_timeout = config.get(
+            CONF_FEEDBACK_TIMEOUT, DEFAULT_FEEDBACK_TIMEOUT)
+        self._expected = {}
+        self._late = {}
+
+    def expect_feedback(self, sigtype, join, value, state=None, tolerance=0,
+                        timeout=None):
+        """Track the feedback of a command, applying state if optimistic."""
+        state = state or {}
+        stats = feedback_stats(self.hass)
+        stats.commands += 1
+        key = (sigtype, join)
+        pending = self._expected.pop(key, None)
+        self._late.pop(key, None)
+        previous = {attr: getattr(self, attr) for attr in state}
+        if pending is not None:
+            self._hub.timer.cancel(pending.entry)
+            # a rollback goes back to the state before the first command
+            previous = {**previous, **pending.previous}
+        if self._optimistic:
+            for attr, attr_value in state.items():
+                setattr(self, attr, attr_value)
+        expected = _Expected(value, tolerance, self._hub.timer.time(),
+                             previous if self._optimistic else {}, None)
+        if expected.matches(self._hub.get(sigtype, join)):
+            # already there, the processor will not report a change
+            stats.unchanged += 1
+            return
+        expected.entry = self._hub.timer.call_later(
+            timeout or self._feedback_timeout, self._feedback_timed_out, key)
+        self._expected[key] = expected
+
+    def feedback_received(self, sigtype, join, value):
+        """Call from join callbacks before the feedback is adopted."""
+        key = (sigtype, join)
+        pending = self._expected.get(key)
+        if pending is not None:
+            if pending.matches(value):
+                del self._expected[key]
+                self._hub.timer.cancel(pending.entry)
+                feedback_stats(self.hass).record_confirmed(
+                    self._hub.timer.time() - pending.sent)
+            else:
+                pending.seen = True
+            return
+        late = self._late.pop(key, None) if self._late else None
+        if late is not None and late.matches(value):
+            feedback_stats(self.hass).record_late(
+                self.entity_id, self._hub.timer.time() - late.sent)
+
+    def _feedback_timed_out(self, key):
+        pending = self._expected.pop(key, None)
+        if pending is None or self.hass is None:
+            return
+        stats = feedback_stats(self.hass)
+        if pending.seen:
+            stats.record_timeout(self.entity_id, "corrected")
+            return
+        self._late[key] = pending
+        if not pending.previous:
+            stats.record_timeout(self.entity_id, "missed")
+            return
+        _LOGGER.debug(
+            f"{self.entity_id}: no feedback on {key[0]}{key[1]}, rolling back")
+        for attr, value in pending.previous.items():
+            setattr(self, attr, value)
+        stats.record_timeout(self.entity_id, "rolled_back")
+        self.async_write_ha_state()
+
+    async def async_will_remove_from_hass(self):
+        if self._expected:
+            for pending in self._expected.values():
+                self._hub.timer.cancel(pending.entry)
+            self._expected.clear()
+        await super().async_will_remove_from_hass()
@@ -0,0 +1,152 @@
+"""Platform for Crestron keypad button events."""
+
+import voluptuous as vol
+import logging
+
+import homeassistant.helpers.config_validation as cv
+from homeassistant.components.event import EventDeviceClass, EventEntity
+from homeassistant.const import CONF_NAME
+from .const import (HUB, DOMAIN, CONF_BUTTON_JOIN, CONF_HOLD_TIME,
+                    CONF_TAP_INTERVAL, CONF_MAX_TAPS)
+from . import XPanelClient
+from .reload import track_platform
+from .entity import JoinSubscriberMixin
+from .device_manifest import manifest_configs
+_LOGGER = logging.getLogger(__name__)
+
+EVENT_PRESS = "press"
+EVENT_DOUBLE_PRESS = "double_press"
+EVENT_MULTI_PRESS = "multi_press"
+EVENT_LONG_PRESS = "long_press"
+EVENT_RELEASE = "release"
+
+PLATFORM_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_NAME): cv.string,
+        vol.Required(CONF_BUTTON_JOIN): cv.positive_int,
+        vol.Optional(CONF_HOLD_TIME, default=0.8): cv.positive_float,
+        vol.Optional(CONF_TAP_INTERVAL, default=0.35): cv.positive_float,
+        vol.Optional(CONF_MAX_TAPS, default=2): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=5)),
+    },
+    extra=vol.ALLOW_EXTRA,
+)
+
+
+def create_entities(hass, hub: XPanelClient, config) -> list:
+    device_name = config.get(CONF_NAME)
+    if isinstance(device_name, str) and device_name != "":
+        return [ButtonEvent(hub, config)]
+    return []
+
+
+async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
+    async_add_entities = track_platform(
+        hass, 'event', config, async_add_entities, discovery_info)
+    hub = hass.data[DOMAIN][HUB]
+    entity = [
+        entity for device in manifest_configs(discovery_info) or [config]
+        for entity in create_entities(hass, hub, device)]
+    if entity:
+        async_add_entities(entity)
+
+
+class ButtonEvent(JoinSubscriberMixin, EventEntity):
+    """Turn the raw edges of a button join into one event per gesture.
+
+    A press held for hold_time fires long_press and its release fires
+    release with the hold duration. Short presses are counted until
+    tap_interval passes without another one, then fire press,
+    double_press or multi_press; reaching max_taps fires at once, so
+    with max_taps 1 a press is reported on release without waiting.
+    Hold and tap deadlines run on the hub's shared timer.
+    """
+
+    _attr_device_class = EventDeviceClass.BUTTON
+    _attr_should_poll = False
+
+    def __init__(self, hub: XPanelClient, config):
+        self._hub = hub
+        self._attr_name = config.get(CONF_NAME)
+        self._join = config.get(CONF_BUTTON_JOIN)
+        self._attr_unique_id = f"{self._attr_name}_event_{self._join}"
+        self._hold_time = config.get(CONF_HOLD_TIME, 0.8)
+        self._tap_interval = config.get(CONF_TAP_INTERVAL, 0.35)
+        self._max_taps = config.get(CONF_MAX_TAPS, 2)
+        event_types = [EVENT_PRESS, EVENT_LONG_PRESS, EVENT_RELEASE]
+        if self._max_taps >= 2:
+            event_types.append(EVENT_DOUBLE_PRESS)
+        if self._max_taps >= 3:
+            event_types.append(EVENT_MULTI_PRESS)
+        self._attr_event_types = event_types
+        self._down = False
+        self._holding = False
+        self._pressed_at = 0.0
+        self._taps = 0
+        self._hold_entry = None
+        self._tap_entry = None
+
+    def join_subscriptions(self):
+        return [("d", self._join, self.process_callback)]
+
+    async def async_will_remove_from_hass(self):
+        self._hub.timer.cancel(self._hold_entry)
+        self._hub.timer.cancel(self._tap_entry)
+        self._hold_entry = None
+        self._tap_entry = None
+        await super().async_will_remove_from_hass()
+
+    def process_callback(self, sigtype, join, value):
+        if value and not self._down:
+            self._pressed()
+        elif not value and self._down:
+            self._released()
+
+    def _pressed(self):
+        self._down = True
+        self._pressed_at = self._hub.timer.time()
+        # a further tap of a series, its deadline restarts on release
+        self._hub.timer.cancel(self._tap_entry)
+        self._tap_entry = None
+        self._hold_entry = self._hub.timer.call_later(
+            self._hold_time, self._hold_reached)
+
+    def _released(self):
+        self._down = False
+        self._hub.timer.cancel(self._hold_entry)
+        self._hold_entry = None
+        if self._holding:
+            self._holding = False
+            self._fire(EVENT_RELEASE, {
+                "duration": round(self._hub.timer.time() - self._pressed_at, 3)})
+            return
+        self._taps += 1
+        if self._taps >= self._max_taps:
+            self._taps_done()
+        else:
+            self._tap_entry = self._hub.timer.call_later(
+                self._tap_interval, self._taps_done)
+
+    def _hold_reached(self):
+        self._hold_entry = None
+        self._holding = True
+        # taps before the hold do not make a gesture of their own
+        self._taps = 0
+        self._fire(EVENT_LONG_PRESS)
+
+    def _taps_done(self):
+        self._tap_entry = None
+        taps, self._taps = self._taps, 0
+        if taps == 1:
+            self._fire(EVENT_PRESS)
+        elif taps == 2:
+            self._fire(EVENT_DOUBLE_PRESS)
+        elif taps > 2:
+            self._fire(EVENT_MULTI_PRESS, {"taps": taps})
+
+    def _fire(self, event_type: str, attributes: dict | None = None):
+        _LOGGER.debug(f"{self._attr_name}: {event_type} {attributes or ''}")
+        if self.hass is None:
+            return
+        self._trigger_event(event_type, attributes)
+        self.async_write_ha_state()
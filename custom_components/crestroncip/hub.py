@@ -0,0 +1,138 @@
+"""Home Assistant adapters for the CIP client."""
+import asyncio
+import logging
+import threading
+
+from homeassistant.core import HomeAssistant
+
+from .cipasync import CIPClient, SharedTimer
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class XPanelClient(CIPClient):
+    """CIP client running on Home Assistant's loop.
+
+    Tasks are created as background tasks of hass and inbound joins are
+    fired on the event bus as xpanel_receive.
+    """
+
+    def __init__(self, hass: HomeAssistant, host: str, ip_id: int, loop=None, **kwargs):
+        self.hass = hass
+        super().__init__(
+            host, ip_id, loop=loop or hass.loop,
+            create_task=hass.async_create_background_task,
+            fire_event=hass.bus.async_fire, **kwargs)
+
+
+class ThreadedXPanelClient(XPanelClient):
+    """CIP client whose connection and codec run on a worker thread.
+
+    Connecting, parsing, filtering, heartbeats and writes happen on the
+    worker's own event loop, so a busy Home Assistant loop does not delay
+    protocol timing. Inbound joins are handed to the Home Assistant loop
+    in batches, one per received frame, keeping only the latest analog
+    and serial value; digital changes are kept in order. Join dispatch,
+    entity callbacks, the online callback and the offline journal stay
+    on the Home Assistant loop; outbound packets and held buttons are
+    posted back to the worker, which alone repeats them. The worker
+    publishes its connection state to the Home Assistant loop the same
+    way, and that loop reads only the published copy.
+    """
+
+    def __init__(self, hass: HomeAssistant, host: str, ip_id: int, **kwargs):
+        self._io_loop = asyncio.new_event_loop()
+        super().__init__(hass, host, ip_id, loop=self._io_loop, **kwargs)
+        # entities schedule on the Home Assistant loop
+        self.timer = SharedTimer(hass.loop)
+        self._io_thread: threading.Thread | None = None
+        self._batch_lock = threading.Lock()
+        self._batch = {}
+        self._batch_seq = 0
+        # connection state as last published by the worker, read on the
+        # Home Assistant loop instead of the worker's own attributes
+        self._link_connected = False
+        self._link_sendable = False
+
+    async def start(self):
+        self._io_thread = threading.Thread(
+            target=self._io_loop.run_forever,
+            name=f"crestroncip {self.host}", daemon=True)
+        self._io_thread.start()
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(
+            self._io_start(), self._io_loop))
+        self.send_event_task = self.hass.async_create_background_task(
+            self._start_event(), 'send_event')
+
+    async def _io_start(self):
+        await self._create_conn()
+        loop = self._io_loop
+        self._check_conn_task = loop.create_task(self._check_conn_state())
+        self._send_msg_task = loop.create_task(self._send_queue())
+        if len(self.endpoints) > 1:
+            self._standby_task = loop.create_task(self._keep_standby())
+
+    async def stop(self):
+        if self._io_thread is None:
+            return
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(
+            super().stop(), self._io_loop))
+        self._io_loop.call_soon_threadsafe(self._io_loop.stop)
+        await self.hass.async_add_executor_job(self._io_thread.join, 5)
+        if not self._io_thread.is_alive():
+            self._io_loop.close()
+        self._io_thread = None
+
+    def create_task(self, coro, name: str):
+        return self._io_loop.create_task(coro, name=name)
+
+    def _put_tx(self, tx: bytes, lane: int, key=None, supersedes=()) -> bool:
+        self._io_loop.call_soon_threadsafe(
+            self._tx_queue.put, tx, lane, key, supersedes)
+        return True
+
+    def _track_button(self, join, tx: bytes | None):
+        self._io_loop.call_soon_threadsafe(super()._track_button, join, tx)
+
+    def _link_changed(self):
+        # posted in order with _notify_online and _resync_outbound
+        self.hass.loop.call_soon_threadsafe(
+            self._publish_link, self.connected is True, super()._can_send())
+
+    def _publish_link(self, connected: bool, sendable: bool):
+        self._link_connected = connected
+        self._link_sendable = sendable
+
+    def _can_send(self) -> bool:
+        return self._link_sendable
+
+    def is_connected(self) -> bool:
+        return self._link_connected
+
+    def _notify_online(self, online: bool):
+        self.hass.loop.call_soon_threadsafe(super()._notify_online, online)
+
+    def _resync_outbound(self):
+        self.hass.loop.call_soon_threadsafe(super()._resync_outbound)
+
+    def _deliver_inbound(self, sigtype, join, value):
+        """Collect an inbound join on the worker for the next hand-over."""
+        with self._batch_lock:
+            if sigtype == "d":
+                # every digital edge matters, key them by arrival
+                self._batch_seq += 1
+                key = (sigtype, join, self._batch_seq)
+            else:
+                key = (sigtype, join)
+            schedule = not self._batch
+            self._batch[key] = value
+        if schedule:
+            self.hass.loop.call_soon_threadsafe(self._hand_over)
+
+    def _hand_over(self):
+        """Dispatch a batch of inbound joins on the Home Assistant loop."""
+        with self._batch_lock:
+            batch, self._batch = self._batch, {}
+        for key, value in batch.items():
+            self._queue_event(("in", key[0], key[1], value, None))
+            self._announce(key[0], key[1], value)
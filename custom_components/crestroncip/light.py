@@ -1,6 +1,7 @@
 """Platform for Crestron Light integration."""
 import asyncio
 from collections import defaultdict
+from functools import lru_cache
 import voluptuous as vol
 import logging
 import homeassistant.helpers.config_validation as cv
@@ -9,8 +10,14 @@ from homeassistant.components.light import (
     LightEntity,
     ColorMode,
     ATTR_BRIGHTNESS,
-    ATTR_COLOR_TEMP_KELVIN)
-from homeassistant.const import CONF_NAME, CONF_TYPE
+    ATTR_COLOR_TEMP_KELVIN,
+    ATTR_HS_COLOR,
+    ATTR_XY_COLOR,
+    ATTR_RGB_COLOR,
+    ATTR_RGBW_COLOR,
+    ATTR_RGBWW_COLOR)
+from homeassistant.const import CONF_NAME, CONF_TYPE, CONF_OPTIMISTIC
+from homeassistant.core import HomeAssistant
 from .const import (
     HUB,
     DOMAIN,
@@ -24,25 +31,63 @@ from .const import (
     CONF_COLOR_COOL_JOIN,
     CONF_COLOR_WARM_JOIN,
     CONF_COLOR_TEMP_MAX,
-    CONF_COLOR_TEMP_MIN)
+    CONF_COLOR_TEMP_MIN,
+    CONF_COLOR_R_JOIN,
+    CONF_COLOR_G_JOIN,
+    CONF_COLOR_B_JOIN,
+    CONF_COLOR_W_JOIN,
+    CONF_COLOR_WW_JOIN,
+    CONF_COLOR_R_FB_JOIN,
+    CONF_COLOR_G_FB_JOIN,
+    CONF_COLOR_B_FB_JOIN,
+    CONF_COLOR_W_FB_JOIN,
+    CONF_COLOR_WW_FB_JOIN,
+    CONF_SHORT_ADDR,
+    CONF_DALI_2BYTE_ADDR_JOIN,
+    CONF_DALI_2BYTE_VALUE_JOIN,
+    CONF_DALI_2BYTE_FB_JOIN,
+    CONF_DALI_EXEC_JOIN,
+    CONF_DALI_GROUPS,
+    CONF_FEEDBACK_TIMEOUT,
+    DALI_GATEWAYS)
 from . import XPanelClient
+from .entity import CoalescedStateMixin, JoinSubscriberMixin, OptimisticStateMixin
+from .reload import track_platform
+from .device_manifest import manifest_configs
 from homeassistant.util import color
 _LOGGER = logging.getLogger(__name__)
 CONF_SWITCH = "switch"
 CONF_BRIGHTNESS = "brightness"
 CONF_COLOR_TEMP = "color_temp"
-
+CONF_RGB = "rgb"
+CONF_RGBW = "rgbw"
+CONF_RGBWW = "rgbww"
+CONF_DALI = "dali"
+DALI_ACK_TIMEOUT = 1.0
+# a DALI forward frame plus settling time, the least gap between commands
+DALI_COMMAND_INTERVAL = 0.1
+DALI_BROADCAST = 127
+# analog feedback within one HA brightness step confirms a brightness command
+BRIGHTNESS_TOLERANCE = 257
 
 
 CONF_SUPPORT_COLOR_MODES_MAP = {
     CONF_SWITCH: set([ColorMode.ONOFF,]),
     CONF_BRIGHTNESS: set([ColorMode.BRIGHTNESS,]),
     CONF_COLOR_TEMP: set([ColorMode.COLOR_TEMP,]),
+    CONF_RGB: set([ColorMode.RGB,]),
+    CONF_RGBW: set([ColorMode.RGBW,]),
+    CONF_RGBWW: set([ColorMode.RGBWW,]),
+    CONF_DALI: set([ColorMode.BRIGHTNESS,]),
 }
 CONF_COLOR_MODE_MAP = {
     CONF_SWITCH: ColorMode.ONOFF,
     CONF_BRIGHTNESS: ColorMode.BRIGHTNESS,
     CONF_COLOR_TEMP: ColorMode.COLOR_TEMP,
+    CONF_RGB: ColorMode.RGB,
+    CONF_RGBW: ColorMode.RGBW,
+    CONF_RGBWW: ColorMode.RGBWW,
+    CONF_DALI: ColorMode.BRIGHTNESS,
 }
 
 
@@ -61,6 +106,25 @@ PLATFORM_SCHEMA = vol.Schema(
         vol.Optional(CONF_COLOR_WARM_JOIN): cv.positive_int,
         vol.Optional(CONF_COLOR_TEMP_MAX): cv.positive_int,
         vol.Optional(CONF_COLOR_TEMP_MIN): cv.positive_int,
+        vol.Optional(CONF_COLOR_R_JOIN): cv.positive_int,
+        vol.Optional(CONF_COLOR_G_JOIN): cv.positive_int,
+        vol.Optional(CONF_COLOR_B_JOIN): cv.positive_int,
+        vol.Optional(CONF_COLOR_W_JOIN): cv.positive_int,
+        vol.Optional(CONF_COLOR_WW_JOIN): cv.positive_int,
+        vol.Optional(CONF_COLOR_R_FB_JOIN): cv.positive_int,
+        vol.Optional(CONF_COLOR_G_FB_JOIN): cv.positive_int,
+        vol.Optional(CONF_COLOR_B_FB_JOIN): cv.positive_int,
+        vol.Optional(CONF_COLOR_W_FB_JOIN): cv.positive_int,
+        vol.Optional(CONF_COLOR_WW_FB_JOIN): cv.positive_int,
+        vol.Optional(CONF_SHORT_ADDR): vol.All(int, vol.Range(min=0, max=127)),
+        vol.Optional(CONF_DALI_GROUPS, default=[]): vol.All(
+            cv.ensure_list, [vol.All(int, vol.Range(min=0, max=15))]),
+        vol.Optional(CONF_DALI_2BYTE_ADDR_JOIN): cv.positive_int,
+        vol.Optional(CONF_DALI_2BYTE_VALUE_JOIN): cv.positive_int,
+        vol.Optional(CONF_DALI_2BYTE_FB_JOIN): cv.positive_int,
+        vol.Optional(CONF_DALI_EXEC_JOIN): cv.positive_int,
+        vol.Optional(CONF_OPTIMISTIC): cv.boolean,
+        vol.Optional(CONF_FEEDBACK_TIMEOUT): cv.positive_float,
     },
     extra=vol.ALLOW_EXTRA,
 )
@@ -96,13 +160,171 @@ def scale_65535_to_255(value: int):
     return int(value*255/65535)
 
 
+@lru_cache(maxsize=256)
+def color_to_channels(color: tuple, brightness: int) -> tuple:
+    """(r,g,b[,w[,ww]]) 0-255 at brightness -> channel analog values 0-65535."""
+    return tuple(scale_255_to_65535(round(c))
+                 for c in scale_color_to_brightness(color, brightness))
+
+
+@lru_cache(maxsize=256)
+def channels_to_color(channels: tuple) -> tuple:
+    """Channel analog values 0-65535 -> ((r,g,b[,w[,ww]]), brightness)."""
+    levels = [scale_65535_to_255(c) for c in channels]
+    brightness = max(levels)
+    if brightness == 0:
+        return (tuple(255 for _ in levels), 0)
+    return (tuple(round(c * 255 / brightness) for c in levels), brightness)
+
+
+@lru_cache(maxsize=256)
+def rgb_to_channel_color(rgb: tuple, channel_count: int) -> tuple:
+    """Split the white part of an rgb colour onto the w/ww channels."""
+    if channel_count == 3:
+        return tuple(rgb)
+    white = min(rgb)
+    color_rgb = tuple(c - white for c in rgb)
+    if channel_count == 4:
+        return color_rgb + (white,)
+    return color_rgb + (white // 2, white - white // 2)
+
+
+@lru_cache(maxsize=256)
+def hs_to_channel_color(hs_color: tuple, channel_count: int) -> tuple:
+    return rgb_to_channel_color(color.color_hs_to_RGB(*hs_color), channel_count)
+
+
+@lru_cache(maxsize=256)
+def xy_to_channel_color(xy_color: tuple, channel_count: int) -> tuple:
+    return rgb_to_channel_color(color.color_xy_to_RGB(*xy_color), channel_count)
+
+
 def calc_dali_short_addr(short_addr: int) -> tuple[int, int]:
+    """0-63 short address, 64-79 group 0-15, anything above is broadcast."""
     if short_addr > 79:
         short_addr = 127
     return ((short_addr << 1), (short_addr << 1) | 1)
 
 
-class CrestronLightBase(LightEntity):
+def scale_255_to_dali(value: int) -> int:
+    """HA brightness 0-255 -> DALI arc power level 0-254."""
+    if value <= 0:
+        return 0
+    return max(1, round(value * 254 / 255))
+
+
+def scale_dali_to_255(value: int) -> int:
+    if value <= 0:
+        return 0
+    return min(255, round(value * 255 / 254))
+
+
+class DaliGateway:
+    """Serialise DALI commands over one set of 2-byte address/value joins.
+
+    Commands wait in an insertion-ordered dict keyed by the DALI address
+    byte, so a newer level for the same address replaces the queued one
+    and a broadcast drops every level still waiting. One command is in
+    flight at a time: address and value go out as one batch, execute is
+    pulsed, and the next command is sent once the feedback join reports
+    the address or level just sent, or DALI_ACK_TIMEOUT expires. Commands
+    are never closer than DALI_COMMAND_INTERVAL, which alone paces the
+    gateway when it has no feedback join.
+    """
+
+    def __init__(self, hass: HomeAssistant, client: XPanelClient, addr_join: int,
+                 value_join: int, exec_join: int, fb_join: int | None) -> None:
+        self._hass = hass
+        self._hub = client
+        self._addr_join = addr_join
+        self._value_join = value_join
+        self._exec_join = exec_join
+        self._fb_join = fb_join
+        self._pending: dict[int, int] = {}
+        self._ack: asyncio.Future | None = None
+        self._sent: tuple[int, int] | None = None
+        self._task: asyncio.Task | None = None
+        self._lights: list["DaliLight"] = []
+        self._fb_registered = False
+
+    async def add_light(self, light: "DaliLight"):
+        self._lights.append(light)
+        if self._fb_join and not self._fb_registered:
+            self._fb_registered = True
+            await self._hub.register_callback(
+                "a", self._fb_join, self.process_fb_callback)
+
+    def remove_light(self, light: "DaliLight"):
+        if light in self._lights:
+            self._lights.remove(light)
+
+    def send_level(self, short_addr: int, level: int):
+        address = calc_dali_short_addr(short_addr)[0]
+        if address == calc_dali_short_addr(DALI_BROADCAST)[0]:
+            # a broadcast level supersedes every level still queued
+            self._pending.clear()
+        self._pending[address] = level
+        if self._task is None or self._task.done():
+            self._task = self._hass.async_create_background_task(
+                self._run(), "dali_gateway")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_send = 0.0
+        while self._pending:
+            delay = next_send - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                if not self._pending:
+                    break
+            address = next(iter(self._pending))
+            level = self._pending.pop(address)
+            self._ack = loop.create_future()
+            self._sent = (address, level)
+            self._hub.set_many([
+                ("a", self._addr_join, address),
+                ("a", self._value_join, level),
+            ])
+            self._hub.pulse(self._exec_join)
+            next_send = loop.time() + DALI_COMMAND_INTERVAL
+            acked = True
+            if self._fb_join:
+                try:
+                    await asyncio.wait_for(self._ack, DALI_ACK_TIMEOUT)
+                except asyncio.TimeoutError:
+                    acked = False
+                    _LOGGER.warning(
+                        f"dali gateway {self._addr_join}: no feedback for "
+                        f"address {address:#04x} level {level}")
+            self._ack = None
+            self._sent = None
+            if acked:
+                for light in self._lights:
+                    if light.dali_addressed_by(address):
+                        light.process_dali_level(level)
+
+    def process_fb_callback(self, sigtype, join, value):
+        # a late echo of an earlier command must not ack the current one
+        if (self._ack is not None and not self._ack.done()
+                and self._sent is not None and value in self._sent):
+            self._ack.set_result(value)
+
+
+def get_dali_gateway(hass: HomeAssistant, client: XPanelClient, config: ConfigType) -> DaliGateway:
+    """Return the gateway shared by every light using the same DALI joins."""
+    key = (
+        config.get(CONF_DALI_2BYTE_ADDR_JOIN),
+        config.get(CONF_DALI_2BYTE_VALUE_JOIN),
+        config.get(CONF_DALI_EXEC_JOIN),
+    )
+    gateways = hass.data[DOMAIN].setdefault(DALI_GATEWAYS, {})
+    if key not in gateways:
+        gateways[key] = DaliGateway(
+            hass, client, *key, config.get(CONF_DALI_2BYTE_FB_JOIN))
+    return gateways[key]
+
+
+class CrestronLightBase(JoinSubscriberMixin, LightEntity):
     def __init__(self, client: XPanelClient, config: ConfigType, device_type: str) -> None:
         self._attr_name = config.get(CONF_NAME)
         self._type = device_type
@@ -120,69 +342,80 @@ class CrestronLightBase(LightEntity):
             f"{self._attr_name},{self._type} {self._attr_color_mode} {self._attr_supported_color_modes} init")
 
 
-class SwitchLight(CrestronLightBase):
+class SwitchLight(OptimisticStateMixin, CrestronLightBase):
     def __init__(self, client: XPanelClient, config, device_type: str):
         super().__init__(client, config, device_type)
         self._switch_join_on = config.get(CONF_SWITCH_ON_JOIN)
         self._switch_join_off = config.get(CONF_SWITCH_OFF_JOIN)
         self._switch_join_fb = config.get(CONF_SWITCH_FB_JOIN)
-        self._state = client.get_digital(self._switch_join_fb)
         self._attr_unique_id = f"{self._attr_unique_id}_{self._switch_join_on}"
+        self.configure_optimistic(config, default=False)
 
-    async def async_added_to_hass(self):
-        await self._hub.register_callback(
-            "d", self._switch_join_fb, self.process_switch_callback)
+    def join_subscriptions(self):
+        return [("d", self._switch_join_fb, self.process_switch_callback)]
 
-    async def async_will_remove_from_hass(self):
-        await self._hub.remove_callback("d", self._switch_join_fb)
+    def initial_join_values(self, values):
+        self._attr_is_on = bool(values[("d", self._switch_join_fb)])
 
     async def async_turn_on(self, **kwargs):
         self._hub.pulse(self._switch_join_on)
+        self.expect_feedback(
+            "d", self._switch_join_fb, 1, {"_attr_is_on": True})
+        self.async_write_ha_state()
 
     async def async_turn_off(self, **kwargs):
         self._hub.pulse(self._switch_join_off)
+        self.expect_feedback(
+            "d", self._switch_join_fb, 0, {"_attr_is_on": False})
+        self.async_write_ha_state()
 
     def process_switch_callback(self, sigtype, join, value):
+        self.feedback_received(sigtype, join, value)
         self._attr_is_on = bool(value)
         self.schedule_update_ha_state()
 
 
-class BrightnessLight(CrestronLightBase):
+class BrightnessLight(OptimisticStateMixin, CrestronLightBase):
 
     def __init__(self, client: XPanelClient, config: ConfigType, device_type: str):
         super().__init__(client, config, device_type)
         self._brightness_join = config.get(CONF_BRIGHTNESS_JOIN)
         self._brightness_fb_join = config.get(CONF_BRIGHTNESS_FB_JOIN)
         self._attr_unique_id = f"{self._attr_unique_id}_{self._brightness_join}"
-        self._attr_brightness = self._hub.get_analog(
-            self._brightness_fb_join)*255/65535
-        self._attr_is_on = bool(self._attr_brightness)
+        self.configure_optimistic(config, default=True)
 
-    async def async_added_to_hass(self):
-        await self._hub.register_callback(
-            "a", self._brightness_fb_join, self.process_bright_callback
-        )
+    def join_subscriptions(self):
+        return [("a", self._brightness_fb_join, self.process_bright_callback)]
 
-    async def async_will_remove_from_hass(self):
-        await self._hub.remove_callback("a", self._brightness_fb_join)
+    def initial_join_values(self, values):
+        self._attr_brightness = values[("a", self._brightness_fb_join)]*255/65535
+        self._attr_is_on = bool(self._attr_brightness)
+
+    def _expect_brightness(self, brightness, value: int):
+        self.expect_feedback(
+            "a", self._brightness_fb_join, value,
+            {"_attr_brightness": brightness, "_attr_is_on": bool(brightness)},
+            tolerance=BRIGHTNESS_TOLERANCE)
 
     async def async_turn_on(self, **kwargs):
         _LOGGER.debug(f"Turn on:{kwargs}")
         if ATTR_BRIGHTNESS in kwargs:
-            self._attr_brightness = kwargs[ATTR_BRIGHTNESS]
-            if bool(self._attr_brightness):
-                self._attr_is_on = True
-            self._hub.set_analog(self._brightness_join, int(
-                kwargs[ATTR_BRIGHTNESS]*65535/255))
+            value = int(kwargs[ATTR_BRIGHTNESS]*65535/255)
+            self._hub.set_analog(self._brightness_join, value)
+            self._expect_brightness(kwargs[ATTR_BRIGHTNESS], value)
         else:
             if not bool(self._attr_brightness):
                 self._hub.set_analog(self._brightness_join, 65535)
+                self._expect_brightness(255, 65535)
         self.schedule_update_ha_state()
 
     async def async_turn_off(self, **kwargs):
         self._hub.set_analog(self._brightness_join, 0)
+        self._expect_brightness(0, 0)
+        self.async_write_ha_state()
 
     def process_bright_callback(self, sigtype, join, value):
+        self.feedback_received(sigtype, join, value)
         self._attr_brightness = (value*255/65535)
         self._attr_is_on = bool(self._attr_brightness)
         self.schedule_update_ha_state()
@@ -197,49 +430,203 @@ class ColorTempLight(BrightnessLight):
             CONF_COLOR_TEMP_MAX) or 6500
         self._attr_min_color_temp_kelvin = config.get(
             CONF_COLOR_TEMP_MIN) or 3000
-        self._attr_color_temp_kelvin = self._hub.get_analog(
-            self._color_temp_fb_join)
 
-    async def async_added_to_hass(self):
-        await super().async_added_to_hass()
-        await self._hub.register_callback(
-            "a", self._color_temp_fb_join, self.process_color_temp_callback
-        )
+    def join_subscriptions(self):
+        return super().join_subscriptions() + [
+            ("a", self._color_temp_fb_join, self.process_color_temp_callback)]
 
-    async def async_will_remove_from_hass(self):
-        await super().async_will_remove_from_hass()
-        await self._hub.remove_callback("a", self._color_temp_fb_join)
+    def initial_join_values(self, values):
+        super().initial_join_values(values)
+        self._attr_color_temp_kelvin = int(values[("a", self._color_temp_fb_join)])
 
     async def async_turn_on(self, **kwargs):
         if ATTR_COLOR_TEMP_KELVIN in kwargs:
-            self._hub.set_analog(
-                self._color_temp_join,
-                int(kwargs[ATTR_COLOR_TEMP_KELVIN])
-            )
-            self._attr_color_temp_kelvin = int(kwargs[ATTR_COLOR_TEMP_KELVIN])
+            kelvin = int(kwargs[ATTR_COLOR_TEMP_KELVIN])
+            self._hub.set_analog(self._color_temp_join, kelvin)
+            self.expect_feedback(
+                "a", self._color_temp_fb_join, kelvin,
+                {"_attr_color_temp_kelvin": kelvin})
         await super().async_turn_on(**kwargs)
 
     async def async_turn_off(self, **kwargs):
         await super().async_turn_off(**kwargs)
 
     def process_color_temp_callback(self, sigtype, join, value):
+        self.feedback_received(sigtype, join, value)
         if value > 0:
             self._attr_color_temp_kelvin = int(value)
         self.schedule_update_ha_state()
 
+class RGBLight(OptimisticStateMixin, CoalescedStateMixin, CrestronLightBase):
+    _channel_keys = (CONF_COLOR_R_JOIN, CONF_COLOR_G_JOIN, CONF_COLOR_B_JOIN)
+    _channel_fb_keys = (CONF_COLOR_R_FB_JOIN,
+                        CONF_COLOR_G_FB_JOIN, CONF_COLOR_B_FB_JOIN)
+    _color_attr = ATTR_RGB_COLOR
+
+    def __init__(self, client: XPanelClient, config: ConfigType, device_type: str):
+        super().__init__(client, config, device_type)
+        self._channel_joins = [config.get(k) for k in self._channel_keys]
+        self._channel_fb_joins = [config.get(k) for k in self._channel_fb_keys]
+        self._attr_unique_id = f"{self._attr_unique_id}_{self._channel_joins[0]}"
+        self._fb_channels = [0 for _ in self._channel_fb_joins]
+        self._color = tuple(255 for _ in self._channel_joins)
+        self._apply_channels()
+        self.configure_optimistic(config, default=True)
+
+    @property
+    def _channel_count(self) -> int:
+        return len(self._channel_joins)
+
+    def _apply_channels(self):
+        color, brightness = channels_to_color(tuple(self._fb_channels))
+        if brightness:
+            self._color = color
+            self._saved_brightness = brightness
+        self._attr_brightness = brightness
+        self._attr_is_on = bool(brightness)
+        setattr(self, f"_attr_{self._color_attr}", self._color)
+
+    def _send_channels(self, channels: tuple, state: dict):
+        self._hub.set_many(
+            ("a", join, value) for join, value in zip(self._channel_joins, channels))
+        feedback = [(join, value)
+                    for join, value in zip(self._channel_fb_joins, channels) if join]
+        if not feedback:
+            # nothing reports back, the command is the state
+            for attr, value in state.items():
+                setattr(self, attr, value)
+            return
+        # one channel that will change carries the state and its rollback
+        feedback.sort(key=lambda item: self._hub.get("a", item[0]) == item[1])
+        for join, value in feedback:
+            self.expect_feedback(
+                "a", join, value, state, tolerance=BRIGHTNESS_TOLERANCE)
+            state = None
+
+    def join_subscriptions(self):
+        return [("a", join, self.process_channel_callback)
+                for join in self._channel_fb_joins if join]
+
+    def initial_join_values(self, values):
+        self._fb_channels = [int(values[("a", j)]) if j else 0
+                             for j in self._channel_fb_joins]
+        self._apply_channels()
+
+    async def async_turn_on(self, **kwargs):
+        _LOGGER.debug(f"Turn on:{kwargs}")
+        color = self._color
+        if self._color_attr in kwargs:
+            color = tuple(kwargs[self._color_attr])
+        elif ATTR_HS_COLOR in kwargs:
+            color = hs_to_channel_color(
+                tuple(kwargs[ATTR_HS_COLOR]), self._channel_count)
+        elif ATTR_XY_COLOR in kwargs:
+            color = xy_to_channel_color(
+                tuple(kwargs[ATTR_XY_COLOR]), self._channel_count)
+        brightness = kwargs.get(
+            ATTR_BRIGHTNESS, self._attr_brightness or self._saved_brightness)
+        self._send_channels(color_to_channels(color, brightness), {
+            "_color": color,
+            "_attr_brightness": brightness,
+            "_attr_is_on": bool(brightness),
+            f"_attr_{self._color_attr}": color,
+        })
+        self.async_write_ha_state()
+
+    async def async_turn_off(self, **kwargs):
+        self._send_channels(
+            tuple(0 for _ in self._channel_joins),
+            {"_attr_brightness": 0, "_attr_is_on": False})
+        self.async_write_ha_state()
+
+    def process_channel_callback(self, sigtype, join, value):
+        self.feedback_received(sigtype, join, value)
+        for i, fb_join in enumerate(self._channel_fb_joins):
+            if fb_join == join:
+                self._fb_channels[i] = value
+        self._apply_channels()
+        self.schedule_coalesced_write()
+
+
+class RGBWLight(RGBLight):
+    _channel_keys = RGBLight._channel_keys + (CONF_COLOR_W_JOIN,)
+    _channel_fb_keys = RGBLight._channel_fb_keys + (CONF_COLOR_W_FB_JOIN,)
+    _color_attr = ATTR_RGBW_COLOR
+
+
+class RGBWWLight(RGBLight):
+    _channel_keys = RGBWLight._channel_keys + (CONF_COLOR_WW_JOIN,)
+    _channel_fb_keys = RGBWLight._channel_fb_keys + (CONF_COLOR_WW_FB_JOIN,)
+    _color_attr = ATTR_RGBWW_COLOR
+
+
+class DaliLight(CrestronLightBase):
+    def __init__(self, client: XPanelClient, config: ConfigType, device_type: str, gateway: DaliGateway):
+        super().__init__(client, config, device_type)
+        self._gateway = gateway
+        self._short_addr = config.get(CONF_SHORT_ADDR, DALI_BROADCAST)
+        self._groups = set(config.get(CONF_DALI_GROUPS) or [])
+        self._attr_unique_id = f"{self._attr_unique_id}_{config.get(CONF_DALI_2BYTE_ADDR_JOIN)}_{self._short_addr}"
+        self._attr_should_poll = False
+
+    def dali_addressed_by(self, address: int) -> bool:
+        """True if a command sent to the DALI address byte reaches this light."""
+        target = address >> 1
+        if target == DALI_BROADCAST:
+            return True
+        if target >= 64:
+            return target == self._short_addr or (target - 64) in self._groups
+        return target == self._short_addr
+
+    async def async_added_to_hass(self):
+        await self._gateway.add_light(self)
+
+    async def async_will_remove_from_hass(self):
+        self._gateway.remove_light(self)
+
+    async def async_turn_on(self, **kwargs):
+        brightness = kwargs.get(ATTR_BRIGHTNESS, self._saved_brightness)
+        self._gateway.send_level(self._short_addr, scale_255_to_dali(brightness))
+
+    async def async_turn_off(self, **kwargs):
+        self._gateway.send_level(self._short_addr, 0)
+
+    def process_dali_level(self, level: int):
+        self._attr_brightness = scale_dali_to_255(level)
+        self._attr_is_on = bool(level)
+        if self._attr_is_on:
+            self._saved_brightness = self._attr_brightness
+        if self.hass is not None:
+            self.async_write_ha_state()
 
 
 CONST_LIGHT_DEVICE_ENTITY_MAP = {
     CONF_SWITCH: SwitchLight,
     CONF_BRIGHTNESS: BrightnessLight,
     CONF_COLOR_TEMP: ColorTempLight,
+    CONF_RGB: RGBLight,
+    CONF_RGBW: RGBWLight,
+    CONF_RGBWW: RGBWWLight,
 }
 
 
+def create_entities(hass, hub: XPanelClient, config) -> list:
+    device_type = config.get(CONF_TYPE)
+    if device_type == CONF_DALI:
+        gateway = get_dali_gateway(hass, hub, config)
+        return [DaliLight(hub, config, device_type, gateway)]
+    elif isinstance(device_type, str) and (device_type != ""):
+        return [CONST_LIGHT_DEVICE_ENTITY_MAP[device_type]
+                (hub, config, device_type)]
+    return []
+
+
 async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
+    async_add_entities = track_platform(
+        hass, 'light', config, async_add_entities, discovery_info)
     hub: XPanelClient = hass.data[DOMAIN][HUB]
-    device_type = config.get(CONF_TYPE)
-    if isinstance(device_type, str) and (device_type != ""):
-        light_list = [CONST_LIGHT_DEVICE_ENTITY_MAP[device_type]
-                        (hub, config, device_type)]
+    light_list = [
+        entity for device in manifest_configs(discovery_info) or [config]
+        for entity in create_entities(hass, hub, device)]
+    if light_list:
         async_add_entities(light_list)
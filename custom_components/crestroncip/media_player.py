@@ -0,0 +1,330 @@
+"""Platform for Crestron Media Player integration."""
+
+import voluptuous as vol
+import logging
+
+from homeassistant.core import HomeAssistant
+from homeassistant.components.media_player import (
+    MediaPlayerEntity,
+    MediaPlayerEntityFeature,
+    MediaPlayerState)
+from homeassistant.const import CONF_NAME
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from .const import (
+    HUB,
+    DOMAIN,
+    CONF_MUTE_JOIN,
+    CONF_MUTE_FB_JOIN,
+    CONF_VOLUME_JOIN,
+    CONF_VOLUME_FB_JOIN,
+    CONF_SOURCE_JOIN,
+    CONF_SOURCE_FB_JOIN,
+    CONF_SOURCE_LIST,
+    CONF_SOUND_JOIN,
+    CONF_SOUND_FB_JOIN,
+    CONF_SOUND_LIST,
+    CONF_MEDIA_ON_JOIN,
+    CONF_MEDIA_OFF_JOIN,
+    CONF_MEDIA_ON_FB_JOIN,
+    CONF_MEDIA_PLAY_JOIN,
+    CONF_MEDIA_PLAY_FB_JOIN,
+    CONF_MEDIA_STOP_JOIN,
+    CONF_MEDIA_NEXT_JOIN,
+    CONF_MEDIA_PREVIOUS_JOIN,
+    CONF_MEDIA_PAUSE_JOIN,
+    CONF_VOLUME_INTERVAL,
+    CONF_VOLUME_STEP,
+    CONF_VOLUME_RAMP_TIME)
+from . import XPanelClient
+from .entity import CoalescedStateMixin, JoinSubscriberMixin
+from .reload import track_platform
+from .device_manifest import manifest_configs
+
+_LOGGER = logging.getLogger(__name__)
+
+# list: values 1..n in list order, dict: name -> analog value
+INDEX_LIST_SCHEMA = vol.Any(
+    vol.All(cv.ensure_list, [cv.string]),
+    {cv.string: vol.All(int, vol.Range(min=0, max=65535))},
+)
+
+PLATFORM_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_NAME): cv.string,
+        vol.Optional(CONF_MEDIA_ON_JOIN): cv.positive_int,
+        vol.Optional(CONF_MEDIA_OFF_JOIN): cv.positive_int,
+        vol.Optional(CONF_MEDIA_ON_FB_JOIN): cv.positive_int,
+        vol.Optional(CONF_MUTE_JOIN): cv.positive_int,
+        vol.Optional(CONF_MUTE_FB_JOIN): cv.positive_int,
+        vol.Optional(CONF_VOLUME_JOIN): cv.positive_int,
+        vol.Optional(CONF_VOLUME_FB_JOIN): cv.positive_int,
+        vol.Optional(CONF_SOURCE_JOIN): cv.positive_int,
+        vol.Optional(CONF_SOURCE_FB_JOIN): cv.positive_int,
+        vol.Optional(CONF_SOURCE_LIST): INDEX_LIST_SCHEMA,
+        vol.Optional(CONF_SOUND_JOIN): cv.positive_int,
+        vol.Optional(CONF_SOUND_FB_JOIN): cv.positive_int,
+        vol.Optional(CONF_SOUND_LIST): INDEX_LIST_SCHEMA,
+        vol.Optional(CONF_MEDIA_PLAY_JOIN): cv.positive_int,
+        vol.Optional(CONF_MEDIA_PLAY_FB_JOIN): cv.positive_int,
+        vol.Optional(CONF_MEDIA_PAUSE_JOIN): cv.positive_int,
+        vol.Optional(CONF_MEDIA_STOP_JOIN): cv.positive_int,
+        vol.Optional(CONF_MEDIA_NEXT_JOIN): cv.positive_int,
+        vol.Optional(CONF_MEDIA_PREVIOUS_JOIN): cv.positive_int,
+        vol.Optional(CONF_VOLUME_INTERVAL, default=0.1): cv.positive_float,
+        vol.Optional(CONF_VOLUME_STEP, default=0.05): vol.All(
+            vol.Coerce(float), vol.Range(min=0.001, max=1)),
+        vol.Optional(CONF_VOLUME_RAMP_TIME, default=0): vol.Coerce(float),
+    },
+    extra=vol.ALLOW_EXTRA,
+)
+
+# media_play_fb_analog values
+CONF_PLAY_STATE_MAP = {
+    0: MediaPlayerState.IDLE,
+    1: MediaPlayerState.PLAYING,
+    2: MediaPlayerState.PAUSED,
+}
+
+
+def build_index_tables(items) -> tuple[dict, dict]:
+    """Return (name -> analog value, analog value -> name) lookup tables."""
+    if not items:
+        return {}, {}
+    if isinstance(items, dict):
+        to_value = dict(items)
+    else:
+        to_value = {name: i for i, name in enumerate(items, start=1)}
+    return to_value, {v: k for k, v in to_value.items()}
+
+
+def scale_volume_to_analog(volume: float) -> int:
+    return max(0, min(65535, round(volume * 65535)))
+
+
+async def async_setup_platform(hass: HomeAssistant, config, async_add_entities: AddEntitiesCallback, discovery_info=None):
+    async_add_entities = track_platform(
+        hass, 'media_player', config, async_add_entities, discovery_info)
+    hub: XPanelClient = hass.data[DOMAIN][HUB]
+    player_list = [
+        entity for device in manifest_configs(discovery_info) or [config]
+        for entity in create_entities(hass, hub, device)]
+    if player_list:
+        async_add_entities(player_list)
+
+
+def create_entities(hass: HomeAssistant, hub: XPanelClient, config) -> list:
+    device_name = config.get(CONF_NAME)
+    if isinstance(device_name, str) and device_name != "":
+        return [CrestronMediaPlayer(hub, config)]
+    return []
+
+
+class CrestronMediaPlayer(CoalescedStateMixin, JoinSubscriberMixin, MediaPlayerEntity):
+    """AV room media player.
+
+    Volume writes are sent at most once per volume_interval with the
+    latest value winning, and ramps step towards their target on the hub's
+    shared timer, so dragging a slider never floods the link.
+    """
+
+    def __init__(self, hub: XPanelClient, config):
+        self._hub = hub
+        self._attr_name = config.get(CONF_NAME)
+        self._attr_should_poll = False
+        self._on_join = config.get(CONF_MEDIA_ON_JOIN)
+        self._off_join = config.get(CONF_MEDIA_OFF_JOIN)
+        self._on_fb_join = config.get(CONF_MEDIA_ON_FB_JOIN)
+        self._mute_join = config.get(CONF_MUTE_JOIN)
+        self._mute_fb_join = config.get(CONF_MUTE_FB_JOIN)
+        self._volume_join = config.get(CONF_VOLUME_JOIN)
+        self._volume_fb_join = config.get(CONF_VOLUME_FB_JOIN)
+        self._source_join = config.get(CONF_SOURCE_JOIN)
+        self._source_fb_join = config.get(CONF_SOURCE_FB_JOIN)
+        self._sound_join = config.get(CONF_SOUND_JOIN)
+        self._sound_fb_join = config.get(CONF_SOUND_FB_JOIN)
+        self._play_join = config.get(CONF_MEDIA_PLAY_JOIN)
+        self._play_fb_join = config.get(CONF_MEDIA_PLAY_FB_JOIN)
+        self._pause_join = config.get(CONF_MEDIA_PAUSE_JOIN)
+        self._stop_join = config.get(CONF_MEDIA_STOP_JOIN)
+        self._next_join = config.get(CONF_MEDIA_NEXT_JOIN)
+        self._previous_join = config.get(CONF_MEDIA_PREVIOUS_JOIN)
+        self._attr_unique_id = f"media_{self._attr_name}_{self._volume_join or self._on_join}"
+        self._source_values, self._source_names = build_index_tables(
+            config.get(CONF_SOURCE_LIST))
+        self._sound_values, self._sound_names = build_index_tables(
+            config.get(CONF_SOUND_LIST))
+        self._attr_source_list = list(self._source_values) or None
+        self._attr_sound_mode_list = list(self._sound_values) or None
+        self._volume_interval = config.get(CONF_VOLUME_INTERVAL, 0.1)
+        self._attr_volume_step = config.get(CONF_VOLUME_STEP, 0.05)
+        self._ramp_time = config.get(CONF_VOLUME_RAMP_TIME, 0)
+        self._volume_pending = None
+        self._volume_entry = None
+        self._last_volume_send = None
+        self._ramp_target = None
+        self._ramp_entry = None
+        self._attr_supported_features = self._features()
+        self._attr_state = MediaPlayerState.ON if self._on_fb_join is None else None
+        self._fb_handlers = {
+            ("d", self._on_fb_join): self._process_power_fb,
+            ("d", self._mute_fb_join): self._process_mute_fb,
+            ("a", self._volume_fb_join): self._process_volume_fb,
+            ("a", self._source_fb_join): self._process_source_fb,
+            ("a", self._sound_fb_join): self._process_sound_fb,
+            ("a", self._play_fb_join): self._process_play_fb,
+        }
+        self._fb_handlers = {k: v for k, v in self._fb_handlers.items() if k[1]}
+
+    def _features(self) -> MediaPlayerEntityFeature:
+        features = MediaPlayerEntityFeature(0)
+        join_features = (
+            (self._on_join, MediaPlayerEntityFeature.TURN_ON),
+            (self._off_join, MediaPlayerEntityFeature.TURN_OFF),
+            (self._mute_join, MediaPlayerEntityFeature.VOLUME_MUTE),
+            (self._volume_join, MediaPlayerEntityFeature.VOLUME_SET
+             | MediaPlayerEntityFeature.VOLUME_STEP),
+            (self._source_values and self._source_join,
+             MediaPlayerEntityFeature.SELECT_SOURCE),
+            (self._sound_values and self._sound_join,
+             MediaPlayerEntityFeature.SELECT_SOUND_MODE),
+            (self._play_join, MediaPlayerEntityFeature.PLAY),
+            (self._pause_join, MediaPlayerEntityFeature.PAUSE),
+            (self._stop_join, MediaPlayerEntityFeature.STOP),
+            (self._next_join, MediaPlayerEntityFeature.NEXT_TRACK),
+            (self._previous_join, MediaPlayerEntityFeature.PREVIOUS_TRACK),
+        )
+        for join, feature in join_features:
+            if join:
+                features |= feature
+        return features
+
+    def join_subscriptions(self):
+        return [(sigtype, join, self.process_callback)
+                for sigtype, join in self._fb_handlers]
+
+    def initial_join_values(self, values):
+        for key, handler in self._fb_handlers.items():
+            handler(values[key])
+
+    async def async_will_remove_from_hass(self):
+        self._hub.timer.cancel(self._volume_entry)
+        self._hub.timer.cancel(self._ramp_entry)
+        await super().async_will_remove_from_hass()
+
+    def process_callback(self, sigtype, join, value):
+        handler = self._fb_handlers.get((sigtype, join))
+        if handler is not None:
+            handler(value)
+            self.schedule_coalesced_write()
+
+    def _process_power_fb(self, value):
+        if not value:
+            self._attr_state = MediaPlayerState.OFF
+        elif self._attr_state in (None, MediaPlayerState.OFF):
+            self._attr_state = MediaPlayerState.ON
+
+    def _process_mute_fb(self, value):
+        self._attr_is_volume_muted = bool(value)
+
+    def _process_volume_fb(self, value):
+        self._attr_volume_level = value / 65535
+
+    def _process_source_fb(self, value):
+        self._attr_source = self._source_names.get(value)
+
+    def _process_sound_fb(self, value):
+        self._attr_sound_mode = self._sound_names.get(value)
+
+    def _process_play_fb(self, value):
+        if self._attr_state != MediaPlayerState.OFF:
+            self._attr_state = CONF_PLAY_STATE_MAP.get(value, MediaPlayerState.ON)
+
+    async def async_turn_on(self):
+        self._hub.pulse(self._on_join)
+
+    async def async_turn_off(self):
+        self._hub.pulse(self._off_join)
+
+    async def async_mute_volume(self, mute):
+        self._hub.set_digital(self._mute_join, int(mute))
+
+    async def async_set_volume_level(self, volume):
+        if self._ramp_time > 0:
+            self._start_ramp(volume)
+        else:
+            self._send_volume(volume)
+        self._attr_volume_level = volume
+        self.async_write_ha_state()
+
+    async def async_volume_up(self):
+        await self.async_set_volume_level(
+            min(1.0, (self._attr_volume_level or 0) + self._attr_volume_step))
+
+    async def async_volume_down(self):
+        await self.async_set_volume_level(
+            max(0.0, (self._attr_volume_level or 0) - self._attr_volume_step))
+
+    def _send_volume(self, volume: float):
+        """Send now, or hold the latest value until volume_interval has passed."""
+        now = self._hub.timer.time()
+        self._volume_pending = volume
+        if self._volume_entry is not None:
+            return
+        if self._last_volume_send is None or now - self._last_volume_send >= self._volume_interval:
+            self._flush_volume()
+        else:
+            self._volume_entry = self._hub.timer.call_at(
+                self._last_volume_send + self._volume_interval, self._flush_volume)
+
+    def _flush_volume(self):
+        self._volume_entry = None
+        self._last_volume_send = self._hub.timer.time()
+        self._hub.set_analog(
+            self._volume_join, scale_volume_to_analog(self._volume_pending))
+
+    def _start_ramp(self, target: float):
+        start = self._volume_pending
+        if start is None:
+            start = self._attr_volume_level or 0
+        steps = max(1, round(self._ramp_time / self._volume_interval))
+        self._ramp_target = target
+        self._ramp_delta = (target - start) / steps
+        self._ramp_level = start
+        if self._ramp_entry is None:
+            self._ramp_tick()
+
+    def _ramp_tick(self):
+        self._ramp_entry = None
+        level = self._ramp_level + self._ramp_delta
+        if (self._ramp_delta >= 0 and level >= self._ramp_target) or \
+                (self._ramp_delta < 0 and level <= self._ramp_target):
+            level = self._ramp_target
+        self._ramp_level = level
+        self._send_volume(level)
+        if level != self._ramp_target:
+            self._ramp_entry = self._hub.timer.call_later(
+                self._volume_interval, self._ramp_tick)
+
+    async def async_select_source(self, source):
+        if source in self._source_values:
+            self._hub.set_analog(self._source_join, self._source_values[source])
+
+    async def async_select_sound_mode(self, sound_mode):
+        if sound_mode in self._sound_values:
+            self._hub.set_analog(self._sound_join, self._sound_values[sound_mode])
+
+    async def async_media_play(self):
+        self._hub.pulse(self._play_join)
+
+    async def async_media_pause(self):
+        self._hub.pulse(self._pause_join)
+
+    async def async_media_stop(self):
+        self._hub.pulse(self._stop_join)
+
+    async def async_media_next_track(self):
+        self._hub.pulse(self._next_join)
+
+    async def async_media_previous_track(self):
+        self._hub.pulse(self._previous_join)
@@ -0,0 +1,205 @@
+"""Reload Crestron entities from YAML without touching the CIP connection."""
+import json
+import logging
+from importlib import import_module
+
+from homeassistant import config as conf_util
+from homeassistant.core import CoreState, HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_per_platform
+from homeassistant.helpers import entity_registry as er
+
+from .bridge import JoinBridge
+from .const import (DOMAIN, HUB, BRIDGE, PLATFORM_ADDERS, PLATFORM_ENTITIES,
+                    MANIFEST, CONF_DEVICES, CONF_TO_JOINS, CONF_FROM_JOINS)
+from .device_manifest import DeviceManifest, manifest_configs
+
+_LOGGER = logging.getLogger(__name__)
+
+INTEGRATION_NAME = __package__.rpartition(".")[2]
+
+RELOAD_PLATFORMS = [
+    "binary_sensor",
+    "climate",
+    "cover",
+    "event",
+    "light",
+    "media_player",
+    "sensor",
+    "switch",
+]
+
+# tracked key of the entities built from a platform's manifest devices
+MANIFEST_ENTRY = "devices"
+
+
+def config_key(config: dict) -> str:
+    """Return a stable key for one platform entry of configuration.yaml."""
+    return json.dumps(config, sort_keys=True, default=str)
+
+
+def track_platform(hass: HomeAssistant, domain: str, config, async_add_entities,
+                   discovery_info=None):
+    """Remember which entities were created from which platform entry.
+
+    Manifest devices handed over by discovery are tracked together under
+    MANIFEST_ENTRY. Other discovery calls come without a config and are
+    not tracked, their entities belong to the hub and live as long as it
+    does.
+    """
+    data = hass.data[DOMAIN]
+    data.setdefault(PLATFORM_ADDERS, {}).setdefault(domain, async_add_entities)
+    if manifest_configs(discovery_info):
+        key = MANIFEST_ENTRY
+    elif config:
+        key = config_key(config)
+    else:
+        return async_add_entities
+    tracked = data.setdefault(PLATFORM_ENTITIES, {}).setdefault(domain, {})
+
+    def add_entities(new_entities, update_before_add=False):
+        new_entities = list(new_entities)
+        tracked.setdefault(key, []).extend(new_entities)
+        async_add_entities(new_entities, update_before_add)
+
+    return add_entities
+
+
+def compile_manifest(conf: dict) -> DeviceManifest:
+    """Validate and compile the devices of a freshly read configuration."""
+    from . import DEVICE_SCHEMA
+
+    entries = []
+    for entry in (conf.get(DOMAIN) or {}).get(CONF_DEVICES) or []:
+        try:
+            entries.append(DEVICE_SCHEMA(entry))
+        except Exception as err:
+            _LOGGER.error(f"reload: invalid devices entry {entry}: {err}")
+    return DeviceManifest().compile(entries)
+
+
+def compile_bridge(conf: dict) -> tuple[list, list]:
+    """Validate the to_joins and from_joins of a freshly read configuration."""
+    from . import TO_JOINS_SCHEMA, FROM_JOINS_SCHEMA
+
+    section = conf.get(DOMAIN) or {}
+    compiled = []
+    for option, schema in ((CONF_TO_JOINS, TO_JOINS_SCHEMA),
+                           (CONF_FROM_JOINS, FROM_JOINS_SCHEMA)):
+        entries = []
+        for entry in section.get(option) or []:
+            try:
+                entries.append(schema(entry))
+            except Exception as err:
+                _LOGGER.error(f"reload: invalid {option} entry {entry}: {err}")
+        compiled.append(entries)
+    return compiled[0], compiled[1]
+
+
+async def async_reload_bridge(hass: HomeAssistant, conf: dict):
+    """Replace the join bridge with one built from the new configuration."""
+    data = hass.data[DOMAIN]
+    to_joins, from_joins = compile_bridge(conf)
+    bridge = data.pop(BRIDGE, None)
+    if bridge is not None:
+        await bridge.async_stop()
+    if not to_joins and not from_joins:
+        return
+    bridge = JoinBridge(hass, data[HUB], to_joins, from_joins)
+    data[BRIDGE] = bridge
+    # before startup finished the started listener starts it
+    if hass.state is CoreState.running:
+        await bridge.async_start()
+
+
+async def async_reload(hass: HomeAssistant) -> dict:
+    """Diff the YAML platform entries and add or remove only what changed.
+
+    The devices of a platform whose compiled manifest changed are
+    replaced together; unchanged unique ids keep their registry entries.
+    The hub, its join store and the connection are left alone, so
+    re-created entities pick up their state from the store immediately.
+    The join bridge is stopped and rebuilt from the new to_joins and
+    from_joins.
+    """
+    try:
+        conf = await conf_util.async_hass_config_yaml(hass)
+    except HomeAssistantError as err:
+        raise HomeAssistantError(f"reload: {err}") from err
+
+    # importing blocks, do it in the executor; compiling the manifest
+    # then finds the platform schemas already imported
+    modules = {}
+    for domain in RELOAD_PLATFORMS:
+        modules[domain] = await hass.async_add_import_executor_job(
+            import_module, f".{domain}", __package__)
+
+    data = hass.data[DOMAIN]
+    registry = er.async_get(hass)
+    old_manifest = data.get(MANIFEST) or DeviceManifest()
+    manifest = compile_manifest(conf)
+    summary = {}
+    for domain, module in modules.items():
+        wanted = {}
+        for p_type, p_config in config_per_platform(conf, domain):
+            if p_type != INTEGRATION_NAME:
+                continue
+            try:
+                p_config = module.PLATFORM_SCHEMA(p_config)
+            except Exception as err:
+                _LOGGER.error(
+                    f"reload: invalid {domain} entry {p_config.get('name')}: {err}")
+                continue
+            wanted[config_key(p_config)] = p_config
+
+        tracked = data.setdefault(PLATFORM_ENTITIES, {}).setdefault(domain, {})
+        removed = [key for key in tracked
+                   if key != MANIFEST_ENTRY and key not in wanted]
+        added = [key for key in wanted if key not in tracked]
+        devices = manifest.devices.get(domain, [])
+        if devices != old_manifest.devices.get(domain, []):
+            if MANIFEST_ENTRY in tracked:
+                removed.append(MANIFEST_ENTRY)
+            if devices:
+                added.append(MANIFEST_ENTRY)
+        if not removed and not added:
+            continue
+
+        old_entities = []
+        for key in removed:
+            for entity in tracked.pop(key):
+                old_entities.append(entity)
+                if entity.hass is not None:
+                    await entity.async_remove()
+
+        adder = data.get(PLATFORM_ADDERS, {}).get(domain)
+        for key in added:
+            if key == MANIFEST_ENTRY:
+                name = f"{len(devices)} devices"
+            else:
+                name = wanted[key].get('name')
+            if adder is None:
+                _LOGGER.warning(
+                    f"reload: no {domain} platform loaded yet, "
+                    f"restart Home Assistant to add {name}")
+                continue
+            if key == MANIFEST_ENTRY:
+                await module.async_setup_platform(
+                    hass, {}, adder, {CONF_DEVICES: devices})
+            else:
+                await module.async_setup_platform(hass, wanted[key], adder)
+
+        kept = {
+            entity.unique_id
+            for entities in tracked.values() for entity in entities
+        }
+        for entity in old_entities:
+            if entity.entity_id and entity.unique_id not in kept:
+                if registry.async_get(entity.entity_id) is not None:
+                    registry.async_remove(entity.entity_id)
+        summary[domain] = {"added": len(added), "removed": len(removed)}
+        _LOGGER.info(
+            f"reload: {domain} +{len(added)} -{len(removed)} entries")
+    data[MANIFEST] = manifest
+    await async_reload_bridge(hass, conf)
+    return summary
@@ -0,0 +1,219 @@
+"""Platform for Crestron Sensor integration."""
+
+import voluptuous as vol
+import logging
+
+from homeassistant.core import HomeAssistant
+from homeassistant.components.sensor import (
+    SensorEntity,
+    DEVICE_CLASSES_SCHEMA,
+    STATE_CLASSES_SCHEMA)
+from homeassistant.const import (
+    CONF_NAME,
+    CONF_TYPE,
+    CONF_DEVICE_CLASS,
+    CONF_UNIT_OF_MEASUREMENT)
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from .const import (
+    HUB,
+    DOMAIN,
+    CONF_VALUE_JOIN,
+    CONF_SERIAL_FB_JOIN,
+    CONF_DIVISOR,
+    CONF_DEADBAND,
+    CONF_MIN_INTERVAL,
+    CONF_AGGREGATE,
+    CONF_AGGREGATE_WINDOW)
+from . import XPanelClient
+from .reload import track_platform
+from .entity import JoinSubscriberMixin
+from .device_manifest import manifest_configs
+
+_LOGGER = logging.getLogger(__name__)
+
+CONF_ANALOG = "analog"
+CONF_SERIAL = "serial"
+CONF_STATE_CLASS = "state_class"
+AGGREGATE_MIN = "min"
+AGGREGATE_MEAN = "mean"
+AGGREGATE_MAX = "max"
+
+PLATFORM_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_NAME): cv.string,
+        vol.Required(CONF_TYPE): vol.In([CONF_ANALOG, CONF_SERIAL]),
+        vol.Optional(CONF_VALUE_JOIN): cv.positive_int,
+        vol.Optional(CONF_SERIAL_FB_JOIN): cv.positive_int,
+        vol.Optional(CONF_DIVISOR, default=1): cv.positive_float,
+        vol.Optional(CONF_UNIT_OF_MEASUREMENT): cv.string,
+        vol.Optional(CONF_DEVICE_CLASS): DEVICE_CLASSES_SCHEMA,
+        vol.Optional(CONF_STATE_CLASS): STATE_CLASSES_SCHEMA,
+        vol.Optional(CONF_DEADBAND, default=0): vol.Coerce(float),
+        vol.Optional(CONF_MIN_INTERVAL, default=0): vol.Coerce(float),
+        vol.Optional(CONF_AGGREGATE): vol.In(
+            [AGGREGATE_MIN, AGGREGATE_MEAN, AGGREGATE_MAX]),
+        vol.Optional(CONF_AGGREGATE_WINDOW, default=60): cv.positive_float,
+    },
+    extra=vol.ALLOW_EXTRA,
+)
+
+
+async def async_setup_platform(hass: HomeAssistant, config, async_add_entities: AddEntitiesCallback, discovery_info=None):
+    async_add_entities = track_platform(
+        hass, 'sensor', config, async_add_entities, discovery_info)
+    hub: XPanelClient = hass.data[DOMAIN][HUB]
+    sensor_list = [
+        entity for device in manifest_configs(discovery_info) or [config]
+        for entity in create_entities(hass, hub, device)]
+    if sensor_list:
+        async_add_entities(sensor_list)
+
+
+def create_entities(hass, hub: XPanelClient, config) -> list:
+    sensor_type = config.get(CONF_TYPE)
+    if sensor_type == CONF_ANALOG and config.get(CONF_VALUE_JOIN):
+        return [AnalogSensor(hub, config)]
+    elif sensor_type == CONF_SERIAL and config.get(CONF_SERIAL_FB_JOIN):
+        return [SerialSensor(hub, config)]
+    return []
+
+
+class CrestronSensor(JoinSubscriberMixin, SensorEntity):
+    """Sensor whose state writes are rate limited on the hub's shared timer.
+
+    A value arriving within min_interval of the last write is held and
+    written once the interval has passed; newer values replace it.
+    """
+
+    _sigtype = "a"
+
+    def __init__(self, hub: XPanelClient, config, join: int):
+        self._hub = hub
+        self._join = join
+        self._attr_name = config.get(CONF_NAME)
+        self._attr_unique_id = f"{self._attr_name}_{self._sigtype}{join}"
+        self._attr_should_poll = False
+        self._attr_native_unit_of_measurement = config.get(CONF_UNIT_OF_MEASUREMENT)
+        self._attr_device_class = config.get(CONF_DEVICE_CLASS)
+        self._attr_state_class = config.get(CONF_STATE_CLASS)
+        self._min_interval = config.get(CONF_MIN_INTERVAL, 0)
+        self._last_write = None
+        self._pending = None
+        self._flush_entry = None
+
+    def join_subscriptions(self):
+        return [(self._sigtype, self._join, self.process_callback)]
+
+    def initial_join_values(self, values):
+        self._attr_native_value = self._convert(values[(self._sigtype, self._join)])
+        self._last_write = self._hub.timer.time()
+
+    async def async_will_remove_from_hass(self):
+        self._hub.timer.cancel(self._flush_entry)
+        await super().async_will_remove_from_hass()
+
+    def _convert(self, value):
+        return value
+
+    def _publish(self, value):
+        """Write value now or hold it until min_interval has passed."""
+        if value == self._attr_native_value and self._flush_entry is None:
+            return
+        now = self._hub.timer.time()
+        if self._last_write is not None and now - self._last_write < self._min_interval:
+            self._pending = value
+            if self._flush_entry is None:
+                self._flush_entry = self._hub.timer.call_at(
+                    self._last_write + self._min_interval, self._flush)
+            return
+        self._write(value, now)
+
+    def _flush(self):
+        self._flush_entry = None
+        self._write(self._pending, self._hub.timer.time())
+
+    def _write(self, value, now):
+        self._last_write = now
+        self._attr_native_value = value
+        if self.hass is not None:
+            self.async_write_ha_state()
+
+    def process_callback(self, sigtype, join, value):
+        self._publish(self._convert(value))
+
+
+class AnalogSensor(CrestronSensor):
+    """Analog join sensor with deadband and optional min/mean/max windows."""
+
+    def __init__(self, hub: XPanelClient, config):
+        super().__init__(hub, config, config.get(CONF_VALUE_JOIN))
+        self._divisor = config.get(CONF_DIVISOR, 1)
+        self._deadband = config.get(CONF_DEADBAND, 0)
+        self._aggregate = config.get(CONF_AGGREGATE)
+        self._window = config.get(CONF_AGGREGATE_WINDOW, 60)
+        self._window_entry = None
+        self._reset_window()
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        if self._aggregate is not None:
+            self._window_entry = self._hub.timer.call_later(
+                self._window, self._close_window)
+
+    async def async_will_remove_from_hass(self):
+        self._hub.timer.cancel(self._window_entry)
+        await super().async_will_remove_from_hass()
+
+    def _convert(self, value):
+        value = value / self._divisor
+        if value == int(value):
+            return int(value)
+        return value
+
+    def _reset_window(self):
+        self._count = 0
+        self._sum = 0.0
+        self._min = None
+        self._max = None
+
+    def _close_window(self):
+        self._window_entry = self._hub.timer.call_later(
+            self._window, self._close_window)
+        if self._count == 0:
+            return
+        if self._aggregate == AGGREGATE_MIN:
+            value = self._min
+        elif self._aggregate == AGGREGATE_MAX:
+            value = self._max
+        else:
+            value = round(self._sum / self._count, 3)
+        self._reset_window()
+        self._write(value, self._hub.timer.time())
+
+    def process_callback(self, sigtype, join, value):
+        value = self._convert(value)
+        if self._aggregate is not None:
+            self._count += 1
+            self._sum += value
+            self._min = value if self._min is None else min(self._min, value)
+            self._max = value if self._max is None else max(self._max, value)
+            return
+        last = self._attr_native_value
+        if (
+            self._deadband
+            and last is not None
+            and abs(value - last) < self._deadband
+        ):
+            # back inside the deadband of the written value, drop any held one
+            self._hub.timer.cancel(self._flush_entry)
+            self._flush_entry = None
+            return
+        self._publish(value)
+
+
+class SerialSensor(CrestronSensor):
+    _sigtype = "s"
+
+    def __init__(self, hub: XPanelClient, config):
+        super().__init__(hub, config, config.get(CONF_SERIAL_FB_JOIN))
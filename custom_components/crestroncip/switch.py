@@ -4,10 +4,14 @@ import logging
 import homeassistant.helpers.config_validation as cv
 from homeassistant.components.switch import SwitchEntity
 from homeassistant.const import (
-    CONF_NAME, CONF_DEVICE_CLASS)
+    CONF_NAME, CONF_DEVICE_CLASS, CONF_OPTIMISTIC)
 from .const import (HUB, DOMAIN, CONF_SWITCH_ON_JOIN,
-                    CONF_SWITCH_OFF_JOIN, CONF_SWITCH_FB_JOIN)
+                    CONF_SWITCH_OFF_JOIN, CONF_SWITCH_FB_JOIN,
+                    CONF_FEEDBACK_TIMEOUT)
 from . import XPanelClient
+from .reload import track_platform
+from .entity import JoinSubscriberMixin, OptimisticStateMixin
+from .device_manifest import manifest_configs
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORM_SCHEMA = vol.Schema(
@@ -15,22 +19,34 @@ PLATFORM_SCHEMA = vol.Schema(
         vol.Required(CONF_NAME): cv.string,
         vol.Required(CONF_SWITCH_ON_JOIN): cv.positive_int,
         vol.Required(CONF_SWITCH_OFF_JOIN): cv.positive_int,
-        vol.Optional(CONF_SWITCH_ON_JOIN, default=0): cv.positive_int,
+        vol.Optional(CONF_SWITCH_FB_JOIN, default=0): cv.positive_int,
         vol.Optional(CONF_DEVICE_CLASS, default="switch"): cv.string,
+        vol.Optional(CONF_OPTIMISTIC): cv.boolean,
+        vol.Optional(CONF_FEEDBACK_TIMEOUT): cv.positive_float,
     },
     extra=vol.ALLOW_EXTRA,
 )
 
 
-async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
-    hub = hass.data[DOMAIN][HUB]
+def create_entities(hass, hub: XPanelClient, config) -> list:
     device_name = config.get(CONF_NAME)
     if type(device_name) == str and device_name != "":
-        entity = [CrestronSwitch(hub, config)]
+        return [CrestronSwitch(hub, config)]
+    return []
+
+
+async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
+    async_add_entities = track_platform(
+        hass, 'switch', config, async_add_entities, discovery_info)
+    hub = hass.data[DOMAIN][HUB]
+    entity = [
+        entity for device in manifest_configs(discovery_info) or [config]
+        for entity in create_entities(hass, hub, device)]
+    if entity:
         async_add_entities(entity)
 
 
-class CrestronSwitch(SwitchEntity):
+class CrestronSwitch(OptimisticStateMixin, JoinSubscriberMixin, SwitchEntity):
     def __init__(self, hub: XPanelClient, config):
         self._hub = hub
         self._attr_name = config.get(CONF_NAME)
@@ -40,28 +56,30 @@ class CrestronSwitch(SwitchEntity):
         self._switch_join_off = config.get(CONF_SWITCH_OFF_JOIN)
         self._switch_join_fb = config.get(CONF_SWITCH_FB_JOIN)
         self._device_class = config.get(CONF_DEVICE_CLASS)
-        if self._switch_join_fb == 0:
+        if not self._switch_join_fb:
+            # no feedback join, the on join reports the state
             self._switch_join_fb = self._switch_join_on
+        self.configure_optimistic(config, default=True)
 
-    async def async_added_to_hass(self):
-        await self._hub.register_callback(
-            "d", self._switch_join_fb, self.process_callback)
-        self._attr_is_on = self._hub.get_digital(self._switch_join_fb)
-        self.schedule_update_ha_state()
+    def join_subscriptions(self):
+        return [("d", self._switch_join_fb, self.process_callback)]
 
-    async def async_will_remove_from_hass(self):
-        await self._hub.remove_callback("d", self._switch_join_fb)
+    def initial_join_values(self, values):
+        self._attr_is_on = bool(values[("d", self._switch_join_fb)])
 
     def process_callback(self, sigtype, join, value):
+        self.feedback_received(sigtype, join, value)
         self._attr_is_on = value
         self.schedule_update_ha_state()
 
     async def async_turn_on(self, **kwargs):
         self._hub.pulse(self._switch_join_on)
-        self._attr_is_on = True
+        self.expect_feedback(
+            "d", self._switch_join_fb, 1, {"_attr_is_on": True})
         self.schedule_update_ha_state()
 
     async def async_turn_off(self, **kwargs):
         self._hub.pulse(self._switch_join_off)
-        self._attr_is_on = False
+        self.expect_feedback(
+            "d", self._switch_join_fb, 0, {"_attr_is_on": False})
         self.schedule_update_ha_state()
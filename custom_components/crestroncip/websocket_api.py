@@ -0,0 +1,127 @@
+"""Websocket commands streaming raw join changes to dashboards and tools."""
+import logging
+
+import voluptuous as vol
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.const import CONF_TYPE
+
+from .const import CONF_JOIN, CONF_JOINS, CONF_HUB, CONF_THROTTLE
+from . import cv_sigtype, join_range, resolve_hub
+
+_LOGGER = logging.getLogger(__name__)
+
+# joins one subscription may watch, all ranges together
+MAX_SUBSCRIBED_JOINS = 4096
+
+
+@callback
+def async_setup_websocket(hass: HomeAssistant) -> None:
+    websocket_api.async_register_command(hass, ws_subscribe_joins)
+
+
+class JoinSubscription:
+    """Collect changes of the watched joins and send them in batches.
+
+    All changes dispatched in one loop iteration, i.e. one incoming
+    frame, go out as one message; with throttle set a client gets at
+    most one message per throttle seconds and only the latest value of
+    each join.
+    """
+
+    def __init__(self, hub, connection, msg_id, joins: set, throttle: float):
+        self._hub = hub
+        self._connection = connection
+        self._msg_id = msg_id
+        self._joins = joins
+        self._throttle = throttle
+        self._pending = {}
+        self._scheduled = False
+        self._entry = None
+        self._last_sent = 0.0
+        self._remove_observer = None
+
+    def start(self):
+        self._connection.send_message(websocket_api.event_message(
+            self._msg_id, {"snapshot": {
+                f"{sigtype}{join}": self._hub.get(sigtype, join)
+                for sigtype, join in sorted(self._joins)
+            }}))
+        self._remove_observer = self._hub.add_observer(self._join_changed)
+
+    @callback
+    def stop(self):
+        if self._remove_observer is not None:
+            self._remove_observer()
+            self._remove_observer = None
+        self._hub.timer.cancel(self._entry)
+        self._entry = None
+
+    def _join_changed(self, sigtype, join, value):
+        if (sigtype, join) not in self._joins:
+            return
+        self._pending[f"{sigtype}{join}"] = value
+        if self._scheduled:
+            return
+        self._scheduled = True
+        due = self._last_sent + self._throttle
+        if due > self._hub.timer.time():
+            self._entry = self._hub.timer.call_at(due, self._flush)
+        else:
+            self._hub.hass.loop.call_soon(self._flush)
+
+    def _flush(self):
+        self._scheduled = False
+        self._entry = None
+        if not self._pending or self._remove_observer is None:
+            return
+        changes, self._pending = self._pending, {}
+        self._last_sent = self._hub.timer.time()
+        self._connection.send_message(
+            websocket_api.event_message(self._msg_id, {"changes": changes}))
+
+
+def _expand_joins(entries) -> set:
+    joins = set()
+    for entry in entries:
+        joins.update((entry[CONF_TYPE], join) for join in entry[CONF_JOIN])
+    if len(joins) > MAX_SUBSCRIBED_JOINS:
+        raise vol.Invalid(
+            f"too many joins, at most {MAX_SUBSCRIBED_JOINS} per subscription")
+    return joins
+
+
+JOIN_ENTRY_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_TYPE): cv_sigtype,
+        vol.Required(CONF_JOIN): join_range,
+    }
+)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "crestroncip/subscribe_joins",
+        vol.Required(CONF_JOINS): vol.All(
+            cv.ensure_list, vol.Length(min=1), [JOIN_ENTRY_SCHEMA]),
+        vol.Optional(CONF_THROTTLE, default=0.1): vol.All(
+            vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(CONF_HUB): cv.string,
+    }
+)
+@websocket_api.async_response
+async def ws_subscribe_joins(hass: HomeAssistant, connection, msg) -> None:
+    """Stream a snapshot, then batched changes of the requested joins."""
+    try:
+        hub = resolve_hub(hass, msg.get(CONF_HUB))
+        joins = _expand_joins(msg[CONF_JOINS])
+    except (HomeAssistantError, vol.Invalid) as err:
+        connection.send_error(msg["id"], "invalid_format", str(err))
+        return
+    subscription = JoinSubscription(
+        hub, connection, msg["id"], joins, msg[CONF_THROTTLE])
+    connection.subscriptions[msg["id"]] = subscription.stop
+    connection.send_result(msg["id"])
+    subscription.start()
@@ -0,0 +1,13 @@
+"""Make the integration importable from the tests.
+
+cipasync has no Home Assistant imports and is loaded on its own, the way
+the tools load it; modules that need Home Assistant go through the
+custom_components package.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, "custom_components", "crestroncip"))
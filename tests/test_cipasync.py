@@ -0,0 +1,427 @@
+"""Tests for the standalone CIP client building blocks."""
+import asyncio
+
+import pytest
+
+import cipasync
+from cipasync import (
+    LANE_BULK,
+    LANE_CONTROL,
+    LANE_INTERACTIVE,
+    LANE_RESYNC,
+    MAX_SERIAL_LENGTH,
+    OVERFLOW_DROP_OLDEST,
+    OVERFLOW_REJECT,
+    CIPClient,
+    InboundFilter,
+    JoinHistory,
+    OfflineJournal,
+    SharedTimer,
+    TxLanes,
+    complete_length,
+    split_packets,
+)
+
+
+def analog_packet(join: int, value: int) -> bytes:
+    return (b"\x05\x00\x08\x00\x00\x05\x14"
+            + (join - 1).to_bytes(2, "big") + value.to_bytes(2, "big"))
+
+
+class FakeTimer:
+    """SharedTimer stand-in driven by advance()."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.entries = []
+
+    def time(self):
+        return self.now
+
+    def call_at(self, when, callback, *args):
+        entry = [when, callback, args]
+        self.entries.append(entry)
+        return entry
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(self.now + delay, callback, *args)
+
+    @staticmethod
+    def cancel(entry):
+        if entry is not None:
+            entry[1] = None
+
+    def advance(self, seconds):
+        self.now += seconds
+        due = [e for e in self.entries if e[0] <= self.now]
+        self.entries = [e for e in self.entries if e[0] > self.now]
+        for _, callback, args in sorted(due, key=lambda e: e[0]):
+            if callback is not None:
+                callback(*args)
+
+
+# TxLanes
+
+def drain(lanes: TxLanes) -> list:
+    sent = []
+    while not lanes.empty():
+        sent.append(lanes.get())
+    return sent
+
+
+def test_tx_lanes_control_goes_first():
+    lanes = TxLanes()
+    lanes.put(b"bulk", LANE_BULK)
+    lanes.put(b"interactive", LANE_INTERACTIVE)
+    lanes.put(b"heartbeat", LANE_CONTROL)
+    assert drain(lanes) == [b"heartbeat", b"interactive", b"bulk"]
+
+
+def test_tx_lanes_weighted_round_robin():
+    lanes = TxLanes()
+    for i in range(10):
+        lanes.put(f"i{i}".encode(), LANE_INTERACTIVE)
+        lanes.put(f"r{i}".encode(), LANE_RESYNC)
+    sent = drain(lanes)
+    # the first round takes LANE_WEIGHTS[interactive] commands, then one resync
+    assert sent[:9] == [f"i{i}".encode() for i in range(8)] + [b"r0"]
+    assert sorted(sent) == sorted(
+        [f"i{i}".encode() for i in range(10)] + [f"r{i}".encode() for i in range(10)])
+
+
+def test_tx_lanes_coalesce_replaces_in_place():
+    lanes = TxLanes()
+    lanes.put(b"a1=1", LANE_INTERACTIVE, ("a", 1))
+    lanes.put(b"a2=1", LANE_INTERACTIVE, ("a", 2))
+    lanes.put(b"a1=2", LANE_INTERACTIVE, ("a", 1))
+    assert lanes.coalesced == 1
+    assert drain(lanes) == [b"a1=2", b"a2=1"]
+
+
+def test_tx_lanes_newer_value_removes_lower_lane_entry():
+    lanes = TxLanes(maxsize=2)
+    lanes.put(b"resync a1", LANE_RESYNC, ("a", 1))
+    lanes.put(b"resync a2", LANE_RESYNC, ("a", 2))
+    lanes.put(b"command a1", LANE_INTERACTIVE, ("a", 1))
+    assert lanes.depths()["resync"] == 1
+    assert lanes.qsize() == 2
+    # the superseded entry no longer takes a slot of the bounded lane
+    lanes.put(b"resync a3", LANE_RESYNC, ("a", 3))
+    assert lanes.dropped == 0
+    assert drain(lanes) == [b"command a1", b"resync a2", b"resync a3"]
+
+
+def test_tx_lanes_batch_supersedes_lower_lane_entries():
+    lanes = TxLanes()
+    lanes.put(b"resync a1", LANE_RESYNC, ("a", 1))
+    lanes.put(b"resync s2", LANE_RESYNC, ("s", 2))
+    lanes.put(b"resync a3", LANE_RESYNC, ("a", 3))
+    lanes.put(b"batch a1 s2", LANE_BULK, supersedes=[("a", 1), ("s", 2)])
+    assert drain(lanes) == [b"batch a1 s2", b"resync a3"]
+
+
+def test_set_many_supersedes_queued_resync_values():
+    client = CIPClient("127.0.0.1", 3)
+    client.connected = True
+    client._ready = True
+    client._put_tx(b"resync a1", LANE_RESYNC, ("a", 1))
+    client._put_tx(b"resync a2", LANE_RESYNC, ("a", 2))
+    asyncio.run(client._process_event(
+        "out", "batch", None, [("a", 1, 10), ("d", 3, 1)], LANE_BULK))
+    sent = drain(client._tx_queue)
+    assert sent[1:] == [b"resync a2"]
+    assert bytes(client._encode("a", 1, 10)) in sent[0]
+
+
+def test_tx_lanes_full_lane_drops_oldest():
+    lanes = TxLanes(maxsize=2, policy=OVERFLOW_DROP_OLDEST)
+    for i in range(3):
+        assert lanes.put(f"b{i}".encode(), LANE_BULK)
+    assert lanes.dropped == 1
+    assert lanes.metrics()["high_water"]["bulk"] == 2
+    assert drain(lanes) == [b"b1", b"b2"]
+
+
+def test_tx_lanes_full_lane_rejects():
+    lanes = TxLanes(maxsize=1, policy=OVERFLOW_REJECT)
+    assert lanes.put(b"b0", LANE_BULK)
+    assert not lanes.put(b"b1", LANE_BULK)
+    assert lanes.rejected == 1
+    assert drain(lanes) == [b"b0"]
+
+
+def test_tx_lanes_get_on_empty_raises():
+    with pytest.raises(IndexError):
+        TxLanes().get()
+
+
+# OfflineJournal
+
+def test_offline_journal_keeps_latest_level_and_every_pulse():
+    journal = OfflineJournal()
+    journal.record("a", 1, 10)
+    journal.record("a", 1, 20)
+    journal.record("dp", 5, 1)
+    journal.record("dp", 5, 0)
+    assert len(journal) == 3
+    assert journal.drain() == [("a", 1, 20), ("dp", 5, 1), ("dp", 5, 0)]
+    assert len(journal) == 0
+    assert journal.replayed == 3
+
+
+def test_offline_journal_expires_pulses(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cipasync.time, "monotonic", lambda: now[0])
+    journal = OfflineJournal(expiry=30)
+    journal.record("db", 7, 1)
+    journal.record("a", 1, 5)
+    now[0] += 31
+    assert journal.drain() == [("a", 1, 5)]
+    assert journal.expired == 1
+
+
+def test_offline_journal_bounds_level_joins():
+    journal = OfflineJournal(maxsize=2)
+    for join in (1, 2, 3):
+        journal.record("a", join, join)
+    assert journal.drain() == [("a", 2, 2), ("a", 3, 3)]
+
+
+# SharedTimer
+
+def test_shared_timer_runs_in_deadline_order_and_skips_cancelled():
+    async def scenario():
+        timer = SharedTimer()
+        fired = []
+        timer.call_later(0.03, fired.append, "late")
+        cancelled = timer.call_later(0.01, fired.append, "cancelled")
+        timer.call_later(0.02, fired.append, "early")
+        timer.cancel(cancelled)
+        await asyncio.sleep(0.06)
+        return fired
+
+    assert asyncio.run(scenario()) == ["early", "late"]
+
+
+def test_shared_timer_survives_failing_callback():
+    async def scenario():
+        timer = SharedTimer()
+        fired = []
+        timer.call_later(0.01, lambda: 1 / 0)
+        timer.call_later(0.02, fired.append, "next")
+        await asyncio.sleep(0.05)
+        return fired
+
+    assert asyncio.run(scenario()) == ["next"]
+
+
+# InboundFilter
+
+def make_filter(**kwargs):
+    timer = FakeTimer()
+    delivered = []
+    inbound = InboundFilter(
+        timer, lambda sigtype, join, value: delivered.append((sigtype, join, value)),
+        **kwargs)
+    return timer, inbound, delivered
+
+
+def test_inbound_filter_passes_joins_without_rules():
+    _, inbound, delivered = make_filter()
+    assert not inbound.active
+    inbound.process("a", 1, 100)
+    assert delivered == [("a", 1, 100)]
+
+
+def test_inbound_filter_debounce_drops_bounces():
+    timer, inbound, delivered = make_filter()
+    inbound.add_rule("d", [3], debounce=0.1)
+    inbound.process("d", 3, 0)
+    timer.advance(0.2)
+    assert delivered == [("d", 3, 0)]
+    # a press released before it settled is a bounce
+    inbound.process("d", 3, 1)
+    timer.advance(0.05)
+    inbound.process("d", 3, 0)
+    timer.advance(0.2)
+    assert delivered == [("d", 3, 0)]
+    inbound.process("d", 3, 1)
+    timer.advance(0.2)
+    assert delivered == [("d", 3, 0), ("d", 3, 1)]
+
+
+def test_inbound_filter_deadband():
+    _, inbound, delivered = make_filter()
+    inbound.add_rule("a", [1], deadband=10)
+    for value in (100, 105, 111, 115):
+        inbound.process("a", 1, value)
+    assert delivered == [("a", 1, 100), ("a", 1, 111)]
+
+
+def test_inbound_filter_rate_limit_delivers_latest():
+    timer, inbound, delivered = make_filter()
+    inbound.add_rule("a", [1], rate_limit=1.0)
+    for value in (1, 2, 3):
+        inbound.process("a", 1, value)
+    assert delivered == [("a", 1, 1)]
+    timer.advance(1.0)
+    assert delivered == [("a", 1, 1), ("a", 1, 3)]
+
+
+def test_inbound_filter_storm_guard_throttles():
+    timer, inbound, delivered = make_filter(storm_limit=3, storm_hold=5)
+    for value in range(10):
+        inbound.process("d", 9, value % 2)
+    assert inbound.storm_trips == 1
+    assert len(delivered) == 3
+    timer.advance(1.0)
+    # one held value per second while tripped
+    assert len(delivered) == 4
+
+
+# JoinHistory
+
+def test_join_history_keeps_only_tracked_joins():
+    clock = [0.0]
+    history = JoinHistory(clock=lambda: clock[0])
+    history.track("a", [1], size=3)
+    for value in range(5):
+        clock[0] = float(value)
+        history.record("in", "a", 1, value)
+        history.record("in", "a", 2, value)
+    assert history.query("a", 1) == [(2.0, 2), (3.0, 3), (4.0, 4)]
+    assert history.query("a", 1, since=3.0) == [(3.0, 3), (4.0, 4)]
+    assert history.query("a", 2) is None
+    assert history.stats()["joins"] == 1
+
+
+def test_join_history_refuses_rings_over_the_cap():
+    history = JoinHistory(max_bytes=100)
+    history.track("a", [1, 2], size=8)
+    history.record("in", "a", 1, 1)
+    history.record("in", "a", 2, 1)
+    assert history.refused == 1
+    assert history.query("a", 2) is None
+    assert history.stats()["bytes"] <= 100
+
+
+def test_join_history_tracked_join_without_samples():
+    history = JoinHistory()
+    history.track("s", [4], size=2)
+    assert history.query("s", 4) == []
+
+
+# framing
+
+def test_split_packets_and_complete_length():
+    first = analog_packet(1, 100)
+    second = analog_packet(2, 200)
+    stream = first + second
+    assert complete_length(stream) == len(stream)
+    assert complete_length(stream + second[:5]) == len(stream)
+    assert list(split_packets(stream)) == [
+        (0x05, first[3:]), (0x05, second[3:])]
+
+
+def test_partial_frames_are_reassembled():
+    client = CIPClient("127.0.0.1", 3)
+    payloads = []
+    client._processPayload = lambda ciptype, payload: payloads.append((ciptype, payload))
+    stream = analog_packet(1, 100) + analog_packet(2, 200)
+    # cut inside the header of the second packet, then inside the first
+    for chunk in (stream[:13], stream[13:], analog_packet(3, 300)[:2]):
+        client._handle_incoming_message(chunk)
+    client._handle_incoming_message(analog_packet(3, 300)[2:])
+    assert payloads == [
+        (0x05, analog_packet(1, 100)[3:]),
+        (0x05, analog_packet(2, 200)[3:]),
+        (0x05, analog_packet(3, 300)[3:]),
+    ]
+    assert client._rx_pending == b""
+    assert client._restart_connection is False
+
+
+class FakeStandby:
+    """Registered standby connection stand-in for failover."""
+
+    ready = True
+    index = 1
+    host = "127.0.0.2"
+    port = 41794
+
+    def detach(self):
+        transport = type("Transport", (), {
+            "set_write_buffer_limits": lambda self, high: None})()
+        return transport, type("Protocol", (), {})()
+
+
+def test_failover_drops_partial_frame_of_old_connection():
+    client = CIPClient("127.0.0.1", 3)
+    payloads = []
+    client._processPayload = lambda ciptype, payload: payloads.append((ciptype, payload))
+    client._handle_incoming_message(analog_packet(1, 100)[:5])
+    client._standby = FakeStandby()
+    assert client._promote_standby()
+    assert client._rx_pending == b""
+    client._handle_incoming_message(analog_packet(2, 200))
+    assert payloads == [(0x05, analog_packet(2, 200)[3:])]
+
+
+# outgoing values
+
+def test_serial_values_must_fit_one_packet():
+    client = CIPClient("127.0.0.1", 3)
+    assert client._check_value("s", 1, "ok") == "ok"
+    assert client._check_value("s", 1, 42) == "42"
+    with pytest.raises(ValueError):
+        client._check_value("s", 1, "café")
+    with pytest.raises(ValueError):
+        client._check_value("s", 1, "x" * (MAX_SERIAL_LENGTH + 1))
+    tx = client._encode("s", 1, "x" * MAX_SERIAL_LENGTH)
+    assert tx[2] == 255
+
+
+# offline journal replay
+
+END_OF_QUERY = b"\x05\x00\x05\x00\x00\x02\x03\x1c"
+
+
+def test_commands_during_restart_are_replayed_after_end_of_query():
+    client = CIPClient("127.0.0.1", 3)
+    client.connected = True
+    client._ready = True
+    # a send error or control system disconnect asks for a reconnect
+    client._request_restart()
+    asyncio.run(client._process_event("out", "a", 5, 100, LANE_INTERACTIVE))
+    assert len(client._journal) == 1
+    assert client._tx_queue.empty()
+
+    # reconnected and registered, the processor finishes its update
+    client._conn_online()
+    client._handle_incoming_message(END_OF_QUERY)
+    sent = drain(client._tx_queue)
+    assert bytes(client._encode("a", 5, 100)) in sent
+    assert len(client._journal) == 0
+
+
+# event queue overflow
+
+def test_full_event_queue_rejects_commands_but_keeps_feedback():
+    client = CIPClient("127.0.0.1", 3, max_queue=1, overflow_policy=OVERFLOW_REJECT)
+    for join in range(1, 5):
+        assert client.set("a", join, join)
+    assert not client.set("a", 5, 5)
+    assert client.set_many([("a", 6, 6)]) == 0
+    # feedback makes room by dropping the oldest event
+    client._queue_event(("in", "a", 7, 7, None))
+    assert client.queue_metrics()["events_dropped"] == {"in": 0, "out": 3}
+    events = [client._event_queue.get_nowait() for _ in range(4)]
+    assert events[-1] == ("in", "a", 7, 7, None)
+
+
+def test_full_event_queue_drops_oldest_by_default():
+    client = CIPClient("127.0.0.1", 3, max_queue=1)
+    for join in range(1, 6):
+        assert client.set("a", join, join)
+    assert client.queue_metrics()["events_dropped"] == {"in": 0, "out": 1}
+    assert client._event_queue.get_nowait()[2] == 2
@@ -0,0 +1,89 @@
+"""Tests for the devices manifest expansion."""
+import pytest
+
+vol = pytest.importorskip("voluptuous")
+pytest.importorskip("homeassistant")
+
+from custom_components.crestroncip.device_manifest import (  # noqa: E402
+    DeviceManifest,
+    parse_pattern,
+)
+
+
+class CountingSchema:
+    """Platform schema stand-in that records what it validated."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, config):
+        self.calls.append(dict(config))
+        return dict(config)
+
+
+def test_parse_pattern():
+    assert parse_pattern("N") == (0, 1)
+    assert parse_pattern("100+N") == (100, 1)
+    assert parse_pattern("200 + 2N") == (200, 2)
+    assert parse_pattern("3N") == (0, 3)
+    assert parse_pattern(12) is None
+    assert parse_pattern("light") is None
+
+
+def test_expand_single_entry_without_range():
+    schema = CountingSchema()
+    configs = DeviceManifest()._expand(
+        {"platform": "switch", "name": "Fan", "switch_on_digital": 5}, schema)
+    assert configs == [{"name": "Fan", "switch_on_digital": 5}]
+
+
+def test_expand_numbers_names_and_joins():
+    schema = CountingSchema()
+    configs = DeviceManifest()._expand({
+        "platform": "light",
+        "name": "Room light {N}",
+        "range": range(1, 4),
+        "type": "brightness",
+        "brightness_analog": "100+N",
+        "brightness_fb_analog": "200+2N",
+    }, schema)
+    assert [c["name"] for c in configs] == [
+        "Room light 1", "Room light 2", "Room light 3"]
+    assert [c["brightness_analog"] for c in configs] == [101, 102, 103]
+    assert [c["brightness_fb_analog"] for c in configs] == [202, 204, 206]
+    assert all(c["type"] == "brightness" for c in configs)
+    # validated once, for the first number
+    assert len(schema.calls) == 1
+    assert schema.calls[0]["brightness_analog"] == 101
+
+
+def test_expand_pattern_needs_range():
+    with pytest.raises(vol.Invalid):
+        DeviceManifest()._expand(
+            {"platform": "light", "name": "Light", "brightness_analog": "N"},
+            CountingSchema())
+
+
+def test_expand_several_numbers_need_numbered_name():
+    with pytest.raises(vol.Invalid):
+        DeviceManifest()._expand(
+            {"platform": "light", "name": "Light", "range": range(1, 3),
+             "brightness_analog": "N"},
+            CountingSchema())
+
+
+def test_expand_rejects_joins_out_of_range():
+    with pytest.raises(vol.Invalid):
+        DeviceManifest()._expand(
+            {"platform": "light", "name": "Light {N}", "range": range(1, 3),
+             "brightness_analog": "65534+N"},
+            CountingSchema())
+
+
+def test_index_reports_collisions():
+    manifest = DeviceManifest()
+    manifest._index("switch", {"name": "A", "switch_on_digital": 1,
+                               "switch_fb_digital": 1})
+    manifest._index("switch", {"name": "B", "switch_on_digital": 1,
+                               "switch_fb_digital": 2})
+    assert manifest.collisions() == {"out:d1": ["switch.A", "switch.B"]}
@@ -0,0 +1,47 @@
+"""Tests for the threaded CIP client hand-over to the Home Assistant loop."""
+import asyncio
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from custom_components.crestroncip.hub import ThreadedXPanelClient  # noqa: E402
+
+
+class FakeBus:
+    def async_fire(self, *args, **kwargs):
+        pass
+
+
+class FakeHass:
+    """The parts of HomeAssistant the client uses."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.bus = FakeBus()
+
+    def async_create_background_task(self, coro, name):
+        return self.loop.create_task(coro, name=name)
+
+
+def test_connection_state_is_published_to_the_hass_loop():
+    async def scenario():
+        client = ThreadedXPanelClient(
+            FakeHass(asyncio.get_running_loop()), "127.0.0.1", 3)
+        # the worker changes its own state, the hass loop sees the old copy
+        client._conn_online()
+        client._ready = True
+        client._link_changed()
+        assert not client.is_connected()
+        assert not client._can_send()
+        await asyncio.sleep(0)
+        assert client.is_connected()
+        assert client._can_send()
+
+        client._request_restart()
+        await asyncio.sleep(0)
+        assert client.is_connected()
+        assert not client._can_send()
+        client._io_loop.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,172 @@
+"""Benchmark plain against secure CIP using a local fake processor.
+
+Runs the standalone client against a fake processor on localhost, once
+over plain TCP and once over TLS, and reports inbound join throughput
+and reconnect latency, the latter for TLS with and without session
+resumption:
+
+    python tools/cip_benchmark.py --frames 20000 --reconnects 50
+
+Without --cert/--key a throwaway self-signed certificate is made with
+the openssl command line tool.
+"""
+import argparse
+import asyncio
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..", "custom_components", "crestroncip"))
+
+from cipasync import (  # noqa: E402
+    CIPClient, split_packets, tls_context)
+
+REGISTRATION_REQUEST = b"\x0f\x00\x01\x02"
+REGISTRATION_OK = b"\x02\x00\x04\x00\x00\x00\x1f"
+END_OF_QUERY = b"\x05\x00\x05\x00\x00\x02\x03\x1c"
+
+
+def analog_packet(join: int, value: int) -> bytes:
+    cip_join = join - 1
+    return (b"\x05\x00\x08\x00\x00\x05\x14"
+            + cip_join.to_bytes(2, "big") + value.to_bytes(2, "big"))
+
+
+def make_certificate(directory: str) -> tuple:
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+         "-keyout", key, "-out", cert, "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1"],
+        check=True, capture_output=True)
+    return cert, key
+
+
+class FakeProcessor:
+    """Registers any client and streams frames after its update request."""
+
+    def __init__(self, frames: int, joins_per_frame: int):
+        self.frames = frames
+        self.joins_per_frame = joins_per_frame
+        self.started = None
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        writer.write(REGISTRATION_REQUEST)
+        try:
+            while True:
+                rx = await reader.read(4096)
+                if not rx:
+                    break
+                for ciptype, payload in split_packets(rx):
+                    if ciptype in (0x01, 0x26):
+                        writer.write(REGISTRATION_OK)
+                    elif ciptype == 0x05 and payload[3:5] == b"\x03\x00":
+                        await self.stream(writer)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def stream(self, writer: asyncio.StreamWriter):
+        self.started = time.perf_counter()
+        for frame in range(self.frames):
+            writer.write(b"".join(
+                analog_packet(join + 1, frame % 65536)
+                for join in range(self.joins_per_frame)))
+            if frame % 100 == 0:
+                await writer.drain()
+        writer.write(END_OF_QUERY)
+
+
+async def throughput(port: int, args, context, processor: FakeProcessor) -> float:
+    total = args.frames * args.joins_per_frame
+    received = 0
+    done = asyncio.Event()
+
+    def count(event_type, data):
+        nonlocal received
+        received += 1
+        if received >= total:
+            done.set()
+
+    client = CIPClient("127.0.0.1", 0x03, port=port, ssl_context=context,
+                       max_queue=total, fire_event=count)
+    await client.start()
+    await asyncio.wait_for(done.wait(), 300)
+    elapsed = time.perf_counter() - processor.started
+    client._stop_connection = True
+    client._transport.close()
+    return total / elapsed
+
+
+async def reconnect(port: int, count: int, context, resume: bool) -> tuple:
+    loop = asyncio.get_running_loop()
+    timings = []
+    resumed = 0
+    for _ in range(count):
+        if context is not None and not resume:
+            context.sessions.clear()
+        start = time.perf_counter()
+        transport, _ = await loop.create_connection(
+            asyncio.Protocol, "127.0.0.1", port, ssl=context,
+            server_hostname="127.0.0.1" if context else None)
+        timings.append(time.perf_counter() - start)
+        ssl_object = transport.get_extra_info("ssl_object")
+        if ssl_object is not None:
+            resumed += ssl_object.session_reused
+            # give TLS 1.3 tickets a moment to arrive before keeping the session
+            await asyncio.sleep(0.01)
+            if ssl_object.session is not None:
+                context.sessions["127.0.0.1"] = ssl_object.session
+        transport.close()
+    return sum(timings) / len(timings) * 1000, resumed
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = (args.cert, args.key) if args.cert else make_certificate(directory)
+        server_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        server_context.load_cert_chain(cert, key)
+        client_context = tls_context(verify=True, ca_file=cert)
+
+        for name, port, server_ssl, context in (
+            ("plain", args.port, None, None),
+            ("tls", args.port + 1, server_context, client_context),
+        ):
+            processor = FakeProcessor(args.frames, args.joins_per_frame)
+            server = await asyncio.start_server(
+                processor.handle, "127.0.0.1", port, ssl=server_ssl)
+            async with server:
+                rate = await throughput(port, args, context, processor)
+                print(f"{name:5} throughput: {rate:,.0f} joins/s")
+                latency, resumed = await reconnect(port, args.reconnects, context, True)
+                print(f"{name:5} reconnect: {latency:.2f} ms"
+                      + (f" ({resumed}/{args.reconnects} resumed)" if context else ""))
+                if context is not None:
+                    latency, _ = await reconnect(port, args.reconnects, context, False)
+                    print(f"{name:5} reconnect without resumption: {latency:.2f} ms")
+                # let the handlers see the clients go before the server closes
+                await asyncio.sleep(0.1)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--joins-per-frame", type=int, default=10)
+    parser.add_argument("--reconnects", type=int, default=50)
+    parser.add_argument("--port", type=int, default=47794,
+                        help="plain port, TLS uses the next one")
+    parser.add_argument("--cert", help="server certificate (PEM)")
+    parser.add_argument("--key", help="server private key (PEM)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
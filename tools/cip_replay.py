@@ -0,0 +1,115 @@
+"""Replay a CIP capture through the client parser or as a fake processor.
+
+Parser mode feeds the inbound frames of a capture through
+CIPClient._handle_incoming_message and the join dispatch path, keeping
+the recorded spacing scaled by --speed (0 replays as fast as possible),
+and prints throughput at the end:
+
+    python tools/cip_replay.py site.cipcap --speed 10
+
+Serve mode listens like a control processor and sends the inbound frames
+of the capture to every client that connects, e.g. Home Assistant
+pointed at this host:
+
+    python tools/cip_replay.py site.cipcap --serve 41794
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..", "custom_components", "crestroncip"))
+
+from cipasync import CAPTURE_IN, CIPClient, read_capture  # noqa: E402
+
+
+def load_inbound(path: str) -> list:
+    return [(ts, data) for ts, direction, data in read_capture(path)
+            if direction == CAPTURE_IN]
+
+
+async def pace(loop, started: float, first: float, ts: float, speed: float):
+    """Sleep until the recorded offset of ts, scaled by speed."""
+    if speed > 0:
+        delay = started + (ts - first) / speed - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def replay_parser(frames: list, speed: float):
+    joins = 0
+
+    def count(event_type, data):
+        nonlocal joins
+        joins += 1
+
+    client = CIPClient("replay", 0x03, fire_event=count)
+    dispatch = client.create_task(client._start_event(), "replay_dispatch")
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    first = frames[0][0] if frames else 0
+    cpu = time.process_time()
+    for count_frames, (ts, data) in enumerate(frames, 1):
+        await pace(loop, started, first, ts, speed)
+        client._handle_incoming_message(data)
+        if speed <= 0 and count_frames % 100 == 0:
+            await asyncio.sleep(0)
+    while not client._event_queue.empty():
+        await asyncio.sleep(0.001)
+    elapsed = loop.time() - started
+    cpu = time.process_time() - cpu
+    client._stop_connection = True
+    await dispatch
+    size = sum(len(data) for _, data in frames)
+    print(f"frames: {len(frames)} ({size} bytes), joins dispatched: {joins}")
+    print(f"elapsed: {elapsed:.3f}s, cpu: {cpu:.3f}s, "
+          f"{len(frames) / elapsed if elapsed else 0:.0f} frames/s")
+
+
+async def serve(frames: list, speed: float, port: int):
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info("peername")
+        print(f"client {peer} connected, replaying {len(frames)} frames")
+        loop = asyncio.get_running_loop()
+        drain = asyncio.ensure_future(reader.read(-1))
+        started = loop.time()
+        first = frames[0][0] if frames else 0
+        try:
+            for ts, data in frames:
+                await pace(loop, started, first, ts, speed)
+                writer.write(data)
+                await writer.drain()
+            print(f"client {peer} replay done in {loop.time() - started:.3f}s")
+            await drain
+        except ConnectionError as err:
+            print(f"client {peer} gone: {err}")
+        finally:
+            drain.cancel()
+            writer.close()
+
+    server = await asyncio.start_server(handle, "0.0.0.0", port)
+    print(f"fake processor listening on port {port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("capture", help="capture file written by the client")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="replay speed, 1 is real time, 0 as fast as possible")
+    parser.add_argument("--serve", type=int, metavar="PORT",
+                        help="act as a fake processor on PORT instead of parsing")
+    args = parser.parse_args()
+    frames = load_inbound(args.capture)
+    if args.serve:
+        asyncio.run(serve(frames, args.speed, args.serve))
+    else:
+        asyncio.run(replay_parser(frames, args.speed))
+
+
+if __name__ == "__main__":
+    main()